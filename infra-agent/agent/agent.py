@@ -1,14 +1,32 @@
 """
 Main agent class responsible for coordinating data collection and API communication
 """
+import copy
 import logging
 import time
 import datetime
+import threading
 from .api_client import APIClient
-from .scheduler import Scheduler
-from .collectors import CPUCollector, MemoryCollector, DiskCollector, NetworkCollector
-from .handlers import get_handler
-from .exceptions import APIError, AuthenticationError
+from .timing import MODE_INTERVAL
+from .memory_budget import MemoryBudget
+from .send_queue import SendQueue
+from .policy import CollectionPolicy, POLICY_ATTRIBUTES
+from .collectors import CPUCollector, MemoryCollector, DiskCollector, NetworkCollector, CgroupCollector, ProbeCollector, PressureCollector, TcpCollector
+from .collectors.probes import Probe
+from .handlers import get_handler, register_handler, AnomalyRulesUpdater, ScriptRunner, AgentProfiler
+from .anomaly import AnomalyDetector
+from .utils import dropped_log_records
+from .exceptions import APIError, AuthenticationError, CollectorError, CircuitOpenError
+
+# Collectors whose output is required by the monitoring API
+CORE_COLLECTORS = ('cpu', 'memory', 'disk', 'network')
+
+# Scheduled job driving each API endpoint; monitoring uploads are paced by
+# the send queue, so collection keeps its schedule while that circuit is open
+ENDPOINT_JOBS = {
+    'heartbeat': 'heartbeat',
+    'commands': 'command_polling'
+}
 
 class Agent:
     """Main agent class"""
@@ -21,17 +39,117 @@ class Agent:
             config: Configuration object
         """
         self.config = config
-        self.api_client = APIClient(config.server_url, config.vm_id, config.agent_token)
-        self.scheduler = Scheduler()
+        lightweight = config.profile == 'low'
+        self.api_client = APIClient(
+            config.server_url,
+            config.vm_id,
+            config.agent_token,
+            on_circuit_open=self._on_circuit_open,
+            lightweight=lightweight
+        )
+
+        # Import the scheduler lazily so the low profile never loads APScheduler
+        if lightweight:
+            from .lite_scheduler import LiteScheduler as scheduler_class
+        else:
+            from .scheduler import Scheduler as scheduler_class
+        self.scheduler = scheduler_class(config.schedule_mode, config.vm_id, config.startup_jitter)
+
+        # Hard cap on the bytes held by in-agent buffers
+        self.memory_budget = MemoryBudget(int((config.memory_budget_mb or 32) * 1024 * 1024))
+
+        # Collected samples wait here for the sender thread
+        self.send_queue = SendQueue(
+            self.api_client,
+            max_items=config.queue_max_items,
+            overflow=config.queue_overflow,
+            spill_dir=config.queue_spill_dir,
+            max_spill_files=config.queue_max_spill_files,
+            budget=self.memory_budget,
+            batch_size=config.queue_batch_size,
+            compression=config.queue_compression,
+            sketches=config.queue_sketches,
+            max_batch_wait=config.queue_max_batch_wait
+        )
 
         # Initialize collectors
         self.collectors = {
             'cpu': CPUCollector(),
             'memory': MemoryCollector(),
             'disk': DiskCollector(),
-            'network': NetworkCollector()
+            'network': NetworkCollector(
+                config.network_include,
+                config.network_exclude,
+                config.network_top_n
+            )
         }
 
+        # Optional collectors are reported under their own top-level key
+        if config.cgroup_enabled:
+            self.collectors['cgroups'] = CgroupCollector(
+                config.cgroup_root,
+                config.cgroup_top_n,
+                config.cgroup_max_depth
+            )
+
+        # Resource pressure (PSI) and saturation
+        if config.pressure_enabled:
+            self.collectors['pressure'] = PressureCollector()
+
+        # TCP stack health from aggregate kernel counters
+        if config.tcp_enabled:
+            self.collectors['tcp'] = TcpCollector()
+
+        # Local service health probes, run on their own schedule
+        if config.probes:
+            self.collectors['probes'] = ProbeCollector(
+                [Probe.from_dict(name, data, config.probe_timeout) for name, data in config.probes.items()],
+                concurrency=config.probe_concurrency
+            )
+
+        # Smaller sketches bound per-interval sampling memory on small VMs
+        if lightweight:
+            for collector in self.collectors.values():
+                collector.sketch_max_bins = 256
+
+        # A server collection policy may switch optional collectors off; the
+        # active set is swapped as a whole so readers never see a partial one
+        self.available_collectors = dict(self.collectors)
+
+        # Local settings a collection policy overrides, restored when it is lifted
+        self.base_settings = {attr: getattr(config, attr) for attr in POLICY_ATTRIBUTES}
+        self.policy = CollectionPolicy()
+        self.rejected_policy_version = None
+        self.policy_error = None
+        self._policy_lock = threading.Lock()
+
+        # Edge anomaly detection on high-frequency samples
+        self.anomaly_detector = AnomalyDetector(config.anomaly_rules, on_event=self.push_event)
+        register_handler('UPDATE_ANOMALY_RULES', AnomalyRulesUpdater(self.anomaly_detector))
+
+        # Allow-listed diagnostic scripts with streamed output
+        if config.scripts:
+            register_handler('RUN_SCRIPT', ScriptRunner(
+                self.api_client,
+                config.scripts,
+                timeout=config.script_timeout,
+                max_output_bytes=int(config.script_max_output_mb * 1024 * 1024),
+                cpu_seconds=config.script_cpu_seconds,
+                memory_bytes=int(config.script_memory_mb * 1024 * 1024)
+            ))
+
+        # Time-boxed self-profiling on request
+        register_handler('PROFILE_AGENT', AgentProfiler(self.scheduler))
+
+        # IDs of commands running on background threads; the server keeps
+        # returning a command until it sees output or a result
+        self.running_commands = set()
+        self._commands_lock = threading.Lock()
+
+        self.relay = None
+        self.log_shipper = None
+        self.sample_exporter = None
+
     def start(self):
         """Start the agent"""
         logging.info("Starting agent...")
@@ -39,9 +157,47 @@ class Agent:
         # Validate configuration before starting
         self.config.validate()
 
+        # Serve other agents before our own jobs start
+        if self.config.relay_enabled:
+            from .relay import RelayServer
+            self.relay = RelayServer(
+                self.config.server_url,
+                self.config.vm_id,
+                self.config.agent_token,
+                host=self.config.relay_host,
+                port=self.config.relay_port,
+                flush_interval=self.config.relay_flush_interval,
+                max_batch=self.config.relay_max_batch,
+                upstream_connections=self.config.relay_upstream_connections,
+                max_queue=self.config.relay_max_queue,
+                budget=self.memory_budget
+            )
+            self.relay.start()
+
+        # Follow application logs on a thread of their own
+        if self.config.ship_log_files:
+            from .log_shipper import LogShipper
+            self.log_shipper = LogShipper(
+                self.api_client,
+                self.config.ship_log_files,
+                self.config.ship_log_state_file,
+                batch_bytes=self.config.ship_log_batch_bytes,
+                batch_interval=self.config.ship_log_batch_interval,
+                max_line_bytes=self.config.ship_log_max_line_bytes,
+                start_at_end=self.config.ship_log_start_at_end
+            )
+            self.log_shipper.start()
+
+        # Publish the latest sample to local consumers through shared memory
+        if self.config.sample_export_file:
+            from .sample_export import SampleExporter
+            self.sample_exporter = SampleExporter(self.config.sample_export_file)
+
+        self.send_queue.start()
+
         # Add scheduled jobs
         self.scheduler.add_monitoring_job(
-            self.collect_and_send_monitoring_data,
+            self.collect_monitoring_data,
             self.config.monitoring_interval
         )
 
@@ -55,13 +211,28 @@ class Agent:
             self.config.command_polling_interval
         )
 
+        if self.config.sampling_interval > 0:
+            self.scheduler.add_sampling_job(
+                self.sample_collectors,
+                self.config.sampling_interval
+            )
+
+        if 'probes' in self.collectors:
+            self.scheduler.add_probe_job(
+                self.run_probes,
+                self.config.probe_interval
+            )
+
         # Start scheduler
         self.scheduler.start()
 
-        # Initial data collection, heartbeat, and command polling
-        self.collect_and_send_monitoring_data()
-        self.send_heartbeat()
-        self.poll_and_execute_commands()
+        # Initial data collection, heartbeat, and command polling. In fleet
+        # mode the first runs are left to the jittered, phased triggers so a
+        # mass restart does not hit the backend in lockstep.
+        if self.config.schedule_mode == MODE_INTERVAL:
+            self.collect_monitoring_data()
+            self.send_heartbeat()
+            self.poll_and_execute_commands()
 
         logging.info("Agent started successfully")
 
@@ -72,22 +243,39 @@ class Agent:
         except (KeyboardInterrupt, SystemExit):
             self.stop()
 
+    def _on_circuit_open(self, endpoint, retry_at):
+        """Pause the job behind an endpoint while its circuit is open"""
+        job = ENDPOINT_JOBS.get(endpoint)
+        if job:
+            self.scheduler.defer_job(job, retry_at)
+
     def stop(self):
         """Stop the agent"""
         logging.info("Stopping agent...")
         self.scheduler.stop()
+        self.send_queue.stop()
+        if self.relay:
+            self.relay.stop()
+        if self.log_shipper:
+            self.log_shipper.stop()
+        for name in ('probes', 'pressure', 'tcp'):
+            if name in self.available_collectors:
+                self.available_collectors[name].close()
+        if self.sample_exporter:
+            self.sample_exporter.close()
         logging.info("Agent stopped")
 
-    def collect_and_send_monitoring_data(self):
-        """Collect data from all collectors and send to API"""
+    def collect_monitoring_data(self):
+        """Collect data from all collectors and queue it for the sender"""
         try:
             logging.info("Collecting monitoring data...")
+            collectors = self.collectors
 
             # Collect data from each collector
-            cpu_data = self.collectors['cpu'].collect()
-            memory_data = self.collectors['memory'].collect()
-            disk_data = self.collectors['disk'].collect()
-            network_data = self.collectors['network'].collect()
+            cpu_data = collectors['cpu'].collect()
+            memory_data = collectors['memory'].collect()
+            disk_data = collectors['disk'].collect()
+            network_data = collectors['network'].collect()
 
             # Combine data
             monitoring_data = {
@@ -98,24 +286,100 @@ class Agent:
                 'network': network_data
             }
 
-            # Send data to API
-            self.api_client.send_monitoring_data(monitoring_data)
+            # Optional collectors must not block the core upload
+            for name, collector in collectors.items():
+                if name in CORE_COLLECTORS:
+                    continue
+                try:
+                    data = collector.collect()
+                except CollectorError as e:
+                    logging.warning(f"Skipping {name} data: {e}")
+                    continue
+                if data is not None:
+                    monitoring_data[name] = data
+
+            # Attach intra-interval distributions from high-frequency sampling
+            distributions = {}
+            for name, collector in collectors.items():
+                summary = collector.flush_distributions()
+                if summary:
+                    distributions[name] = summary
+            if distributions:
+                monitoring_data['distributions'] = distributions
+
+            # Upload happens on the sender thread
+            self.send_queue.put(monitoring_data)
+
+            logging.info("Monitoring data queued")
+
+        except Exception as e:
+            logging.error(f"Unexpected error during monitoring: {e}")
+
+    def sample_collectors(self):
+        """Feed one high-frequency sample from each collector into its sketches"""
+        for name, collector in self.collectors.items():
+            try:
+                values = collector.sample()
+            except Exception as e:
+                logging.debug(f"Sampling failed for {name}: {e}")
+                continue
+
+            if values:
+                for metric, value in values.items():
+                    key = f"{name}.{metric}"
+                    self.anomaly_detector.observe(key, value)
+                    if self.sample_exporter:
+                        self.sample_exporter.set(key, value)
+
+        # Latest sample for local consumers
+        if self.sample_exporter:
+            self.sample_exporter.publish()
+
+    def run_probes(self):
+        """Run the local service health probes"""
+        try:
+            collector = self.collectors.get('probes')
+            if collector is not None:
+                collector.run_probes()
+        except Exception as e:
+            logging.error(f"Unexpected error running probes: {e}")
 
-            logging.info("Monitoring data sent successfully")
+    def push_event(self, event):
+        """Send an event to the API immediately, outside the regular schedule"""
+        self.scheduler.run_now(self._send_event, event)
 
+    def _send_event(self, event):
+        """Send an event to the API"""
+        try:
+            self.api_client.send_event(event)
+            logging.info(f"Event {event.get('type')} sent for rule {event.get('rule')}")
         except (APIError, AuthenticationError) as e:
-            logging.error(f"Failed to send monitoring data: {e}")
+            logging.error(f"Failed to send event: {e}")
         except Exception as e:
-            logging.error(f"Unexpected error during monitoring: {e}")
+            logging.error(f"Unexpected error sending event: {e}")
 
     def send_heartbeat(self):
         """Send heartbeat to API"""
         try:
             logging.info("Sending heartbeat...")
-            response = self.api_client.send_heartbeat()
-
-            # Check if we need to adjust the heartbeat interval based on server response
-            if 'nextExpectedInSeconds' in response:
+            response = self.api_client.send_heartbeat({
+                'jobs': self.scheduler.get_job_timings(),
+                'memory': self.memory_budget.usage(),
+                'queue': self.send_queue.metrics(),
+                'logging': {'droppedRecords': dropped_log_records()},
+                'policy': {
+                    'version': self.policy.version,
+                    'rejectedVersion': self.rejected_policy_version,
+                    'error': self.policy_error
+                }
+            })
+
+            if response.get('policy') is not None:
+                self.apply_policy(response['policy'])
+
+            # Check if we need to adjust the heartbeat interval based on server
+            # response; a policy's heartbeat interval takes precedence
+            if 'nextExpectedInSeconds' in response and 'heartbeat' not in self.policy.intervals:
                 next_interval = response['nextExpectedInSeconds']
                 if next_interval != self.config.heartbeat_interval:
                     logging.info(f"Adjusting heartbeat interval to {next_interval} seconds")
@@ -127,11 +391,90 @@ class Agent:
                         self.config.heartbeat_interval
                     )
 
+        except CircuitOpenError as e:
+            logging.debug(f"Skipped: {e}")
         except (APIError, AuthenticationError) as e:
             logging.error(f"Failed to send heartbeat: {e}")
         except Exception as e:
             logging.error(f"Unexpected error during heartbeat: {e}")
 
+    def apply_policy(self, data):
+        """
+        Apply a collection policy sent by the server
+
+        The whole policy is validated against the configuration before
+        anything changes, so an invalid policy leaves the current one in
+        place and is reported in the next heartbeat. Settings the policy
+        leaves out return to the local configuration.
+
+        Args:
+            data: Policy from the heartbeat response
+        """
+        version = data.get('version') if isinstance(data, dict) else None
+        if version == self.policy.version or version == self.rejected_policy_version:
+            return
+
+        with self._policy_lock:
+            try:
+                policy = CollectionPolicy.from_dict(data)
+                settings = policy.resolve(self.base_settings)
+                candidate = copy.copy(self.config)
+                for attr, value in settings.items():
+                    setattr(candidate, attr, value)
+                candidate.validate()
+            except ValueError as e:
+                logging.error(f"Rejected collection policy {version}: {e}")
+                self.rejected_policy_version = version
+                self.policy_error = str(e)
+                return
+
+            previous = {attr: getattr(self.config, attr) for attr in settings}
+            for attr, value in settings.items():
+                setattr(self.config, attr, value)
+
+            collectors = {
+                name: collector for name, collector in self.available_collectors.items()
+                if policy.collector_enabled(name)
+            }
+            probes_toggled = ('probes' in collectors) != ('probes' in self.collectors)
+            self.collectors = collectors
+
+            self.send_queue.configure(
+                self.config.queue_batch_size,
+                self.config.queue_compression,
+                self.config.queue_sketches
+            )
+            self._reschedule(previous, probes_toggled)
+
+            self.policy = policy
+            self.rejected_policy_version = None
+            self.policy_error = None
+
+        logging.info(f"Applied collection policy {policy.version}")
+
+    def _reschedule(self, previous, probes_toggled):
+        """Replace the jobs whose interval changed under a new policy"""
+        jobs = (
+            ('monitoring_interval', self.scheduler.add_monitoring_job, self.collect_monitoring_data),
+            ('heartbeat_interval', self.scheduler.add_heartbeat_job, self.send_heartbeat),
+            ('command_polling_interval', self.scheduler.add_command_polling_job, self.poll_and_execute_commands)
+        )
+        for attr, add_job, func in jobs:
+            if getattr(self.config, attr) != previous[attr]:
+                add_job(func, getattr(self.config, attr))
+
+        if self.config.sampling_interval != previous['sampling_interval']:
+            if self.config.sampling_interval > 0:
+                self.scheduler.add_sampling_job(self.sample_collectors, self.config.sampling_interval)
+            else:
+                self.scheduler.remove_job('sampling')
+
+        if 'probes' in self.collectors:
+            if probes_toggled or self.config.probe_interval != previous['probe_interval']:
+                self.scheduler.add_probe_job(self.run_probes, self.config.probe_interval)
+        elif probes_toggled:
+            self.scheduler.remove_job('probes')
+
     def poll_and_execute_commands(self):
         """Poll for commands and execute them"""
         try:
@@ -147,6 +490,8 @@ class Agent:
             for command in commands:
                 self.execute_command(command)
 
+        except CircuitOpenError as e:
+            logging.debug(f"Skipped: {e}")
         except (APIError, AuthenticationError) as e:
             logging.error(f"Failed to poll commands: {e}")
         except Exception as e:
@@ -160,10 +505,35 @@ class Agent:
 
         logging.info(f"Executing command {command_id} of type {command_type}")
 
+        # Long-running handlers must not hold up polling and the other jobs
+        handler = get_handler(command_type)
+        if getattr(handler, 'streaming', False):
+            with self._commands_lock:
+                if command_id in self.running_commands:
+                    logging.info(f"Command {command_id} is already running")
+                    return
+                self.running_commands.add(command_id)
+            threading.Thread(
+                target=self._run_background,
+                args=(handler, command_id, payload),
+                name=f"command-{command_id}",
+                daemon=True
+            ).start()
+            return
+
+        self._run_handler(handler, command_id, payload, command_type)
+
+    def _run_background(self, handler, command_id, payload):
+        """Run a streaming handler on its own thread until its result is sent"""
         try:
-            # Get the appropriate handler for this command type
-            handler = get_handler(command_type)
+            self._run_handler(handler, command_id, payload)
+        finally:
+            with self._commands_lock:
+                self.running_commands.discard(command_id)
 
+    def _run_handler(self, handler, command_id, payload, command_type=None):
+        """Run a command handler and send the result"""
+        try:
             if not handler:
                 logging.error(f"No handler found for command type: {command_type}")
                 self.api_client.send_command_result(
@@ -174,7 +544,10 @@ class Agent:
                 return
 
             # Execute the command
-            result = handler.handle(payload)
+            if getattr(handler, 'streaming', False):
+                result = handler.handle(payload, command_id)
+            else:
+                result = handler.handle(payload)
 
             # Send the result back to the server
             status = result.get('status')
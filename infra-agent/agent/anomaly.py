@@ -0,0 +1,269 @@
+"""
+Incremental anomaly detection on high-frequency samples
+"""
+import time
+import logging
+import datetime
+import threading
+
+
+class EWMABaseline:
+    """Exponentially weighted moving mean and variance, O(1) per update"""
+
+    __slots__ = ('alpha', 'mean', 'var', 'count')
+
+    def __init__(self, alpha=0.05):
+        """
+        Initialize the baseline
+
+        Args:
+            alpha: Smoothing factor; higher values adapt faster
+        """
+        self.alpha = alpha
+        self.mean = 0.0
+        self.var = 0.0
+        self.count = 0
+
+    def zscore(self, value):
+        """
+        Score a value against the current baseline
+
+        Args:
+            value: Observed value
+
+        Returns:
+            float: Standard deviations from the mean (0 until variance is known)
+        """
+        if self.count < 2 or self.var <= 0:
+            return 0.0
+        return (value - self.mean) / self.var ** 0.5
+
+    def update(self, value):
+        """
+        Fold a value into the baseline
+
+        Args:
+            value: Observed value
+        """
+        self.count += 1
+        if self.count == 1:
+            self.mean = value
+            return
+        diff = value - self.mean
+        increment = self.alpha * diff
+        self.mean += increment
+        self.var = (1 - self.alpha) * (self.var + diff * increment)
+
+
+class AnomalyRule:
+    """Threshold and z-score rule for a single metric with debounce and hysteresis"""
+
+    __slots__ = ('name', 'metric', 'above', 'below', 'zscore', 'warmup',
+                 'for_samples', 'clear_samples', 'hysteresis', 'cooldown',
+                 'baseline', 'firing', 'breaches', 'clears', 'last_fired')
+
+    def __init__(self, name, metric, above=None, below=None, zscore=None, alpha=0.05,
+                 warmup=30, for_samples=3, clear_samples=3, hysteresis=0.05, cooldown=300):
+        """
+        Initialize the rule
+
+        Args:
+            name: Rule name reported in events
+            metric: Metric key as '<collector>.<metric>', e.g. 'memory.usagePercent'
+            above: Breach when the value is above this threshold
+            below: Breach when the value is below this threshold
+            zscore: Breach when the absolute z-score exceeds this value
+            alpha: EWMA smoothing factor for the baseline
+            warmup: Samples required before z-scores are evaluated
+            for_samples: Consecutive breaching samples required to fire
+            clear_samples: Consecutive normal samples required to resolve
+            hysteresis: Fraction by which thresholds are relaxed while firing
+            cooldown: Minimum seconds between two firings of this rule
+        """
+        if above is None and below is None and zscore is None:
+            raise ValueError(f"Anomaly rule {name} needs at least one of above, below or zscore")
+
+        self.name = name
+        self.metric = metric
+        self.above = above
+        self.below = below
+        self.zscore = zscore
+        self.warmup = warmup
+        self.for_samples = max(1, for_samples)
+        self.clear_samples = max(1, clear_samples)
+        self.hysteresis = hysteresis
+        self.cooldown = cooldown
+        self.baseline = EWMABaseline(alpha)
+        self.firing = False
+        self.breaches = 0
+        self.clears = 0
+        self.last_fired = None
+
+    @classmethod
+    def from_dict(cls, name, data):
+        """
+        Build a rule from a config or server dictionary
+
+        Args:
+            name: Rule name
+            data: Rule settings using the keyword names of __init__
+                (camelCase forSamples/clearSamples are also accepted)
+
+        Returns:
+            AnomalyRule: New rule
+        """
+        def number(key, alt=None, cast=float):
+            value = data.get(key, data.get(alt) if alt else None)
+            return None if value in (None, '') else cast(value)
+
+        kwargs = {
+            'above': number('above'),
+            'below': number('below'),
+            'zscore': number('zscore'),
+        }
+        optional = {
+            'alpha': number('alpha'),
+            'warmup': number('warmup', cast=int),
+            'for_samples': number('for_samples', 'forSamples', int),
+            'clear_samples': number('clear_samples', 'clearSamples', int),
+            'hysteresis': number('hysteresis'),
+            'cooldown': number('cooldown'),
+        }
+        kwargs.update({key: value for key, value in optional.items() if value is not None})
+        return cls(name, data['metric'], **kwargs)
+
+    def _breached(self, value, z):
+        """Return the reason the value breaches the rule, or None"""
+        relax = self.hysteresis if self.firing else 0.0
+
+        if self.above is not None and value > self.above * (1 - relax):
+            return f"value {value:.2f} above {self.above}"
+        if self.below is not None and value < self.below * (1 + relax):
+            return f"value {value:.2f} below {self.below}"
+        if (self.zscore is not None and self.baseline.count >= self.warmup
+                and abs(z) > self.zscore * (1 - relax)):
+            return f"z-score {z:.2f} beyond {self.zscore}"
+        return None
+
+    def observe(self, value, now):
+        """
+        Evaluate a sample and update the rule state
+
+        Args:
+            value: Sample value
+            now: Sample timestamp in seconds
+
+        Returns:
+            dict: Event to push when the rule fires or resolves, else None
+        """
+        z = self.baseline.zscore(value)
+        reason = self._breached(value, z)
+        event = None
+
+        if reason:
+            self.clears = 0
+            self.breaches += 1
+            if (not self.firing and self.breaches >= self.for_samples and
+                    (self.last_fired is None or now - self.last_fired >= self.cooldown)):
+                self.firing = True
+                self.last_fired = now
+                event = self._event('FIRING', value, z, reason, now)
+        else:
+            self.breaches = 0
+            if self.firing:
+                self.clears += 1
+                if self.clears >= self.clear_samples:
+                    self.firing = False
+                    self.clears = 0
+                    event = self._event('RESOLVED', value, z, None, now)
+
+        self.baseline.update(value)
+        return event
+
+    def _event(self, state, value, z, reason, now):
+        """Build an event payload"""
+        return {
+            'type': 'ANOMALY',
+            'state': state,
+            'rule': self.name,
+            'metric': self.metric,
+            'value': round(value, 2),
+            'baseline': round(self.baseline.mean, 2),
+            'zscore': round(z, 2),
+            'reason': reason,
+            'timestamp': datetime.datetime.utcfromtimestamp(now).isoformat() + 'Z'
+        }
+
+
+class AnomalyDetector:
+    """Evaluates anomaly rules against every sample and emits events"""
+
+    def __init__(self, rules=None, on_event=None):
+        """
+        Initialize the detector
+
+        Args:
+            rules: Mapping of rule name to rule settings
+            on_event: Callable invoked with each event dict
+        """
+        self.on_event = on_event
+        self.rules_by_metric = {}
+        self.version = None
+        self._lock = threading.Lock()
+        self.update_rules(rules or {})
+
+    def update_rules(self, rules, version=None):
+        """
+        Atomically replace the rule set
+
+        Baselines of rules whose name and metric are unchanged are kept so a
+        rule push does not restart warmup.
+
+        Args:
+            rules: Mapping of rule name to rule settings
+            version: Optional version identifier of the rule set
+
+        Raises:
+            ValueError: If a rule is invalid
+        """
+        built = {}
+        for name, data in rules.items():
+            rule = AnomalyRule.from_dict(name, data)
+            built.setdefault(rule.metric, []).append(rule)
+
+        with self._lock:
+            previous = {(rule.name, rule.metric): rule
+                        for metric_rules in self.rules_by_metric.values() for rule in metric_rules}
+            for metric_rules in built.values():
+                for rule in metric_rules:
+                    old = previous.get((rule.name, rule.metric))
+                    if old is not None:
+                        rule.baseline = old.baseline
+                        rule.firing = old.firing
+                        rule.last_fired = old.last_fired
+            self.rules_by_metric = built
+            self.version = version
+
+        logging.info(f"Loaded {sum(len(r) for r in built.values())} anomaly rules")
+
+    def observe(self, metric, value, now=None):
+        """
+        Evaluate a sample against the rules for its metric
+
+        Args:
+            metric: Metric key as '<collector>.<metric>'
+            value: Sample value
+            now: Sample timestamp (defaults to time.time())
+        """
+        rules = self.rules_by_metric.get(metric)
+        if not rules:
+            return
+
+        now = time.time() if now is None else now
+        with self._lock:
+            events = [event for event in (rule.observe(value, now) for rule in rules) if event]
+
+        for event in events:
+            logging.warning(f"Anomaly {event['state'].lower()}: {event['rule']} ({event['metric']}={event['value']})")
+            if self.on_event:
+                self.on_event(event)
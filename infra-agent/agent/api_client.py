@@ -2,15 +2,18 @@
 API client for communicating with the Infrawatch backend
 """
 import json
+import gzip
 import logging
-import requests
-from requests.exceptions import RequestException
-from .exceptions import APIError, AuthenticationError
+from .backoff import CircuitBreaker, parse_retry_after
+from .exceptions import APIError, AuthenticationError, ServerBusyError, CircuitOpenError
+
+# Status codes that signal an overloaded or unavailable backend
+OVERLOAD_STATUS_CODES = (429, 502, 503, 504)
 
 class APIClient:
     """Client for interacting with the Infrawatch API"""
 
-    def __init__(self, server_url, vm_id, agent_token):
+    def __init__(self, server_url, vm_id, agent_token, on_circuit_open=None, lightweight=False):
         """
         Initialize API client
 
@@ -18,6 +21,10 @@ class APIClient:
             server_url: Base URL of the Infrawatch server
             vm_id: ID of the VM this agent is running on
             agent_token: Authentication token for the agent
+            on_circuit_open: Callable invoked with (endpoint, retry_at) when an
+                endpoint's circuit opens, so callers can pause related work
+            lightweight: Use the urllib transport instead of requests to keep
+                the agent's memory footprint small
         """
         self.server_url = server_url.rstrip('/')
         self.vm_id = vm_id
@@ -26,13 +33,118 @@ class APIClient:
             'Content-Type': 'application/json',
             'X-Agent-Token': agent_token
         }
+        self.on_circuit_open = on_circuit_open
+        self.breakers = {}
+
+        # Import the transport lazily so the low profile never loads requests
+        if lightweight:
+            from . import http_lite as transport
+        else:
+            import requests as transport
+        self.transport = transport
+
+    def get_breaker(self, endpoint):
+        """
+        Get the circuit breaker for an endpoint
+
+        Args:
+            endpoint: Endpoint name, e.g. 'monitoring'
+
+        Returns:
+            CircuitBreaker: Breaker for the endpoint
+        """
+        breaker = self.breakers.get(endpoint)
+        if breaker is None:
+            breaker = self.breakers.setdefault(endpoint, CircuitBreaker(endpoint))
+        return breaker
+
+    def _failed(self, breaker, retry_after=None):
+        """Record a failure and notify the caller if the circuit opened"""
+        retry_at = breaker.record_failure(retry_after)
+        if retry_at is not None and self.on_circuit_open:
+            self.on_circuit_open(breaker.name, retry_at)
+
+    def _request(self, endpoint, method, url, expected_status, timeout, action, headers=None, **kwargs):
+        """
+        Make a request through the endpoint's circuit breaker
+
+        Args:
+            endpoint: Endpoint name for the circuit breaker
+            method: HTTP method
+            url: Request URL
+            expected_status: Status code(s) treated as success
+            timeout: Request timeout in seconds
+            action: Description used in error messages, e.g. 'send heartbeat'
+            headers: Extra request headers (optional)
+            **kwargs: Extra arguments for the transport's request()
+
+        Returns:
+            Decoded JSON body of the successful response
+
+        Raises:
+            CircuitOpenError: If the circuit is open and the call was not made
+            ServerBusyError: If the server is overloaded
+            APIError: If the server returns an error or a body that is not JSON
+            AuthenticationError: If authentication fails
+        """
+        breaker = self.get_breaker(endpoint)
+        if not breaker.allow():
+            raise CircuitOpenError(endpoint, breaker.retry_time())
+
+        try:
+            response = self.transport.request(
+                method,
+                url,
+                headers=dict(self.headers, **headers) if headers else self.headers,
+                timeout=timeout,
+                **kwargs
+            )
+        except self.transport.RequestException as e:
+            self._failed(breaker)
+            logging.error(f"Failed to {action}: {e}")
+            raise APIError(f"Failed to {action}: {e}")
+        except BaseException:
+            # Never leave a half-open probe outstanding
+            self._failed(breaker)
+            raise
+
+        if response.status_code in OVERLOAD_STATUS_CODES:
+            retry_after = parse_retry_after(response.headers.get('Retry-After'))
+            self._failed(breaker, retry_after)
+            logging.warning(f"Server busy ({response.status_code}) while trying to {action}")
+            raise ServerBusyError(f"API error: {response.status_code}, server busy", retry_after,
+                                  response.status_code)
+
+        if response.status_code >= 500:
+            self._failed(breaker)
+        else:
+            # The backend answered; client errors are not overload
+            breaker.record_success()
+
+        if response.status_code == 401:
+            logging.error("Authentication failed. Check agent token.")
+            raise AuthenticationError("Authentication failed. Check agent token.")
+
+        if isinstance(expected_status, int):
+            expected_status = (expected_status,)
+        if response.status_code not in expected_status:
+            logging.error(f"API error: {response.status_code}, {response.text}")
+            raise APIError(f"API error: {response.status_code}, {response.text}", response.status_code)
+
+        # A proxy or error page can answer 2xx with something other than JSON
+        try:
+            return response.json()
+        except ValueError as e:
+            logging.error(f"Failed to {action}: invalid response body: {e}")
+            raise APIError(f"Failed to {action}: invalid response body: {e}", response.status_code)
 
-    def send_monitoring_data(self, data):
+    def send_monitoring_data(self, data, compress=False):
         """
         Send monitoring data to the server
 
         Args:
             data: Dictionary containing monitoring data
+            compress: gzip-compress the request body
 
         Returns:
             Response from the server
@@ -44,33 +156,62 @@ class APIClient:
         url = f"{self.server_url}/api/v1/monitoring/{self.vm_id}"
         logging.debug(f"Sending monitoring data to {url}")
 
-        try:
-            response = requests.post(
-                url,
-                headers=self.headers,
-                json=data,
-                timeout=10
-            )
+        if compress:
+            result = self._request('monitoring', 'POST', url, 201, 10, 'send monitoring data',
+                                   headers={'Content-Encoding': 'gzip'},
+                                   data=gzip.compress(json.dumps(data).encode('utf-8')))
+        else:
+            result = self._request('monitoring', 'POST', url, 201, 10, 'send monitoring data', json=data)
 
-            if response.status_code == 401:
-                logging.error("Authentication failed. Check agent token.")
-                raise AuthenticationError("Authentication failed. Check agent token.")
+        logging.debug("Monitoring data sent successfully")
+        return result
 
-            if response.status_code != 201:
-                logging.error(f"API error: {response.status_code}, {response.text}")
-                raise APIError(f"API error: {response.status_code}, {response.text}")
+    def send_monitoring_batch(self, samples, compress=False):
+        """
+        Send several monitoring samples in one request
 
-            logging.debug("Monitoring data sent successfully")
-            return response.json()
+        Uses the batch endpoint, which answers every sample separately.
+
+        Args:
+            samples: Monitoring payloads, oldest first
+            compress: gzip-compress the request body
 
-        except RequestException as e:
-            logging.error(f"Failed to send monitoring data: {e}")
-            raise APIError(f"Failed to send monitoring data: {e}")
+        Returns:
+            list: (status code, response body) per sample, in order
 
-    def send_heartbeat(self):
+        Raises:
+            APIError: If the server rejects the whole batch
+            AuthenticationError: If authentication fails
+        """
+        url = f"{self.server_url}/api/v1/agent/{self.vm_id}/batch"
+        batch = {
+            'items': [
+                {'id': index, 'kind': 'monitoring', 'vmId': self.vm_id, 'token': self.agent_token, 'body': sample}
+                for index, sample in enumerate(samples)
+            ]
+        }
+        logging.debug(f"Sending {len(samples)} monitoring samples to {url}")
+
+        if compress:
+            result = self._request('monitoring', 'POST', url, 200, 30, 'send monitoring batch',
+                                   headers={'Content-Encoding': 'gzip'},
+                                   data=gzip.compress(json.dumps(batch).encode('utf-8')))
+        else:
+            result = self._request('monitoring', 'POST', url, 200, 30, 'send monitoring batch', json=batch)
+
+        results = {item.get('id'): item for item in result.get('results', [])}
+        return [
+            (results[index].get('status', 500), results[index].get('body')) if index in results else (500, None)
+            for index in range(len(samples))
+        ]
+
+    def send_heartbeat(self, status=None):
         """
         Send heartbeat to the server
 
+        Args:
+            status: Agent status reported with the heartbeat (optional)
+
         Returns:
             Response from the server with nextExpectedInSeconds
 
@@ -81,28 +222,9 @@ class APIClient:
         url = f"{self.server_url}/api/v1/monitoring/{self.vm_id}/heartbeat"
         logging.debug(f"Sending heartbeat to {url}")
 
-        try:
-            response = requests.post(
-                url,
-                headers=self.headers,
-                timeout=5
-            )
-
-            if response.status_code == 401:
-                logging.error("Authentication failed. Check agent token.")
-                raise AuthenticationError("Authentication failed. Check agent token.")
-
-            if response.status_code != 200:
-                logging.error(f"API error: {response.status_code}, {response.text}")
-                raise APIError(f"API error: {response.status_code}, {response.text}")
-
-            data = response.json()
-            logging.debug(f"Heartbeat sent successfully. Next expected in {data.get('nextExpectedInSeconds', '?')} seconds")
-            return data
-
-        except RequestException as e:
-            logging.error(f"Failed to send heartbeat: {e}")
-            raise APIError(f"Failed to send heartbeat: {e}")
+        data = self._request('heartbeat', 'POST', url, 200, 5, 'send heartbeat', json=status)
+        logging.debug(f"Heartbeat sent successfully. Next expected in {data.get('nextExpectedInSeconds', '?')} seconds")
+        return data
 
     def poll_commands(self):
         """
@@ -118,28 +240,9 @@ class APIClient:
         url = f"{self.server_url}/api/v1/agent/{self.vm_id}/commands"
         logging.debug(f"Polling commands from {url}")
 
-        try:
-            response = requests.get(
-                url,
-                headers=self.headers,
-                timeout=10
-            )
-
-            if response.status_code == 401:
-                logging.error("Authentication failed. Check agent token.")
-                raise AuthenticationError("Authentication failed. Check agent token.")
-
-            if response.status_code != 200:
-                logging.error(f"API error: {response.status_code}, {response.text}")
-                raise APIError(f"API error: {response.status_code}, {response.text}")
-
-            commands = response.json()
-            logging.debug(f"Received {len(commands)} commands")
-            return commands
-
-        except RequestException as e:
-            logging.error(f"Failed to poll commands: {e}")
-            raise APIError(f"Failed to poll commands: {e}")
+        commands = self._request('commands', 'GET', url, 200, 10, 'poll commands')
+        logging.debug(f"Received {len(commands)} commands")
+        return commands
 
     def send_command_result(self, command_id, status, message, data=None):
         """
@@ -170,25 +273,70 @@ class APIClient:
         if data:
             payload["data"] = data
 
-        try:
-            response = requests.post(
-                url,
-                headers=self.headers,
-                json=payload,
-                timeout=10
-            )
+        result = self._request('command_result', 'POST', url, 200, 10, 'send command result', json=payload)
 
-            if response.status_code == 401:
-                logging.error("Authentication failed. Check agent token.")
-                raise AuthenticationError("Authentication failed. Check agent token.")
+        logging.debug("Command result sent successfully")
+        return result
 
-            if response.status_code != 200:
-                logging.error(f"API error: {response.status_code}, {response.text}")
-                raise APIError(f"API error: {response.status_code}, {response.text}")
+    def send_command_output(self, command_id, chunk):
+        """
+        Upload a chunk of a running command's output
 
-            logging.debug("Command result sent successfully")
-            return response.json()
+        Args:
+            command_id: ID of the command
+            chunk: Chunk with seq, stdout, stderr, progress and done flag
+
+        Returns:
+            Response from the server, with cancel set if the command was cancelled
+
+        Raises:
+            APIError: If the server returns an error
+            AuthenticationError: If authentication fails
+        """
+        url = f"{self.server_url}/api/v1/agent/{self.vm_id}/commands/{command_id}/output"
+        logging.debug(f"Sending output chunk {chunk.get('seq')} for command {command_id}")
+
+        return self._request('command_output', 'POST', url, 200, 30, 'send command output', json=chunk)
+
+    def send_logs(self, batch):
+        """
+        Ship a batch of log lines, gzip-compressed
+
+        Args:
+            batch: Batch with segments of lines per file
+
+        Returns:
+            Response from the server
+
+        Raises:
+            APIError: If the server returns an error
+            AuthenticationError: If authentication fails
+        """
+        url = f"{self.server_url}/api/v1/agent/{self.vm_id}/logs"
+        data = gzip.compress(json.dumps(batch).encode('utf-8'))
+        logging.debug(f"Sending {len(batch['segments'])} log segments ({len(data)} bytes) to {url}")
+
+        return self._request('logs', 'POST', url, 200, 30, 'send logs',
+                             headers={'Content-Encoding': 'gzip'}, data=data)
+
+    def send_event(self, event):
+        """
+        Push an out-of-band event (e.g. an anomaly) to the server
+
+        Args:
+            event: Event dictionary
+
+        Returns:
+            Response from the server
+
+        Raises:
+            APIError: If the server returns an error
+            AuthenticationError: If authentication fails
+        """
+        url = f"{self.server_url}/api/v1/agent/{self.vm_id}/events"
+        logging.debug(f"Sending {event.get('type')} event to {url}")
+
+        result = self._request('events', 'POST', url, (200, 201), 5, 'send event', json=event)
 
-        except RequestException as e:
-            logging.error(f"Failed to send command result: {e}")
-            raise APIError(f"Failed to send command result: {e}")
\ No newline at end of file
+        logging.debug("Event sent successfully")
+        return result
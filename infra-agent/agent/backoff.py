@@ -0,0 +1,166 @@
+"""
+Backoff and circuit breaking for calls to the Infrawatch backend
+"""
+import time
+import random
+import logging
+import threading
+import datetime
+from email.utils import parsedate_to_datetime
+
+# Circuit breaker states
+CLOSED = 'CLOSED'
+OPEN = 'OPEN'
+HALF_OPEN = 'HALF_OPEN'
+
+
+def parse_retry_after(value):
+    """
+    Parse a Retry-After header
+
+    Args:
+        value: Header value, either delay seconds or an HTTP date
+
+    Returns:
+        float: Seconds to wait, or None if the header is missing or invalid
+    """
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError, IndexError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=datetime.timezone.utc)
+    return max((retry_at - datetime.datetime.now(datetime.timezone.utc)).total_seconds(), 0.0)
+
+
+def full_jitter(attempt, base, cap):
+    """
+    Exponential backoff delay with full jitter
+
+    Args:
+        attempt: Number of consecutive failures (1 for the first)
+        base: Delay scale in seconds
+        cap: Maximum delay in seconds
+
+    Returns:
+        float: Random delay in [0, min(cap, base * 2 ** (attempt - 1))]
+    """
+    return random.uniform(0, min(cap, base * 2 ** max(attempt - 1, 0)))
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker for one backend endpoint
+
+    CLOSED: calls pass; consecutive failures are counted.
+    OPEN: calls are refused until the backoff delay has elapsed.
+    HALF_OPEN: a single probe call at a time is allowed; ``success_threshold``
+    consecutive successes close the circuit, any failure re-opens it with a
+    longer delay.
+    """
+
+    def __init__(self, name, failure_threshold=3, success_threshold=2, base_delay=5.0, max_delay=300.0):
+        """
+        Initialize the breaker
+
+        Args:
+            name: Endpoint name used in logs
+            failure_threshold: Consecutive failures that open the circuit
+            success_threshold: Consecutive half-open successes that close it
+            base_delay: Backoff scale in seconds
+            max_delay: Maximum backoff delay in seconds
+        """
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.success_threshold = success_threshold
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+        self.state = CLOSED
+        self.failures = 0
+        self.opened = 0
+        self.successes = 0
+        self.retry_at = 0.0
+        self.probing = False
+        self._lock = threading.Lock()
+
+    def allow(self):
+        """
+        Check whether a call may be made now
+
+        Returns:
+            bool: True if the call may proceed
+        """
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+            if self.state == OPEN:
+                if time.time() < self.retry_at:
+                    return False
+                self.state = HALF_OPEN
+                self.successes = 0
+                logging.info(f"Circuit for {self.name} half-open, probing")
+            if self.probing:
+                return False
+            self.probing = True
+            return True
+
+    def retry_time(self):
+        """
+        Time a call refused by allow() may be tried again
+
+        Returns:
+            float: End of the open delay, or one base delay from now while
+                a half-open probe is in flight
+        """
+        with self._lock:
+            if self.probing:
+                return time.time() + self.base_delay
+            return self.retry_at
+
+    def record_success(self):
+        """Record a successful call"""
+        with self._lock:
+            self.failures = 0
+            self.probing = False
+            if self.state == HALF_OPEN:
+                self.successes += 1
+                if self.successes >= self.success_threshold:
+                    self.state = CLOSED
+                    self.opened = 0
+                    logging.info(f"Circuit for {self.name} closed")
+
+    def record_failure(self, retry_after=None):
+        """
+        Record a failed call
+
+        Args:
+            retry_after: Delay requested by the server; opens the circuit at once
+
+        Returns:
+            float: Time the circuit re-admits calls if it is now open, else None
+        """
+        with self._lock:
+            self.failures += 1
+            self.probing = False
+
+            if (self.state == CLOSED and retry_after is None and
+                    self.failures < self.failure_threshold):
+                return None
+
+            self.opened += 1
+            if retry_after is not None:
+                # Honour the server, spreading clients over one base delay
+                delay = min(retry_after, self.max_delay) + random.uniform(0, self.base_delay)
+            else:
+                delay = full_jitter(self.opened, self.base_delay, self.max_delay)
+
+            self.state = OPEN
+            self.retry_at = time.time() + delay
+            logging.warning(f"Circuit for {self.name} open for {delay:.1f}s after {self.failures} failures")
+            return self.retry_at
@@ -5,5 +5,10 @@ from .cpu import CPUCollector
 from .memory import MemoryCollector
 from .disk import DiskCollector
 from .network import NetworkCollector
+from .cgroup import CgroupCollector
+from .probes import ProbeCollector
+from .pressure import PressureCollector
+from .tcp import TcpCollector
 
-__all__ = ['CPUCollector', 'MemoryCollector', 'DiskCollector', 'NetworkCollector']
\ No newline at end of file
+__all__ = ['CPUCollector', 'MemoryCollector', 'DiskCollector', 'NetworkCollector', 'CgroupCollector', 'ProbeCollector',
+           'PressureCollector', 'TcpCollector']
\ No newline at end of file
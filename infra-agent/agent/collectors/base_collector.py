@@ -2,7 +2,9 @@
 Base collector class for the Infrawatch Agent
 """
 import logging
+import threading
 from ..exceptions import CollectorError
+from ..sketch import DDSketch
 
 class BaseCollector:
     """Base class for all data collectors"""
@@ -10,6 +12,11 @@ class BaseCollector:
     def __init__(self):
         """Initialize the collector"""
         self.name = self.__class__.__name__
+        self.sketches = {}
+        self.sketch_max_bins = 2048
+        self._sketch_lock = threading.Lock()
+        # Filled in place by _sample_impl() so sampling does not allocate per call
+        self.sample_values = {}
     
     def collect(self):
         """
@@ -39,4 +46,57 @@ class BaseCollector:
         Returns:
             dict: Collected data
         """
-        raise NotImplementedError("Subclasses must implement _collect_impl()")
\ No newline at end of file
+        raise NotImplementedError("Subclasses must implement _collect_impl()")
+
+    def sample(self):
+        """
+        Take a high-frequency sample and add it to the interval sketches
+
+        Returns:
+            dict: Sampled metric values, or None if nothing was sampled. The
+                dict is reused by the next sample; copy it to keep it.
+
+        Raises:
+            CollectorError: If sampling fails
+        """
+        try:
+            values = self._sample_impl()
+        except Exception as e:
+            raise CollectorError(f"Error sampling data with {self.name}: {e}")
+
+        if not values:
+            return None
+
+        with self._sketch_lock:
+            for metric, value in values.items():
+                sketch = self.sketches.get(metric)
+                if sketch is None:
+                    sketch = self.sketches[metric] = DDSketch(max_bins=self.sketch_max_bins)
+                sketch.add(value)
+
+        return values
+
+    def _sample_impl(self):
+        """
+        Implementation of high-frequency sampling
+
+        Collectors that support intra-interval distributions override this,
+        ideally updating and returning self.sample_values.
+
+        Returns:
+            dict: Metric name to numeric value, or None to skip this sample
+        """
+        return None
+
+    def flush_distributions(self):
+        """
+        Summarise and reset the sketches accumulated since the last flush
+
+        Returns:
+            dict: Metric name to quantile summary (empty if nothing was sampled)
+        """
+        with self._sketch_lock:
+            sketches = self.sketches
+            self.sketches = {}
+
+        return {metric: sketch.summary() for metric, sketch in sketches.items() if sketch.count}
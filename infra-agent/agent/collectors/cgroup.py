@@ -0,0 +1,203 @@
+"""
+cgroup v2 per-workload resource collector
+"""
+import os
+import time
+import heapq
+import logging
+from .base_collector import BaseCollector
+
+class CgroupCollector(BaseCollector):
+    """
+    Collector for per-cgroup CPU, memory, I/O and throttling metrics
+
+    cgroup v2 counters include every descendant, so only leaf cgroups are
+    ranked and reported; otherwise a slice and the services in it would
+    count the same usage twice. A cgroup at max_depth counts as a leaf and
+    reports its whole subtree.
+    """
+
+    def __init__(self, root='/sys/fs/cgroup', top_n=10, max_depth=3):
+        """
+        Initialize cgroup collector
+
+        Args:
+            root: Mount point of the cgroup v2 unified hierarchy
+            top_n: Number of leaf cgroups reported, ranked by CPU usage
+            max_depth: Deepest level of the hierarchy walked below the root
+        """
+        super().__init__()
+        self.root = root
+        self.top_n = top_n
+        self.max_depth = max_depth
+
+        # Cached hierarchy: cgroup directory -> mtime when last walked
+        self.dir_mtimes = {}
+        self.cgroups = []
+
+        # Previous counters per cgroup: (time, usage_usec, throttled_usec, nr_throttled, rbytes, wbytes)
+        self.prev = {}
+
+    def is_available(self):
+        """Return True if the root is a cgroup v2 hierarchy"""
+        return os.path.exists(os.path.join(self.root, 'cgroup.controllers'))
+
+    def _hierarchy_changed(self):
+        """Return True if any cached directory was modified or removed"""
+        if not self.dir_mtimes:
+            return True
+        for path, mtime in self.dir_mtimes.items():
+            try:
+                if os.stat(path).st_mtime != mtime:
+                    return True
+            except OSError:
+                return True
+        return False
+
+    def _walk(self):
+        """Rebuild the cached list of leaf cgroup directories"""
+        dir_mtimes = {}
+        cgroups = []
+        parents = set()
+        stack = [(self.root, 0)]
+
+        while stack:
+            path, depth = stack.pop()
+            try:
+                dir_mtimes[path] = os.stat(path).st_mtime
+                entries = os.scandir(path)
+            except OSError:
+                continue
+
+            with entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        parents.add(path)
+                        cgroups.append(entry.path)
+                        if depth + 1 < self.max_depth:
+                            stack.append((entry.path, depth + 1))
+
+        self.dir_mtimes = dir_mtimes
+        self.cgroups = [path for path in cgroups if path not in parents]
+
+        # Forget counters of cgroups that no longer exist
+        live = set(self.cgroups)
+        for path in [path for path in self.prev if path not in live]:
+            del self.prev[path]
+
+        logging.debug(f"Walked cgroup hierarchy: {len(cgroups)} cgroups, {len(self.cgroups)} leaves")
+
+    @staticmethod
+    def _read(path):
+        """Read a small control file, returning None if it is missing"""
+        try:
+            with open(path) as f:
+                return f.read()
+        except OSError:
+            return None
+
+    @staticmethod
+    def _parse_flat_keyed(text):
+        """Parse 'key value' lines (cpu.stat) into a dict of ints"""
+        values = {}
+        for line in text.splitlines():
+            key, _, value = line.partition(' ')
+            if value:
+                values[key] = int(value)
+        return values
+
+    @staticmethod
+    def _parse_io_stat(text):
+        """Sum rbytes and wbytes across all devices in io.stat"""
+        rbytes = wbytes = 0
+        for line in text.splitlines():
+            for field in line.split()[1:]:
+                key, _, value = field.partition('=')
+                if key == 'rbytes':
+                    rbytes += int(value)
+                elif key == 'wbytes':
+                    wbytes += int(value)
+        return rbytes, wbytes
+
+    def _read_cgroup(self, path, now):
+        """
+        Read one cgroup and compute rates against its previous counters
+
+        Args:
+            path: cgroup directory
+            now: Collection timestamp
+
+        Returns:
+            dict: cgroup metrics, or None if the cgroup vanished or has no CPU stats
+        """
+        cpu_text = self._read(os.path.join(path, 'cpu.stat'))
+        if cpu_text is None:
+            return None
+
+        cpu = self._parse_flat_keyed(cpu_text)
+        usage = cpu.get('usage_usec', 0)
+        throttled_usec = cpu.get('throttled_usec', 0)
+        nr_throttled = cpu.get('nr_throttled', 0)
+
+        io_text = self._read(os.path.join(path, 'io.stat'))
+        rbytes, wbytes = self._parse_io_stat(io_text) if io_text else (0, 0)
+
+        memory_current = self._read(os.path.join(path, 'memory.current'))
+        memory_max = self._read(os.path.join(path, 'memory.max'))
+
+        prev = self.prev.get(path)
+        self.prev[path] = (now, usage, throttled_usec, nr_throttled, rbytes, wbytes)
+
+        cpu_percent = throttled_percent = read_rate = write_rate = 0.0
+        throttled_count = 0
+        if prev is not None and now > prev[0]:
+            elapsed_usec = (now - prev[0]) * 1e6
+            # Deltas are clamped at zero in case a cgroup was recreated
+            cpu_percent = max(usage - prev[1], 0) / elapsed_usec * 100
+            throttled_percent = max(throttled_usec - prev[2], 0) / elapsed_usec * 100
+            throttled_count = max(nr_throttled - prev[3], 0)
+            read_rate = max(rbytes - prev[4], 0) / (now - prev[0])
+            write_rate = max(wbytes - prev[5], 0) / (now - prev[0])
+
+        memory_max = memory_max.strip() if memory_max else 'max'
+
+        return {
+            'path': '/' + os.path.relpath(path, self.root),
+            'cpuPercent': round(cpu_percent, 2),
+            'throttledPercent': round(throttled_percent, 2),
+            'nrThrottled': throttled_count,
+            'memoryCurrentMB': round(int(memory_current) / (1024 * 1024), 2) if memory_current else 0.0,
+            'memoryMaxMB': None if memory_max == 'max' else round(int(memory_max) / (1024 * 1024), 2),
+            'ioReadBytesPerSec': round(read_rate, 2),
+            'ioWriteBytesPerSec': round(write_rate, 2)
+        }
+
+    def _collect_impl(self):
+        """
+        Collect per-cgroup resource usage
+
+        Returns:
+            list: Top-N leaf cgroups by CPU usage, or None if cgroup v2 is unavailable
+        """
+        if not self.is_available():
+            return None
+
+        if self._hierarchy_changed():
+            self._walk()
+
+        now = time.time()
+        results = []
+        for path in self.cgroups:
+            try:
+                data = self._read_cgroup(path, now)
+            except ValueError as e:
+                logging.debug(f"Skipping cgroup {path}: {e}")
+                continue
+            if data is not None:
+                results.append(data)
+
+        return heapq.nlargest(
+            self.top_n,
+            results,
+            key=lambda item: (item['cpuPercent'], item['memoryCurrentMB'])
+        )
@@ -8,6 +8,11 @@ from .base_collector import BaseCollector
 class CPUCollector(BaseCollector):
     """Collector for CPU metrics"""
     
+    def __init__(self):
+        """Initialize CPU collector with previous sample counters"""
+        super().__init__()
+        self.prev_sample_times = None
+    
     def _collect_impl(self):
         """
         Collect CPU usage data
@@ -21,4 +26,28 @@ class CPUCollector(BaseCollector):
         # Return formatted CPU data
         return {
             'usagePercent': cpu_percent
-        }
\ No newline at end of file
+        }
+    
+    def _sample_impl(self):
+        """
+        Sample CPU utilisation since the previous sample
+        
+        Uses raw cpu_times() deltas so sampling does not disturb the
+        blocking measurement in _collect_impl().
+        
+        Returns:
+            dict: CPU usage sample, or None on the first call
+        """
+        times = psutil.cpu_times()
+        # guest and guest_nice are already counted in user and nice on Linux
+        total = sum(times) - getattr(times, 'guest', 0) - getattr(times, 'guest_nice', 0)
+        idle = times.idle + getattr(times, 'iowait', 0)
+        
+        prev = self.prev_sample_times
+        self.prev_sample_times = (total, idle)
+        if prev is None or total <= prev[0]:
+            return None
+        
+        busy = 1 - (idle - prev[1]) / (total - prev[0])
+        self.sample_values['usagePercent'] = min(max(busy * 100, 0.0), 100.0)
+        return self.sample_values
\ No newline at end of file
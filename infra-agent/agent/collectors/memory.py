@@ -27,4 +27,14 @@ class MemoryCollector(BaseCollector):
             'totalMB': round(total_mb, 2),
             'usedMB': round(used_mb, 2),
             'usagePercent': mem.percent
-        }
\ No newline at end of file
+        }
+    
+    def _sample_impl(self):
+        """
+        Sample memory usage
+        
+        Returns:
+            dict: Memory usage sample
+        """
+        self.sample_values['usagePercent'] = psutil.virtual_memory().percent
+        return self.sample_values
\ No newline at end of file
@@ -0,0 +1,235 @@
+"""
+Per-interface network rate engine
+"""
+import os
+import time
+import fnmatch
+import logging
+from array import array
+import psutil
+
+# Counters tracked per interface, in slot order
+METRICS = ('bytesSent', 'bytesRecv', 'packetsSent', 'packetsRecv',
+           'errIn', 'errOut', 'dropIn', 'dropOut')
+NUM_METRICS = len(METRICS)
+
+# /proc/net/dev field index (after the interface name) of each metric
+PROC_FIELDS = (8, 0, 9, 1, 2, 10, 3, 11)
+
+# Largest value of a 32-bit counter; some drivers still export 32-bit counters
+COUNTER_32_MAX = 2 ** 32
+
+DEFAULT_EXCLUDE = ('lo', 'veth*')
+
+
+def counter_delta(prev, current):
+    """
+    Difference between two readings of a monotonic counter
+
+    A 32-bit counter that wrapped is unwrapped; any other decrease is
+    treated as a reset (interface recreated or driver reloaded) and the
+    counter is assumed to have restarted from zero.
+
+    Args:
+        prev: Previous reading
+        current: Current reading
+
+    Returns:
+        int: Non-negative increase
+    """
+    if current >= prev:
+        return current - prev
+    if prev < COUNTER_32_MAX:
+        wrapped = current + COUNTER_32_MAX - prev
+        if wrapped < COUNTER_32_MAX // 2:
+            return wrapped
+    return current
+
+
+class InterfaceRateEngine:
+    """
+    Rates and interval deltas of per-interface network counters
+
+    Each interface gets a fixed slot in flat arrays of NUM_METRICS values,
+    so an update allocates no per-interface containers. Slots of vanished
+    interfaces are reused. Interfaces are filtered once, when first seen,
+    with fnmatch glob rules.
+    """
+
+    def __init__(self, include=('*',), exclude=DEFAULT_EXCLUDE, proc_net_dev='/proc/net/dev'):
+        """
+        Initialize the engine
+
+        Args:
+            include: Glob patterns of interfaces to track
+            exclude: Glob patterns of interfaces to skip, applied after include
+            proc_net_dev: Path of the kernel's per-interface counters; psutil
+                is used when it does not exist
+        """
+        self.include = tuple(include)
+        self.exclude = tuple(exclude)
+        self.proc_net_dev = proc_net_dev if os.path.exists(proc_net_dev) else None
+
+        # Interface name -> slot index; filtered-out name -> generation last seen
+        self.slots = {}
+        self.excluded = {}
+        self.names = []
+        self.free = []
+        self.seen = array('L')
+        # Starts at 1 so that new slots (seen = 0) always count as fresh
+        self.generation = 1
+
+        self.prev = array('Q')
+        self.deltas = array('d')
+        self.rates = array('d')
+        self.totals = array('d', bytes(8 * NUM_METRICS))
+        self.total_rates = array('d', bytes(8 * NUM_METRICS))
+
+        self.prev_time = None
+        self.elapsed = 0.0
+
+    def matches(self, name):
+        """Return True if an interface passes the glob rules"""
+        if not any(fnmatch.fnmatchcase(name, pattern) for pattern in self.include):
+            return False
+        return not any(fnmatch.fnmatchcase(name, pattern) for pattern in self.exclude)
+
+    def _slot(self, name):
+        """Return the slot of an interface, allocating one for a new interface"""
+        slot = self.slots.get(name)
+        if slot is not None:
+            return slot
+
+        if name in self.excluded or not self.matches(name):
+            self.excluded[name] = self.generation
+            return -1
+
+        if self.free:
+            slot = self.free.pop()
+            self.names[slot] = name
+        else:
+            slot = len(self.names)
+            self.names.append(name)
+            self.seen.append(0)
+            zeros = bytes(8 * NUM_METRICS)
+            self.prev.frombytes(zeros)
+            self.deltas.frombytes(zeros)
+            self.rates.frombytes(zeros)
+
+        self.slots[name] = slot
+        # Mark as new: the first reading only primes the counters
+        self.seen[slot] = 0
+        return slot
+
+    def _read_counters(self):
+        """
+        Yield (name, counters) for every interface
+
+        Counters are ordered as METRICS.
+        """
+        if self.proc_net_dev:
+            with open(self.proc_net_dev) as f:
+                lines = f.read().splitlines()[2:]
+            for line in lines:
+                name, _, rest = line.partition(':')
+                fields = rest.split()
+                yield name.strip(), [int(fields[index]) for index in PROC_FIELDS]
+        else:
+            for name, counters in psutil.net_io_counters(pernic=True).items():
+                yield name, counters
+
+    def update(self, now=None):
+        """
+        Read all counters and compute deltas and rates since the previous update
+
+        Args:
+            now: Timestamp of the reading (defaults to time.time())
+
+        Returns:
+            bool: True if rates are available (i.e. not the first update)
+        """
+        now = time.time() if now is None else now
+        elapsed = now - self.prev_time if self.prev_time is not None else 0.0
+        self.prev_time = now
+        self.elapsed = elapsed
+
+        self.generation += 1
+        generation = self.generation
+        prev, deltas, rates, seen = self.prev, self.deltas, self.rates, self.seen
+        totals = self.totals
+        for metric in range(NUM_METRICS):
+            totals[metric] = 0.0
+
+        for name, counters in self._read_counters():
+            slot = self._slot(name)
+            if slot < 0:
+                continue
+
+            base = slot * NUM_METRICS
+            fresh = seen[slot] != generation - 1
+            seen[slot] = generation
+            for metric in range(NUM_METRICS):
+                current = counters[metric]
+                delta = 0 if fresh else counter_delta(prev[base + metric], current)
+                prev[base + metric] = current
+                deltas[base + metric] = delta
+                rates[base + metric] = delta / elapsed if elapsed > 0 else 0.0
+                totals[metric] += delta
+
+        # Release slots of interfaces that were not seen in this reading
+        for slot, name in enumerate(self.names):
+            if name is not None and seen[slot] != generation:
+                logging.debug(f"Network interface {name} disappeared")
+                del self.slots[name]
+                self.names[slot] = None
+                self.free.append(slot)
+
+        # Forget filtered-out interfaces that are gone (e.g. container veths)
+        for name in [name for name, last in self.excluded.items() if last != generation]:
+            del self.excluded[name]
+
+        for metric in range(NUM_METRICS):
+            self.total_rates[metric] = totals[metric] / elapsed if elapsed > 0 else 0.0
+
+        return elapsed > 0
+
+    def top(self, n):
+        """
+        Return the busiest interfaces of the last update
+
+        Args:
+            n: Number of interfaces
+
+        Returns:
+            list: (name, slot) pairs ranked by bytes sent plus received
+        """
+        rates = self.rates
+        active = [(name, slot) for slot, name in enumerate(self.names) if name is not None]
+        active.sort(key=lambda item: rates[item[1] * NUM_METRICS] + rates[item[1] * NUM_METRICS + 1],
+                    reverse=True)
+        return active[:n]
+
+    def interface_summary(self, name, slot):
+        """
+        Build the report of one interface
+
+        Args:
+            name: Interface name
+            slot: Interface slot
+
+        Returns:
+            dict: Byte and packet rates plus error and drop counts
+        """
+        base = slot * NUM_METRICS
+        rates, deltas = self.rates, self.deltas
+        return {
+            'name': name,
+            'bytesSentPerSec': rates[base],
+            'bytesRecvPerSec': rates[base + 1],
+            'packetsSentPerSec': rates[base + 2],
+            'packetsRecvPerSec': rates[base + 3],
+            'errIn': int(deltas[base + 4]),
+            'errOut': int(deltas[base + 5]),
+            'dropIn': int(deltas[base + 6]),
+            'dropOut': int(deltas[base + 7])
+        }
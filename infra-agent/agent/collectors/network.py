@@ -1,60 +1,69 @@
 """
 Network data collector
 """
-import psutil
-import time
 import logging
 from .base_collector import BaseCollector
+from .net_rates import InterfaceRateEngine, DEFAULT_EXCLUDE
 
 class NetworkCollector(BaseCollector):
     """Collector for network metrics"""
-    
-    def __init__(self):
-        """Initialize network collector with previous counters"""
+
+    def __init__(self, include=('*',), exclude=DEFAULT_EXCLUDE, top_n=10):
+        """
+        Initialize network collector
+
+        Args:
+            include: Glob patterns of interfaces to report
+            exclude: Glob patterns of interfaces to skip (loopback and
+                container veths by default)
+            top_n: Number of interfaces reported individually, busiest first
+        """
         super().__init__()
-        self.prev_bytes_sent = 0
-        self.prev_bytes_recv = 0
-        self.prev_time = time.time()
-        self.first_run = True
-    
+        self.top_n = top_n
+        # Separate engines so sampling does not disturb interval deltas
+        self.engine = InterfaceRateEngine(include, exclude)
+        self.sample_engine = InterfaceRateEngine(include, exclude)
+
     def _collect_impl(self):
         """
         Collect network usage data
-        
+
         Returns:
-            dict: Network usage data
+            dict: Bytes since the last collection, aggregate rates, and
+                per-interface rates for the busiest interfaces
         """
-        # Get network I/O statistics
-        net_io = psutil.net_io_counters()
-        current_time = time.time()
-        
-        # Get current counters
-        bytes_sent = net_io.bytes_sent
-        bytes_recv = net_io.bytes_recv
-        
-        # If this is the first run, just store the counters and return zeros
-        if self.first_run:
-            self.prev_bytes_sent = bytes_sent
-            self.prev_bytes_recv = bytes_recv
-            self.prev_time = current_time
-            self.first_run = False
-            
+        engine = self.engine
+        if not engine.update():
+            # First run: just prime the counters
             return {
                 'bytesSent': 0,
                 'bytesRecv': 0
             }
-        
-        # Calculate bytes since last collection
-        bytes_sent_since_last = bytes_sent - self.prev_bytes_sent
-        bytes_recv_since_last = bytes_recv - self.prev_bytes_recv
-        
-        # Update previous counters
-        self.prev_bytes_sent = bytes_sent
-        self.prev_bytes_recv = bytes_recv
-        self.prev_time = current_time
-        
-        # Return formatted network data
+
+        totals, rates = engine.totals, engine.total_rates
         return {
-            'bytesSent': bytes_sent_since_last,
-            'bytesRecv': bytes_recv_since_last
-        }
\ No newline at end of file
+            'bytesSent': int(totals[0]),
+            'bytesRecv': int(totals[1]),
+            'bytesSentPerSec': rates[0],
+            'bytesRecvPerSec': rates[1],
+            'packetsSentPerSec': rates[2],
+            'packetsRecvPerSec': rates[3],
+            'errors': int(totals[4] + totals[5]),
+            'drops': int(totals[6] + totals[7]),
+            'interfaces': [engine.interface_summary(name, slot) for name, slot in engine.top(self.top_n)]
+        }
+
+    def _sample_impl(self):
+        """
+        Sample network throughput since the previous sample
+
+        Returns:
+            dict: Bytes per second sent and received, or None on the first call
+        """
+        engine = self.sample_engine
+        if not engine.update():
+            return None
+
+        self.sample_values['bytesSentPerSec'] = engine.total_rates[0]
+        self.sample_values['bytesRecvPerSec'] = engine.total_rates[1]
+        return self.sample_values
@@ -0,0 +1,207 @@
+"""
+Pressure-stall (PSI) and saturation collector
+"""
+import os
+import time
+import logging
+from .base_collector import BaseCollector
+from .procfs import ProcFile
+
+# Resources with a pressure file under /proc/pressure
+RESOURCES = ('cpu', 'memory', 'io')
+
+# Line prefixes of the two PSI lines; 'full' is missing for cpu before Linux 5.13
+PSI_LINES = (('some', b'some '), ('full', b'\nfull '))
+
+# Sampled metric name per resource
+SAMPLE_METRICS = tuple((resource, resource + 'StallPercent') for resource in RESOURCES)
+
+# /proc/vmstat counters reported as per-second rates
+VMSTAT_COUNTERS = (
+    ('swapInPagesPerSec', b'\npswpin '),
+    ('swapOutPagesPerSec', b'\npswpout '),
+    ('majorFaultsPerSec', b'\npgmajfault ')
+)
+
+
+class PressureCollector(BaseCollector):
+    """
+    Collector for resource pressure and saturation
+
+    Reports how much time tasks were stalled waiting for CPU, memory and I/O
+    from the kernel's pressure-stall information, with the kernel's own
+    averages and the stall time since the previous collection. Swap
+    activity and major faults come from /proc/vmstat, run-queue length
+    from /proc/loadavg. Files stay open and are parsed in place (see
+    ProcFile). On kernels without PSI (or booted with psi=0) the PSI
+    section is None and the rest is still reported.
+    """
+
+    def __init__(self, proc_root='/proc'):
+        """
+        Initialize pressure collector
+
+        Args:
+            proc_root: Mount point of procfs; a directory of fixture files
+                with the same layout works too
+        """
+        super().__init__()
+        self.proc_root = proc_root
+        self.psi_available = True
+
+        # Separate readers for collection and sampling, which may run concurrently
+        self.psi = self._psi_files()
+        self.sample_psi = self._psi_files()
+        self.vmstat = ProcFile(os.path.join(proc_root, 'vmstat'), 8192)
+        self.loadavg = ProcFile(os.path.join(proc_root, 'loadavg'), 128)
+        self.cpu_count = os.cpu_count() or 1
+
+        # Previous stall totals in microseconds, keyed by (resource, line)
+        self.prev_stall = {}
+        self.prev_sample_stall = {}
+        self.prev_vmstat = None
+        self.prev_time = None
+        self.prev_sample_time = None
+
+    def _psi_files(self):
+        """Return a reader per pressure file"""
+        return {resource: ProcFile(os.path.join(self.proc_root, 'pressure', resource), 256)
+                for resource in RESOURCES}
+
+    def is_available(self):
+        """Return True if procfs is mounted at the root"""
+        return os.path.exists(self.loadavg.path)
+
+    def _disable_psi(self, files, e):
+        """Stop reading PSI after the kernel refused it"""
+        if self.psi_available:
+            logging.info(f"Pressure-stall information unavailable, reporting saturation only: {e}")
+        self.psi_available = False
+        # Each thread closes its own readers
+        for f in files.values():
+            f.close()
+
+    def _read_psi(self, f, resource, prev_stall, elapsed):
+        """
+        Read one pressure file
+
+        Args:
+            f: ProcFile of the resource
+            resource: Resource name
+            prev_stall: Previous stall totals, updated in place
+            elapsed: Seconds since the previous reading (0 on the first)
+
+        Returns:
+            dict: 'some' and 'full' averages and stall time, a line being
+                None where the kernel does not report it
+        """
+        f.read()
+        result = {}
+        for line, prefix in PSI_LINES:
+            start = f.find(prefix)
+            if start < 0:
+                result[line] = None
+                continue
+
+            total = f.find_int(b'total=', start)
+            prev = prev_stall.get((resource, line))
+            prev_stall[(resource, line)] = total
+            # Clamped at zero in case the counter was reset
+            stall = max(total - prev, 0) if prev is not None and elapsed > 0 else 0
+
+            result[line] = {
+                'avg10': f.find_float(b'avg10=', start),
+                'avg60': f.find_float(b'avg60=', start),
+                'avg300': f.find_float(b'avg300=', start),
+                'stallMs': round(stall / 1000, 3),
+                'stallPercent': round(min(stall / (elapsed * 1e6) * 100, 100.0), 2) if elapsed > 0 else 0.0
+            }
+        return result
+
+    def _collect_impl(self):
+        """
+        Collect pressure and saturation data
+
+        Returns:
+            dict: PSI per resource (None without PSI), swap and major fault
+                rates, and run-queue length, or None if procfs is unavailable
+        """
+        if not self.is_available():
+            return None
+
+        now = time.time()
+        elapsed = now - self.prev_time if self.prev_time is not None else 0.0
+        self.prev_time = now
+
+        psi = None
+        if self.psi_available:
+            try:
+                psi = {resource: self._read_psi(self.psi[resource], resource, self.prev_stall, elapsed)
+                       for resource in RESOURCES}
+            except OSError as e:
+                self._disable_psi(self.psi, e)
+                psi = None
+
+        data = {'psi': psi}
+
+        # Rates are 0 on the first collection, which only primes the counters
+        self.vmstat.read()
+        counters = tuple(self.vmstat.find_int(key, default=0) for _, key in VMSTAT_COUNTERS)
+        prev = self.prev_vmstat
+        self.prev_vmstat = counters
+        for index, (name, _) in enumerate(VMSTAT_COUNTERS):
+            rate = max(counters[index] - prev[index], 0) / elapsed if prev is not None and elapsed > 0 else 0.0
+            data[name] = round(rate, 2)
+
+        # "load1 load5 load15 runnable/threads last_pid"
+        self.loadavg.read()
+        fields = self.loadavg.fields()
+        runnable, _, threads = fields[3].partition(b'/')
+        data['load1'] = float(fields[0])
+        data['load5'] = float(fields[1])
+        data['load15'] = float(fields[2])
+        data['runnable'] = int(runnable)
+        data['threads'] = int(threads)
+        data['runnablePerCPU'] = round(int(runnable) / self.cpu_count, 2)
+
+        return data
+
+    def _sample_impl(self):
+        """
+        Sample the share of time tasks stalled since the previous sample
+
+        Returns:
+            dict: Some-stall percentage per resource, or None on the first
+                call or without PSI
+        """
+        if not self.psi_available:
+            return None
+
+        now = time.monotonic()
+        elapsed = now - self.prev_sample_time if self.prev_sample_time is not None else 0.0
+        self.prev_sample_time = now
+        prev_stall = self.prev_sample_stall
+        values = self.sample_values
+
+        try:
+            for resource, metric in SAMPLE_METRICS:
+                f = self.sample_psi[resource]
+                f.read()
+                total = f.find_int(b'total=')
+                prev = prev_stall.get(resource)
+                prev_stall[resource] = total
+                if prev is not None and elapsed > 0:
+                    values[metric] = min(max(total - prev, 0) / (elapsed * 1e6) * 100, 100.0)
+        except OSError as e:
+            self._disable_psi(self.sample_psi, e)
+            return None
+
+        return values if values else None
+
+    def close(self):
+        """Close the open /proc files"""
+        for files in (self.psi, self.sample_psi):
+            for f in files.values():
+                f.close()
+        self.vmstat.close()
+        self.loadavg.close()
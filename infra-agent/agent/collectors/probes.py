@@ -0,0 +1,338 @@
+"""
+Concurrent local service health probes
+"""
+import ssl
+import time
+import asyncio
+import logging
+from urllib.parse import urlsplit
+from .base_collector import BaseCollector
+from ..sketch import DDSketch
+
+PROBE_TYPES = ('tcp', 'http', 'unix')
+
+# Largest HTTP response body read from a probed endpoint
+MAX_BODY_BYTES = 1024 * 1024
+
+
+class Probe:
+    """A single health check of a local service"""
+
+    __slots__ = ('name', 'type', 'target', 'timeout', 'expect_status', 'method',
+                 'send', 'expect', 'verify_tls')
+
+    def __init__(self, name, probe_type, target, timeout=2.0, expect_status=None, method='GET',
+                 send=None, expect=None, verify_tls=True):
+        """
+        Initialize the probe
+
+        Args:
+            name: Probe name reported in the payload
+            probe_type: 'tcp', 'http' or 'unix'
+            target: 'host:port' (tcp), URL (http) or socket path (unix)
+            timeout: Seconds before the probe counts as down
+            expect_status: HTTP status codes counted as up (default 2xx/3xx)
+            method: HTTP method
+            send: Bytes written to a unix socket after connecting (optional)
+            expect: Bytes a unix socket must answer with (optional)
+            verify_tls: Verify certificates of https targets
+        """
+        if probe_type not in PROBE_TYPES:
+            raise ValueError(f"Probe {name} has unknown type {probe_type}")
+        if probe_type == 'tcp' and target.rpartition(':')[2].isdigit() is False:
+            raise ValueError(f"Probe {name} target must be host:port")
+        if probe_type == 'http' and urlsplit(target).scheme not in ('http', 'https'):
+            raise ValueError(f"Probe {name} target must be an http(s) URL")
+
+        self.name = name
+        self.type = probe_type
+        self.target = target
+        self.timeout = timeout
+        self.expect_status = expect_status
+        self.method = method.upper()
+        self.send = send
+        self.expect = expect
+        self.verify_tls = verify_tls
+
+    @classmethod
+    def from_dict(cls, name, data, default_timeout=2.0):
+        """
+        Build a probe from a config or server dictionary
+
+        Args:
+            name: Probe name
+            data: Probe settings using the keyword names of __init__;
+                expect_status may be a comma separated list
+            default_timeout: Timeout used when none is set
+
+        Returns:
+            Probe: New probe
+        """
+        expect_status = data.get('expect_status')
+        if isinstance(expect_status, str):
+            expect_status = [int(code) for code in expect_status.replace(',', ' ').split()]
+        elif isinstance(expect_status, int):
+            expect_status = [expect_status]
+
+        verify_tls = data.get('verify_tls', True)
+        if isinstance(verify_tls, str):
+            verify_tls = verify_tls.lower() in ('1', 'true', 'yes', 'on')
+
+        return cls(
+            name,
+            data['type'],
+            data['target'],
+            timeout=float(data.get('timeout') or default_timeout),
+            expect_status=tuple(expect_status) if expect_status else None,
+            method=data.get('method', 'GET'),
+            send=data['send'].encode() if data.get('send') else None,
+            expect=data['expect'].encode() if data.get('expect') else None,
+            verify_tls=verify_tls
+        )
+
+
+class ProbeCollector(BaseCollector):
+    """
+    Collector running local health probes concurrently
+
+    Probes run on a private asyncio event loop, each under its own timeout
+    and all under a global concurrency cap. Keep-alive HTTP connections are
+    pooled across runs; a pooled connection that turns out to be closed is
+    retried once on a fresh one, which is safe because probes only send
+    idempotent requests. Latencies go into the collector's sketches, so
+    per-probe histograms are reported with the other distributions.
+    """
+
+    def __init__(self, probes, concurrency=20):
+        """
+        Initialize probe collector
+
+        Args:
+            probes: List of Probe instances
+            concurrency: Maximum number of probes in flight
+        """
+        super().__init__()
+        self.probes = probes
+        self.concurrency = concurrency
+        self.loop = asyncio.new_event_loop()
+        self.pool = {}
+        self.results = []
+        self._tls_contexts = {}
+
+    def run_probes(self):
+        """
+        Run every probe once and record the results
+
+        Returns:
+            list: Probe results
+        """
+        started = time.perf_counter()
+        self.results = self.loop.run_until_complete(self._run_all())
+
+        with self._sketch_lock:
+            for result in self.results:
+                if result['latencyMs'] is not None:
+                    sketch = self.sketches.get(result['name'])
+                    if sketch is None:
+                        sketch = self.sketches[result['name']] = DDSketch(max_bins=self.sketch_max_bins)
+                    sketch.add(result['latencyMs'])
+
+        down = sum(1 for result in self.results if not result['up'])
+        logging.debug(f"Ran {len(self.results)} probes in {(time.perf_counter() - started) * 1000:.0f}ms, {down} down")
+        return self.results
+
+    def _collect_impl(self):
+        """
+        Collect the latest probe results
+
+        Returns:
+            list: Result per probe, or None before the first run
+        """
+        return self.results or None
+
+    async def _run_all(self):
+        """Run all probes under the concurrency cap"""
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def run(probe):
+            async with semaphore:
+                return await self._run_one(probe)
+
+        return await asyncio.gather(*(run(probe) for probe in self.probes))
+
+    async def _run_one(self, probe):
+        """Run one probe under its timeout and build its result"""
+        result = {
+            'name': probe.name,
+            'type': probe.type,
+            'target': probe.target,
+            'up': False,
+            'latencyMs': None,
+            'error': None
+        }
+        check = {'tcp': self._check_tcp, 'http': self._check_http, 'unix': self._check_unix}[probe.type]
+
+        started = time.perf_counter()
+        try:
+            error = await asyncio.wait_for(check(probe, result), probe.timeout)
+        except asyncio.TimeoutError:
+            error = f"timed out after {probe.timeout}s"
+        except (OSError, ValueError, asyncio.IncompleteReadError, asyncio.LimitOverrunError) as e:
+            error = str(e) or e.__class__.__name__
+
+        result['latencyMs'] = round((time.perf_counter() - started) * 1000, 3)
+        result['up'] = error is None
+        result['error'] = error
+        return result
+
+    @staticmethod
+    def _close(writer):
+        """Close a connection without waiting for the peer"""
+        try:
+            writer.close()
+        except Exception:
+            pass
+
+    async def _check_tcp(self, probe, result):
+        """Connect to a TCP port"""
+        host, _, port = probe.target.rpartition(':')
+        _, writer = await asyncio.open_connection(host.strip('[]') or 'localhost', int(port))
+        self._close(writer)
+        return None
+
+    async def _check_unix(self, probe, result):
+        """Connect to a Unix socket and optionally exchange a message"""
+        reader, writer = await asyncio.open_unix_connection(probe.target)
+        try:
+            if probe.send:
+                writer.write(probe.send)
+                await writer.drain()
+            if probe.expect:
+                received = b''
+                while probe.expect not in received:
+                    data = await reader.read(4096)
+                    if not data:
+                        return f"expected {probe.expect!r}, got {received[:64]!r}"
+                    received = (received + data)[-4096:]
+        finally:
+            self._close(writer)
+        return None
+
+    def _tls_context(self, verify):
+        """Return a shared TLS context"""
+        context = self._tls_contexts.get(verify)
+        if context is None:
+            context = ssl.create_default_context()
+            if not verify:
+                context.check_hostname = False
+                context.verify_mode = ssl.CERT_NONE
+            self._tls_contexts[verify] = context
+        return context
+
+    async def _check_http(self, probe, result):
+        """Send an HTTP request, reusing a pooled keep-alive connection if possible"""
+        url = urlsplit(probe.target)
+        https = url.scheme == 'https'
+        host = url.hostname or 'localhost'
+        port = url.port or (443 if https else 80)
+        key = (url.scheme, host, port, probe.verify_tls)
+        path = (url.path or '/') + (f"?{url.query}" if url.query else '')
+        request = (f"{probe.method} {path} HTTP/1.1\r\nHost: {url.netloc}\r\n"
+                   f"User-Agent: infrawatch-agent\r\nConnection: keep-alive\r\n\r\n").encode()
+
+        idle = self.pool.get(key)
+        conn = idle.pop() if idle else None
+        while True:
+            reused = conn is not None
+            if conn is None:
+                conn = await asyncio.open_connection(
+                    host, port, ssl=self._tls_context(probe.verify_tls) if https else None)
+            reader, writer = conn
+            try:
+                writer.write(request)
+                await writer.drain()
+                status, keep_alive = await self._read_response(reader, probe.method == 'HEAD')
+            except (ConnectionError, asyncio.IncompleteReadError):
+                self._close(writer)
+                if reused:
+                    # The server closed the idle connection; retry on a fresh one
+                    conn = None
+                    continue
+                raise
+            except BaseException:
+                # Cancelled or failed mid-response: the connection state is unknown
+                self._close(writer)
+                raise
+            break
+
+        idle = self.pool.setdefault(key, [])
+        # No more connections than probes can use at once stay open
+        if keep_alive and len(idle) < self.concurrency:
+            idle.append(conn)
+        else:
+            self._close(writer)
+
+        result['statusCode'] = status
+        expected = probe.expect_status
+        if (status in expected) if expected else (200 <= status < 400):
+            return None
+        return f"unexpected status {status}"
+
+    @staticmethod
+    async def _read_response(reader, head):
+        """
+        Read an HTTP/1.x response
+
+        Returns:
+            tuple: (status code, whether the connection can be reused)
+        """
+        status_line = await reader.readuntil(b'\r\n')
+        parts = status_line.decode('latin-1').split(' ', 2)
+        if len(parts) < 2 or not parts[0].startswith('HTTP/'):
+            raise ValueError(f"invalid status line {status_line[:64]!r}")
+        status = int(parts[1])
+
+        headers = {}
+        while True:
+            line = await reader.readuntil(b'\r\n')
+            if line == b'\r\n':
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+
+        connection = headers.get('connection', '').lower()
+        keep_alive = connection != 'close' if parts[0] == 'HTTP/1.1' else connection == 'keep-alive'
+
+        if head or status in (204, 304) or 100 <= status < 200:
+            return status, keep_alive
+
+        if headers.get('transfer-encoding', '').lower() == 'chunked':
+            total = 0
+            while True:
+                size = int((await reader.readuntil(b'\r\n')).split(b';')[0], 16)
+                total += size
+                if total > MAX_BODY_BYTES:
+                    return status, False
+                if size == 0:
+                    # Last chunk: optional trailers up to an empty line
+                    while await reader.readuntil(b'\r\n') != b'\r\n':
+                        pass
+                    return status, keep_alive
+                await reader.readexactly(size + 2)
+
+        length = headers.get('content-length')
+        if length is None:
+            # Body runs until the server closes the connection
+            return status, False
+        if int(length) > MAX_BODY_BYTES:
+            return status, False
+        await reader.readexactly(int(length))
+        return status, keep_alive
+
+    def close(self):
+        """Close pooled connections and the event loop"""
+        for idle in self.pool.values():
+            for _, writer in idle:
+                self._close(writer)
+        self.pool.clear()
+        self.loop.close()
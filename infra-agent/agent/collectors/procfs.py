@@ -0,0 +1,146 @@
+"""
+Low-allocation readers for /proc text files
+"""
+import os
+
+
+class ProcFile:
+    """
+    A /proc file kept open and re-read in place
+
+    The file descriptor stays open between reads and the contents are read
+    with pread into a reusable buffer, so a read costs one system call and
+    allocates nothing unless the file outgrows the buffer. Values are then
+    located with find_int()/find_float() without splitting the text.
+    """
+
+    def __init__(self, path, size=4096):
+        """
+        Initialize the reader; the file is opened on the first read
+
+        Args:
+            path: Path of the file
+            size: Initial buffer size in bytes; doubled as needed
+        """
+        self.path = path
+        self.buf = bytearray(size)
+        self.length = 0
+        self.fd = None
+        # Column indexes per (section, columns) of header/value tables
+        self.columns = {}
+
+    def read(self):
+        """
+        Read the current contents into the buffer
+
+        Returns:
+            int: Number of bytes read
+
+        Raises:
+            OSError: If the file cannot be opened or read
+        """
+        if self.fd is None:
+            self.fd = os.open(self.path, os.O_RDONLY | getattr(os, 'O_CLOEXEC', 0))
+        while True:
+            length = os.preadv(self.fd, [self.buf], 0)
+            if length < len(self.buf):
+                self.length = length
+                return length
+            # Filled the buffer: the file may be longer, read again with more room
+            self.buf = bytearray(len(self.buf) * 2)
+
+    def close(self):
+        """Close the file descriptor"""
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
+
+    def find(self, key, start=0):
+        """
+        Return the offset just past key in the last read, or -1 if absent
+
+        Args:
+            key: Bytes to look for, e.g. b'\\npgmajfault '
+            start: Offset to search from
+        """
+        pos = self.buf.find(key, start, self.length)
+        return -1 if pos < 0 else pos + len(key)
+
+    def _token_end(self, pos):
+        """Return the offset of the first whitespace at or after pos"""
+        buf, end = self.buf, self.length
+        while pos < end and buf[pos] not in b' \n':
+            pos += 1
+        return pos
+
+    def find_int(self, key, start=0, default=None):
+        """
+        Parse the integer following key
+
+        Args:
+            key: Bytes preceding the value
+            start: Offset to search from
+            default: Returned if the key is absent
+
+        Returns:
+            int: Value, or default
+        """
+        pos = self.find(key, start)
+        if pos < 0:
+            return default
+        return int(self.buf[pos:self._token_end(pos)])
+
+    def find_float(self, key, start=0, default=None):
+        """Parse the float following key, as find_int()"""
+        pos = self.find(key, start)
+        if pos < 0:
+            return default
+        return float(self.buf[pos:self._token_end(pos)])
+
+    def fields(self, start=0):
+        """
+        Split the line starting at start into whitespace-separated fields
+
+        Returns:
+            list: Fields as bytes
+        """
+        end = self.buf.find(b'\n', start, self.length)
+        return self.buf[start:end if end >= 0 else self.length].split()
+
+    def section(self, prefix, columns):
+        """
+        Pick named columns of a header/value line pair in the last read
+
+        /proc/net/snmp and /proc/net/netstat hold one line of column names
+        and one line of values per section, both starting with the section
+        prefix. Column positions are looked up once and cached.
+
+        Args:
+            prefix: Section prefix with its colon, e.g. b'Tcp:'
+            columns: Tuple of column names (bytes)
+
+        Returns:
+            list: Values in the order of columns, None where the kernel has
+                no such column, or None if the section is missing
+        """
+        key = b'\n' + prefix + b' '
+        if self.buf.startswith(key[1:]):
+            header = 0
+        else:
+            header = self.buf.find(key, 0, self.length)
+            if header < 0:
+                return None
+            header += 1
+        values = self.buf.find(key, header, self.length)
+        if values < 0:
+            return None
+
+        indexes = self.columns.get((prefix, columns))
+        if indexes is None:
+            names = self.fields(header)
+            indexes = self.columns[(prefix, columns)] = [
+                names.index(column) if column in names else None for column in columns
+            ]
+
+        fields = self.fields(values + 1)
+        return [int(fields[index]) if index is not None else None for index in indexes]
@@ -0,0 +1,184 @@
+"""
+TCP/socket stack health collector
+"""
+import os
+import time
+from .base_collector import BaseCollector
+from .net_rates import counter_delta
+from .procfs import ProcFile
+
+# Counters reported as per-second rates: (name, file, section, column)
+COUNTERS = (
+    ('retransmitsPerSec', 'snmp', b'Tcp:', b'RetransSegs'),
+    ('segmentsOutPerSec', 'snmp', b'Tcp:', b'OutSegs'),
+    ('activeOpensPerSec', 'snmp', b'Tcp:', b'ActiveOpens'),
+    ('passiveOpensPerSec', 'snmp', b'Tcp:', b'PassiveOpens'),
+    ('failedOpensPerSec', 'snmp', b'Tcp:', b'AttemptFails'),
+    ('estabResetsPerSec', 'snmp', b'Tcp:', b'EstabResets'),
+    ('resetsSentPerSec', 'snmp', b'Tcp:', b'OutRsts'),
+    ('inErrorsPerSec', 'snmp', b'Tcp:', b'InErrs'),
+    ('udpReceiveBufferErrorsPerSec', 'snmp', b'Udp:', b'RcvbufErrors'),
+    ('listenOverflowsPerSec', 'netstat', b'TcpExt:', b'ListenOverflows'),
+    ('listenDropsPerSec', 'netstat', b'TcpExt:', b'ListenDrops'),
+    ('synDropsPerSec', 'netstat', b'TcpExt:', b'TCPReqQFullDrop'),
+    ('syncookiesSentPerSec', 'netstat', b'TcpExt:', b'SyncookiesSent'),
+    ('timeoutsPerSec', 'netstat', b'TcpExt:', b'TCPTimeouts'),
+    ('abortsOnMemoryPerSec', 'netstat', b'TcpExt:', b'TCPAbortOnMemory')
+)
+
+# Values reported as read
+GAUGES = (
+    ('established', 'snmp', b'Tcp:', b'CurrEstab'),
+)
+
+# Columns read per (file, section), and the position of each counter and
+# gauge among them, so every section is parsed once per collection
+SECTIONS = {}
+POSITIONS = []
+for _, _file, _section, _column in COUNTERS + GAUGES:
+    _columns = SECTIONS.get((_file, _section), ())
+    POSITIONS.append(((_file, _section), len(_columns)))
+    SECTIONS[(_file, _section)] = _columns + (_column,)
+
+
+class TcpCollector(BaseCollector):
+    """
+    Collector for TCP and socket stack health
+
+    Rates of retransmits, listen-queue overflows and drops, SYN drops,
+    resets and timeouts come from deltas of the kernel's SNMP counters in
+    /proc/net/snmp and /proc/net/netstat. Connection counts come from the
+    aggregate counters in /proc/net/sockstat (in use, TIME_WAIT, orphaned)
+    and CurrEstab, never from enumerating sockets, so the cost stays the
+    same with a million connections. Conntrack table usage is reported
+    when nf_conntrack is loaded. Counters are those of the agent's network
+    namespace.
+    """
+
+    def __init__(self, proc_root='/proc'):
+        """
+        Initialize TCP collector
+
+        Args:
+            proc_root: Mount point of procfs; a directory of fixture files
+                with the same layout works too
+        """
+        super().__init__()
+        self.files = {
+            'snmp': ProcFile(os.path.join(proc_root, 'net', 'snmp'), 8192),
+            'netstat': ProcFile(os.path.join(proc_root, 'net', 'netstat'), 8192)
+        }
+        self.sockstat = ProcFile(os.path.join(proc_root, 'net', 'sockstat'), 512)
+        self.sockstat6 = ProcFile(os.path.join(proc_root, 'net', 'sockstat6'), 512)
+        self.conntrack_count = ProcFile(os.path.join(proc_root, 'sys', 'net', 'netfilter', 'nf_conntrack_count'), 64)
+        self.conntrack_max = ProcFile(os.path.join(proc_root, 'sys', 'net', 'netfilter', 'nf_conntrack_max'), 64)
+
+        self.prev = None
+        self.prev_time = None
+
+    def is_available(self):
+        """Return True if the kernel's TCP counters are readable"""
+        return os.path.exists(self.files['snmp'].path)
+
+    def _read_values(self):
+        """
+        Read the current value of every counter and gauge
+
+        Returns:
+            list: Values in COUNTERS + GAUGES order, None where the kernel
+                lacks one
+        """
+        for f in self.files.values():
+            f.read()
+        rows = {key: self.files[key[0]].section(key[1], columns) for key, columns in SECTIONS.items()}
+        return [rows[key][position] if rows[key] is not None else None for key, position in POSITIONS]
+
+    @staticmethod
+    def _read_value(f):
+        """Read a single-number file, returning None if it is missing"""
+        try:
+            f.read()
+        except OSError:
+            f.close()
+            return None
+        return int(f.buf[:f.length])
+
+    def _conntrack(self):
+        """
+        Read conntrack table usage
+
+        Returns:
+            dict: Entry count, table size and usage, or None without nf_conntrack
+        """
+        count = self._read_value(self.conntrack_count)
+        limit = self._read_value(self.conntrack_max)
+        if count is None or not limit:
+            return None
+        return {
+            'count': count,
+            'max': limit,
+            'usagePercent': round(count / limit * 100, 2)
+        }
+
+    def _collect_impl(self):
+        """
+        Collect TCP stack health
+
+        Returns:
+            dict: Connection counts, counter rates and conntrack usage, or
+                None if /proc/net is unavailable
+        """
+        if not self.is_available():
+            return None
+
+        now = time.time()
+        elapsed = now - self.prev_time if self.prev_time is not None else 0.0
+        self.prev_time = now
+
+        values = self._read_values()
+        counters = values[:len(COUNTERS)]
+        prev = self.prev
+        self.prev = counters
+
+        data = {}
+        # Rates are 0 on the first collection, which only primes the counters
+        for index, (name, _, _, _) in enumerate(COUNTERS):
+            current = counters[index]
+            if current is None:
+                data[name] = None
+            elif prev is None or prev[index] is None or elapsed <= 0:
+                data[name] = 0.0
+            else:
+                data[name] = round(counter_delta(prev[index], current) / elapsed, 2)
+
+        # Share of sent segments that were retransmissions
+        sent, retransmits = data['segmentsOutPerSec'], data['retransmitsPerSec']
+        data['retransmitPercent'] = round(retransmits / sent * 100, 3) if sent and retransmits is not None else 0.0
+
+        for index, (name, _, _, _) in enumerate(GAUGES, len(COUNTERS)):
+            data[name] = values[index]
+
+        # "TCP: inuse N orphan N tw N alloc N mem N"; TIME_WAIT covers IPv4 and IPv6
+        sockstat = self.sockstat
+        sockstat.read()
+        data['socketsUsed'] = sockstat.find_int(b'sockets: used ')
+        line = sockstat.find(b'\nTCP: ')
+        for name, key in (('inUse', b'inuse '), ('orphaned', b' orphan '), ('timeWait', b' tw '),
+                          ('allocated', b' alloc '), ('memoryPages', b' mem ')):
+            data[name] = sockstat.find_int(key, line) if line >= 0 else None
+        try:
+            self.sockstat6.read()
+            inuse6 = self.sockstat6.find_int(b'TCP6: inuse ', default=0)
+            if data['inUse'] is not None:
+                data['inUse'] += inuse6
+        except OSError:
+            # IPv6 disabled
+            self.sockstat6.close()
+
+        data['conntrack'] = self._conntrack()
+        return data
+
+    def close(self):
+        """Close the open /proc files"""
+        for f in (*self.files.values(), self.sockstat, self.sockstat6, self.conntrack_count, self.conntrack_max):
+            f.close()
@@ -2,6 +2,8 @@
 Configuration management for the Infrawatch Agent
 """
 import os
+import json
+import shlex
 import configparser
 import logging
 from pathlib import Path
@@ -14,36 +16,138 @@ class Config:
         '/etc/infrawatch/agent.ini'
     ]
 
+    # Default memory budget for in-agent buffers per runtime profile (MB)
+    PROFILE_MEMORY_BUDGET_MB = {
+        'standard': 32,
+        'low': 4
+    }
+
     def __init__(self):
         # Server settings
         self.server_url = None
         self.vm_id = None
         self.agent_token = None
 
+        # Runtime profile: 'standard' or 'low' (small VMs)
+        self.profile = "standard"
+        self.memory_budget_mb = None
+
         # Intervals (seconds)
         self.monitoring_interval = 60
         self.heartbeat_interval = 30
         self.command_polling_interval = 15
+        self.sampling_interval = 1
+
+        # Shared-memory file holding the latest sample for local consumers (empty disables)
+        self.sample_export_file = ""
+
+        # Scheduling: 'interval' or 'fleet' (wall-clock aligned, per-VM phase)
+        self.schedule_mode = "interval"
+        self.startup_jitter = 30
+
+        # Queue between monitoring collection and upload
+        self.queue_max_items = 60
+        self.queue_overflow = "drop_oldest"
+        self.queue_spill_dir = "./data/spool"
+        self.queue_max_spill_files = 1440
+        # Upload shape: samples per request, compression and whether
+        # distribution summaries keep their sketches
+        self.queue_batch_size = 1
+        self.queue_compression = "none"
+        self.queue_sketches = True
+        # Seconds a sample waits for its batch to fill before a partial
+        # batch is sent
+        self.queue_max_batch_wait = 60.0
+
+        # Relay mode: serve other agents and batch their traffic upstream
+        self.relay_enabled = False
+        self.relay_host = "0.0.0.0"
+        self.relay_port = 8421
+        self.relay_flush_interval = 2.0
+        self.relay_max_batch = 500
+        self.relay_upstream_connections = 2
+        self.relay_max_queue = 10000
+
+        # Network interfaces: glob patterns, and how many are reported individually
+        self.network_include = ['*']
+        self.network_exclude = ['lo', 'veth*']
+        self.network_top_n = 10
+
+        # Optional collectors
+        self.cgroup_enabled = True
+        self.cgroup_root = "/sys/fs/cgroup"
+        self.cgroup_top_n = 10
+        self.cgroup_max_depth = 3
+        self.pressure_enabled = True
+        self.tcp_enabled = True
+
+        # Allow-listed diagnostic scripts (name -> argv) and their limits
+        self.scripts = {}
+        self.script_timeout = 300
+        self.script_max_output_mb = 50
+        self.script_cpu_seconds = 300
+        self.script_memory_mb = 512
+
+        # Application log files shipped to the server
+        self.ship_log_files = []
+        self.ship_log_state_file = "./data/log_offsets.json"
+        self.ship_log_batch_bytes = 256 * 1024
+        self.ship_log_batch_interval = 5.0
+        self.ship_log_max_line_bytes = 16 * 1024
+        self.ship_log_start_at_end = True
+
+        # Anomaly detection rules, keyed by rule name
+        self.anomaly_rules = {}
+
+        # Local service health probes, keyed by probe name
+        self.probes = {}
+        self.probe_interval = 15
+        self.probe_concurrency = 20
+        self.probe_timeout = 2.0
 
         # Logging
         self.log_level = "INFO"
         self.log_file = "./logs/agent.log"
+        self.log_max_bytes = 10 * 1024 * 1024
+        self.log_backup_count = 5
+        self.log_rotate_interval = 86400
+        self.log_compress = True
+        self.log_rate_limit_interval = 60
+        self.log_rate_limit_burst = 5
+        self.log_queue_size = 10000
 
     def load(self):
         """Load configuration from environment variables or config file"""
         # Try environment variables first
         if self._load_from_env():
             logging.info("Loaded configuration from environment variables")
+            self._apply_profile()
             return
 
         # Then try config file
         if self._load_from_file():
             logging.info("Loaded configuration from config file")
+            self._apply_profile()
             return
 
         # If we get here, configuration is incomplete
         raise Exception("Could not load complete configuration. Please set required environment variables or provide a config file.")
 
+    @staticmethod
+    def _split_list(value):
+        """Split a comma or whitespace separated option into a list"""
+        return [item for item in value.replace(',', ' ').split() if item]
+
+    def _apply_profile(self):
+        """Fill in profile-dependent defaults and caps"""
+        if self.memory_budget_mb is None:
+            self.memory_budget_mb = self.PROFILE_MEMORY_BUDGET_MB.get(self.profile, 32)
+
+        if self.profile == 'low':
+            self.log_queue_size = min(self.log_queue_size, 1000)
+            self.relay_max_queue = min(self.relay_max_queue, 1000)
+            self.queue_max_items = min(self.queue_max_items, 10)
+
     def _load_from_env(self):
         """Load configuration from environment variables"""
         required_vars = {
@@ -61,6 +165,12 @@ class Config:
             setattr(self, attr_name, os.environ[env_var])
 
         # Load optional variables
+        if 'INFRAWATCH_PROFILE' in os.environ:
+            self.profile = os.environ['INFRAWATCH_PROFILE'].lower()
+
+        if 'INFRAWATCH_MEMORY_BUDGET_MB' in os.environ:
+            self.memory_budget_mb = float(os.environ['INFRAWATCH_MEMORY_BUDGET_MB'])
+
         if 'INFRAWATCH_MONITORING_INTERVAL' in os.environ:
             self.monitoring_interval = int(os.environ['INFRAWATCH_MONITORING_INTERVAL'])
 
@@ -70,12 +180,121 @@ class Config:
         if 'INFRAWATCH_COMMAND_POLLING_INTERVAL' in os.environ:
             self.command_polling_interval = int(os.environ['INFRAWATCH_COMMAND_POLLING_INTERVAL'])
 
+        if 'INFRAWATCH_SAMPLING_INTERVAL' in os.environ:
+            self.sampling_interval = float(os.environ['INFRAWATCH_SAMPLING_INTERVAL'])
+
+        if 'INFRAWATCH_SAMPLE_EXPORT_FILE' in os.environ:
+            self.sample_export_file = os.environ['INFRAWATCH_SAMPLE_EXPORT_FILE']
+
+        if 'INFRAWATCH_SCHEDULE_MODE' in os.environ:
+            self.schedule_mode = os.environ['INFRAWATCH_SCHEDULE_MODE'].lower()
+
+        if 'INFRAWATCH_STARTUP_JITTER' in os.environ:
+            self.startup_jitter = float(os.environ['INFRAWATCH_STARTUP_JITTER'])
+
+        if 'INFRAWATCH_QUEUE_MAX_ITEMS' in os.environ:
+            self.queue_max_items = int(os.environ['INFRAWATCH_QUEUE_MAX_ITEMS'])
+
+        if 'INFRAWATCH_QUEUE_OVERFLOW' in os.environ:
+            self.queue_overflow = os.environ['INFRAWATCH_QUEUE_OVERFLOW'].lower()
+
+        if 'INFRAWATCH_QUEUE_SPILL_DIR' in os.environ:
+            self.queue_spill_dir = os.environ['INFRAWATCH_QUEUE_SPILL_DIR']
+
+        if 'INFRAWATCH_QUEUE_BATCH_SIZE' in os.environ:
+            self.queue_batch_size = int(os.environ['INFRAWATCH_QUEUE_BATCH_SIZE'])
+
+        if 'INFRAWATCH_QUEUE_COMPRESSION' in os.environ:
+            self.queue_compression = os.environ['INFRAWATCH_QUEUE_COMPRESSION'].lower()
+
+        if 'INFRAWATCH_QUEUE_MAX_BATCH_WAIT' in os.environ:
+            self.queue_max_batch_wait = float(os.environ['INFRAWATCH_QUEUE_MAX_BATCH_WAIT'])
+
+        if 'INFRAWATCH_RELAY_ENABLED' in os.environ:
+            self.relay_enabled = os.environ['INFRAWATCH_RELAY_ENABLED'].lower() in ('1', 'true', 'yes', 'on')
+
+        if 'INFRAWATCH_RELAY_HOST' in os.environ:
+            self.relay_host = os.environ['INFRAWATCH_RELAY_HOST']
+
+        if 'INFRAWATCH_RELAY_PORT' in os.environ:
+            self.relay_port = int(os.environ['INFRAWATCH_RELAY_PORT'])
+
+        if 'INFRAWATCH_NETWORK_INCLUDE' in os.environ:
+            self.network_include = self._split_list(os.environ['INFRAWATCH_NETWORK_INCLUDE'])
+
+        if 'INFRAWATCH_NETWORK_EXCLUDE' in os.environ:
+            self.network_exclude = self._split_list(os.environ['INFRAWATCH_NETWORK_EXCLUDE'])
+
+        if 'INFRAWATCH_NETWORK_TOP_N' in os.environ:
+            self.network_top_n = int(os.environ['INFRAWATCH_NETWORK_TOP_N'])
+
+        if 'INFRAWATCH_CGROUP_ENABLED' in os.environ:
+            self.cgroup_enabled = os.environ['INFRAWATCH_CGROUP_ENABLED'].lower() in ('1', 'true', 'yes', 'on')
+
+        if 'INFRAWATCH_CGROUP_ROOT' in os.environ:
+            self.cgroup_root = os.environ['INFRAWATCH_CGROUP_ROOT']
+
+        if 'INFRAWATCH_CGROUP_TOP_N' in os.environ:
+            self.cgroup_top_n = int(os.environ['INFRAWATCH_CGROUP_TOP_N'])
+
+        if 'INFRAWATCH_CGROUP_MAX_DEPTH' in os.environ:
+            self.cgroup_max_depth = int(os.environ['INFRAWATCH_CGROUP_MAX_DEPTH'])
+
+        if 'INFRAWATCH_PRESSURE_ENABLED' in os.environ:
+            self.pressure_enabled = os.environ['INFRAWATCH_PRESSURE_ENABLED'].lower() in ('1', 'true', 'yes', 'on')
+
+        if 'INFRAWATCH_TCP_ENABLED' in os.environ:
+            self.tcp_enabled = os.environ['INFRAWATCH_TCP_ENABLED'].lower() in ('1', 'true', 'yes', 'on')
+
+        if 'INFRAWATCH_SCRIPTS' in os.environ:
+            self.scripts = {name: shlex.split(command)
+                            for name, command in json.loads(os.environ['INFRAWATCH_SCRIPTS']).items()}
+
+        if 'INFRAWATCH_SCRIPT_TIMEOUT' in os.environ:
+            self.script_timeout = int(os.environ['INFRAWATCH_SCRIPT_TIMEOUT'])
+
+        if 'INFRAWATCH_SHIP_LOG_FILES' in os.environ:
+            self.ship_log_files = self._split_list(os.environ['INFRAWATCH_SHIP_LOG_FILES'])
+
+        if 'INFRAWATCH_SHIP_LOG_STATE_FILE' in os.environ:
+            self.ship_log_state_file = os.environ['INFRAWATCH_SHIP_LOG_STATE_FILE']
+
+        if 'INFRAWATCH_ANOMALY_RULES' in os.environ:
+            self.anomaly_rules = json.loads(os.environ['INFRAWATCH_ANOMALY_RULES'])
+
+        if 'INFRAWATCH_PROBES' in os.environ:
+            self.probes = json.loads(os.environ['INFRAWATCH_PROBES'])
+
+        if 'INFRAWATCH_PROBE_INTERVAL' in os.environ:
+            self.probe_interval = int(os.environ['INFRAWATCH_PROBE_INTERVAL'])
+
         if 'INFRAWATCH_LOG_LEVEL' in os.environ:
             self.log_level = os.environ['INFRAWATCH_LOG_LEVEL']
 
         if 'INFRAWATCH_LOG_FILE' in os.environ:
             self.log_file = os.environ['INFRAWATCH_LOG_FILE']
 
+        if 'INFRAWATCH_LOG_MAX_BYTES' in os.environ:
+            self.log_max_bytes = int(os.environ['INFRAWATCH_LOG_MAX_BYTES'])
+
+        if 'INFRAWATCH_LOG_BACKUP_COUNT' in os.environ:
+            self.log_backup_count = int(os.environ['INFRAWATCH_LOG_BACKUP_COUNT'])
+
+        if 'INFRAWATCH_LOG_ROTATE_INTERVAL' in os.environ:
+            self.log_rotate_interval = int(os.environ['INFRAWATCH_LOG_ROTATE_INTERVAL'])
+
+        if 'INFRAWATCH_LOG_COMPRESS' in os.environ:
+            self.log_compress = os.environ['INFRAWATCH_LOG_COMPRESS'].lower() in ('1', 'true', 'yes', 'on')
+
+        if 'INFRAWATCH_LOG_RATE_LIMIT_INTERVAL' in os.environ:
+            self.log_rate_limit_interval = int(os.environ['INFRAWATCH_LOG_RATE_LIMIT_INTERVAL'])
+
+        if 'INFRAWATCH_LOG_RATE_LIMIT_BURST' in os.environ:
+            self.log_rate_limit_burst = int(os.environ['INFRAWATCH_LOG_RATE_LIMIT_BURST'])
+
+        if 'INFRAWATCH_LOG_QUEUE_SIZE' in os.environ:
+            self.log_queue_size = int(os.environ['INFRAWATCH_LOG_QUEUE_SIZE'])
+
         return True
 
     def _load_from_file(self):
@@ -105,6 +324,13 @@ class Config:
         self.vm_id = config_parser['Server']['vm_id']
         self.agent_token = config_parser['Server']['agent_token']
 
+        # Load runtime profile if present
+        if 'Agent' in config_parser:
+            if 'profile' in config_parser['Agent']:
+                self.profile = config_parser['Agent']['profile'].lower()
+            if 'memory_budget_mb' in config_parser['Agent']:
+                self.memory_budget_mb = config_parser['Agent'].getfloat('memory_budget_mb')
+
         # Load intervals if present
         if 'Intervals' in config_parser:
             if 'monitoring' in config_parser['Intervals']:
@@ -113,6 +339,127 @@ class Config:
                 self.heartbeat_interval = int(config_parser['Intervals']['heartbeat'])
             if 'command_polling' in config_parser['Intervals']:
                 self.command_polling_interval = int(config_parser['Intervals']['command_polling'])
+            if 'sampling' in config_parser['Intervals']:
+                self.sampling_interval = float(config_parser['Intervals']['sampling'])
+
+        # Load send queue settings if present
+        if 'Queue' in config_parser:
+            queue = config_parser['Queue']
+            if 'max_items' in queue:
+                self.queue_max_items = queue.getint('max_items')
+            if 'overflow' in queue:
+                self.queue_overflow = queue['overflow'].lower()
+            if 'spill_dir' in queue:
+                self.queue_spill_dir = queue['spill_dir']
+            if 'max_spill_files' in queue:
+                self.queue_max_spill_files = queue.getint('max_spill_files')
+            if 'batch_size' in queue:
+                self.queue_batch_size = queue.getint('batch_size')
+            if 'compression' in queue:
+                self.queue_compression = queue['compression'].lower()
+            if 'sketches' in queue:
+                self.queue_sketches = queue.getboolean('sketches')
+            if 'max_batch_wait' in queue:
+                self.queue_max_batch_wait = queue.getfloat('max_batch_wait')
+
+        # Load shared-memory export settings if present
+        if 'Export' in config_parser:
+            if 'sample_file' in config_parser['Export']:
+                self.sample_export_file = config_parser['Export']['sample_file']
+
+        # Load scheduling settings if present
+        if 'Scheduling' in config_parser:
+            if 'mode' in config_parser['Scheduling']:
+                self.schedule_mode = config_parser['Scheduling']['mode'].lower()
+            if 'startup_jitter' in config_parser['Scheduling']:
+                self.startup_jitter = config_parser['Scheduling'].getfloat('startup_jitter')
+
+        # Load relay settings if present
+        if 'Relay' in config_parser:
+            relay = config_parser['Relay']
+            if 'enabled' in relay:
+                self.relay_enabled = relay.getboolean('enabled')
+            if 'host' in relay:
+                self.relay_host = relay['host']
+            if 'port' in relay:
+                self.relay_port = relay.getint('port')
+            if 'flush_interval' in relay:
+                self.relay_flush_interval = relay.getfloat('flush_interval')
+            if 'max_batch' in relay:
+                self.relay_max_batch = relay.getint('max_batch')
+            if 'upstream_connections' in relay:
+                self.relay_upstream_connections = relay.getint('upstream_connections')
+            if 'max_queue' in relay:
+                self.relay_max_queue = relay.getint('max_queue')
+
+        # Load optional collector settings if present
+        if 'Collectors' in config_parser:
+            if 'network_include' in config_parser['Collectors']:
+                self.network_include = self._split_list(config_parser['Collectors']['network_include'])
+            if 'network_exclude' in config_parser['Collectors']:
+                self.network_exclude = self._split_list(config_parser['Collectors']['network_exclude'])
+            if 'network_top_n' in config_parser['Collectors']:
+                self.network_top_n = config_parser['Collectors'].getint('network_top_n')
+            if 'cgroups' in config_parser['Collectors']:
+                self.cgroup_enabled = config_parser['Collectors'].getboolean('cgroups')
+            if 'cgroup_root' in config_parser['Collectors']:
+                self.cgroup_root = config_parser['Collectors']['cgroup_root']
+            if 'cgroup_top_n' in config_parser['Collectors']:
+                self.cgroup_top_n = config_parser['Collectors'].getint('cgroup_top_n')
+            if 'cgroup_max_depth' in config_parser['Collectors']:
+                self.cgroup_max_depth = config_parser['Collectors'].getint('cgroup_max_depth')
+            if 'pressure' in config_parser['Collectors']:
+                self.pressure_enabled = config_parser['Collectors'].getboolean('pressure')
+            if 'tcp' in config_parser['Collectors']:
+                self.tcp_enabled = config_parser['Collectors'].getboolean('tcp')
+
+        # Load allow-listed scripts and their limits if present
+        if 'Scripts' in config_parser:
+            self.scripts = {name: shlex.split(command) for name, command in config_parser.items('Scripts', raw=True)}
+        if 'ScriptLimits' in config_parser:
+            limits = config_parser['ScriptLimits']
+            if 'timeout' in limits:
+                self.script_timeout = limits.getint('timeout')
+            if 'max_output_mb' in limits:
+                self.script_max_output_mb = limits.getfloat('max_output_mb')
+            if 'cpu_seconds' in limits:
+                self.script_cpu_seconds = limits.getint('cpu_seconds')
+            if 'memory_mb' in limits:
+                self.script_memory_mb = limits.getfloat('memory_mb')
+
+        # Load log shipping settings if present
+        if 'LogShipping' in config_parser:
+            shipping = config_parser['LogShipping']
+            if 'files' in shipping:
+                self.ship_log_files = self._split_list(shipping['files'])
+            if 'state_file' in shipping:
+                self.ship_log_state_file = shipping['state_file']
+            if 'batch_bytes' in shipping:
+                self.ship_log_batch_bytes = shipping.getint('batch_bytes')
+            if 'batch_interval' in shipping:
+                self.ship_log_batch_interval = shipping.getfloat('batch_interval')
+            if 'max_line_bytes' in shipping:
+                self.ship_log_max_line_bytes = shipping.getint('max_line_bytes')
+            if 'start_at' in shipping:
+                self.ship_log_start_at_end = shipping['start_at'].lower() == 'end'
+
+        # Load anomaly rules from [Anomaly:<name>] sections
+        for section in config_parser.sections():
+            if section.startswith('Anomaly:'):
+                self.anomaly_rules[section.split(':', 1)[1]] = dict(config_parser[section])
+
+        # Load probe settings and [Probe:<name>] sections
+        if 'Probes' in config_parser:
+            probes = config_parser['Probes']
+            if 'interval' in probes:
+                self.probe_interval = probes.getint('interval')
+            if 'concurrency' in probes:
+                self.probe_concurrency = probes.getint('concurrency')
+            if 'timeout' in probes:
+                self.probe_timeout = probes.getfloat('timeout')
+        for section in config_parser.sections():
+            if section.startswith('Probe:'):
+                self.probes[section.split(':', 1)[1]] = dict(config_parser[section])
 
         # Load logging settings if present
         if 'Logging' in config_parser:
@@ -120,6 +467,20 @@ class Config:
                 self.log_level = config_parser['Logging']['level']
             if 'file' in config_parser['Logging']:
                 self.log_file = config_parser['Logging']['file']
+            if 'max_bytes' in config_parser['Logging']:
+                self.log_max_bytes = config_parser['Logging'].getint('max_bytes')
+            if 'backup_count' in config_parser['Logging']:
+                self.log_backup_count = config_parser['Logging'].getint('backup_count')
+            if 'rotate_interval' in config_parser['Logging']:
+                self.log_rotate_interval = config_parser['Logging'].getint('rotate_interval')
+            if 'compress' in config_parser['Logging']:
+                self.log_compress = config_parser['Logging'].getboolean('compress')
+            if 'rate_limit_interval' in config_parser['Logging']:
+                self.log_rate_limit_interval = config_parser['Logging'].getint('rate_limit_interval')
+            if 'rate_limit_burst' in config_parser['Logging']:
+                self.log_rate_limit_burst = config_parser['Logging'].getint('rate_limit_burst')
+            if 'queue_size' in config_parser['Logging']:
+                self.log_queue_size = config_parser['Logging'].getint('queue_size')
 
         return True
 
@@ -132,6 +493,11 @@ class Config:
         if not self.agent_token:
             raise ValueError("Agent token is required")
 
+        if self.profile not in self.PROFILE_MEMORY_BUDGET_MB:
+            raise ValueError("Profile must be 'standard' or 'low'")
+        if self.memory_budget_mb is not None and self.memory_budget_mb <= 0:
+            raise ValueError("Memory budget must be positive")
+
         # Ensure intervals are positive integers
         if self.monitoring_interval <= 0:
             raise ValueError("Monitoring interval must be a positive integer")
@@ -139,6 +505,69 @@ class Config:
             raise ValueError("Heartbeat interval must be a positive integer")
         if self.command_polling_interval <= 0:
             raise ValueError("Command polling interval must be a positive integer")
+        if self.sampling_interval < 0:
+            raise ValueError("Sampling interval must not be negative")
+
+        if self.sample_export_file and self.sampling_interval <= 0:
+            raise ValueError("Sample export requires a positive sampling interval")
+
+        if self.queue_max_items <= 0 or self.queue_max_spill_files <= 0:
+            raise ValueError("Queue size and spill file limit must be positive integers")
+        if self.queue_overflow not in ('drop_oldest', 'coalesce', 'spill'):
+            raise ValueError("Queue overflow must be 'drop_oldest', 'coalesce' or 'spill'")
+        if not 1 <= self.queue_batch_size <= 100:
+            raise ValueError("Queue batch size must be between 1 and 100")
+        if self.queue_compression not in ('none', 'gzip'):
+            raise ValueError("Queue compression must be 'none' or 'gzip'")
+        if self.queue_max_batch_wait <= 0:
+            raise ValueError("Queue max batch wait must be positive")
+
+        if self.schedule_mode not in ('interval', 'fleet'):
+            raise ValueError("Schedule mode must be 'interval' or 'fleet'")
+        if self.startup_jitter < 0:
+            raise ValueError("Startup jitter must not be negative")
+
+        if self.relay_enabled:
+            if not 0 < self.relay_port < 65536:
+                raise ValueError("Relay port must be between 1 and 65535")
+            if self.relay_flush_interval <= 0 or self.relay_max_batch <= 0:
+                raise ValueError("Relay flush interval and batch size must be positive")
+            if self.relay_upstream_connections <= 0 or self.relay_max_queue <= 0:
+                raise ValueError("Relay connections and queue size must be positive integers")
+
+        if self.network_top_n < 0:
+            raise ValueError("Network top-N must not be negative")
+        if not self.network_include:
+            raise ValueError("At least one network include pattern is required")
+
+        if self.script_timeout <= 0 or self.script_max_output_mb <= 0:
+            raise ValueError("Script timeout and output limit must be positive")
+        if self.script_cpu_seconds < 0 or self.script_memory_mb < 0:
+            raise ValueError("Script resource limits must not be negative")
+        for name, argv in self.scripts.items():
+            if not argv or not os.path.isabs(argv[0]):
+                raise ValueError(f"Script {name} must be an absolute command path")
+
+        if self.ship_log_files:
+            if self.ship_log_batch_bytes <= 0 or self.ship_log_batch_interval <= 0:
+                raise ValueError("Log shipping batch size and interval must be positive")
+            if not 0 < self.ship_log_max_line_bytes <= self.ship_log_batch_bytes:
+                raise ValueError("Log shipping max line size must be positive and within the batch size")
+
+        if self.probes:
+            if self.probe_interval <= 0 or self.probe_concurrency <= 0 or self.probe_timeout <= 0:
+                raise ValueError("Probe interval, concurrency and timeout must be positive")
+            if self.probe_timeout >= self.probe_interval:
+                raise ValueError("Probe timeout must be shorter than the probe interval")
+
+        if self.cgroup_top_n <= 0 or self.cgroup_max_depth <= 0:
+            raise ValueError("cgroup top-N and max depth must be positive integers")
+
+        # Ensure logging limits are sane
+        if self.log_max_bytes < 0 or self.log_backup_count < 0 or self.log_rotate_interval < 0:
+            raise ValueError("Log rotation settings must not be negative")
+        if self.log_queue_size <= 0:
+            raise ValueError("Log queue size must be a positive integer")
 
         # Ensure log directory exists
         log_dir = os.path.dirname(self.log_file)
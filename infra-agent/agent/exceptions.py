@@ -12,7 +12,10 @@ class ConfigError(AgentError):
 
 class APIError(AgentError):
     """API communication errors"""
-    pass
+
+    def __init__(self, message, status_code=None):
+        super().__init__(message)
+        self.status_code = status_code
 
 class CollectorError(AgentError):
     """Data collection errors"""
@@ -20,4 +23,19 @@ class CollectorError(AgentError):
 
 class AuthenticationError(APIError):
     """Authentication-related errors"""
-    pass
\ No newline at end of file
+    pass
+
+class ServerBusyError(APIError):
+    """Server is overloaded (429/503) and asked the agent to back off"""
+
+    def __init__(self, message, retry_after=None, status_code=None):
+        super().__init__(message, status_code)
+        self.retry_after = retry_after
+
+class CircuitOpenError(APIError):
+    """Call refused locally because the endpoint's circuit breaker is open"""
+
+    def __init__(self, endpoint, retry_at):
+        super().__init__(f"Circuit for {endpoint} is open")
+        self.endpoint = endpoint
+        self.retry_at = retry_at
\ No newline at end of file
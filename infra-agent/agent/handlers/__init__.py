@@ -2,12 +2,28 @@
 Command handlers package
 """
 from .ssh_key_updater import SSHKeyUpdater
+from .anomaly_rules_updater import AnomalyRulesUpdater
+from .script_runner import ScriptRunner
+from .agent_profiler import AgentProfiler
 
 # Map command types to handler classes
 HANDLERS = {
     'UPDATE_SSH_KEY': SSHKeyUpdater()
 }
 
+def register_handler(command_type, handler):
+    """
+    Register a handler for a command type
+
+    Used for handlers that need agent state and so cannot be created at
+    import time.
+
+    Args:
+        command_type (str): Type of command
+        handler (object): Handler instance exposing handle(payload)
+    """
+    HANDLERS[command_type] = handler
+
 def get_handler(command_type):
     """
     Get the appropriate handler for a command type
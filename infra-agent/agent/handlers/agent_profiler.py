@@ -0,0 +1,299 @@
+"""
+Agent profiler handler for time-boxed self-profiling on demand
+"""
+import os
+import sys
+import time
+import logging
+import threading
+import tracemalloc
+
+# Frames kept per sampled stack, innermost first
+MAX_STACK_DEPTH = 24
+
+# Distinct stacks tracked per thread; further stacks are counted as '(other)'
+MAX_STACKS_PER_THREAD = 256
+
+# Share of wall time the sampler may spend on itself before it slows down
+MAX_OVERHEAD = 0.02
+
+# Thread start-up frames common to every thread, left out of stacks
+BOOTSTRAP_CODE = {
+    threading.Thread._bootstrap.__code__,
+    threading.Thread._bootstrap_inner.__code__,
+    threading.Thread.run.__code__
+}
+
+
+def _thread_cpu_seconds():
+    """
+    Read CPU time per thread of this process
+
+    Returns:
+        dict: Native thread ID to user+system CPU seconds (empty where
+            /proc is unavailable)
+    """
+    ticks = os.sysconf('SC_CLK_TCK') if hasattr(os, 'sysconf') else 100
+    cpu = {}
+    try:
+        tasks = os.listdir('/proc/self/task')
+    except OSError:
+        return cpu
+    for tid in tasks:
+        try:
+            with open(f'/proc/self/task/{tid}/stat') as f:
+                # Fields after the parenthesised command name; utime and stime are 14 and 15
+                fields = f.read().rpartition(')')[2].split()
+        except OSError:
+            continue
+        cpu[int(tid)] = (int(fields[11]) + int(fields[12])) / ticks
+    return cpu
+
+
+class AgentProfiler:
+    """
+    Handler for profiling the agent itself
+
+    The command thread walks the stacks of all threads at a fixed interval and
+    counts leaf and inclusive frames per thread. Memory is bounded by a cap on
+    distinct stacks, and the sampler backs off when its own cost exceeds
+    MAX_OVERHEAD of wall time. tracemalloc runs only for the profile window,
+    with a single frame per allocation, so it sees allocations made and still
+    live during the window. Only one profile runs at a time.
+    """
+
+    # Run on a background thread so polling continues while profiling
+    streaming = True
+
+    def __init__(self, scheduler, max_duration=60, top=15):
+        """
+        Initialize the handler
+
+        Args:
+            scheduler: Scheduler whose job timings are reported
+            max_duration: Longest profile allowed in seconds
+            top: Default number of entries in each top list
+        """
+        self.scheduler = scheduler
+        self.max_duration = max_duration
+        self.top = top
+        self._lock = threading.Lock()
+
+    def handle(self, payload, command_id=None):
+        """
+        Handle agent profile command
+
+        Args:
+            payload (dict): Command payload containing:
+                - duration: Profile length in seconds, capped at the
+                  configured maximum (optional, default 10)
+                - interval: Stack sampling interval in seconds (optional,
+                  default 0.01)
+                - top: Entries in each top list (optional)
+                - memory: Trace allocations with tracemalloc (optional,
+                  default true)
+            command_id: ID of the command
+
+        Returns:
+            dict: Result of the operation with:
+                - status: 'SUCCESS' or 'ERROR'
+                - message: Description of the result
+                - data: Profile summary
+        """
+        duration = min(float(payload.get('duration') or 10), self.max_duration)
+        interval = min(max(float(payload.get('interval') or 0.01), 0.001), 1.0)
+        top = int(payload.get('top') or self.top)
+        trace_memory = payload.get('memory', True)
+
+        if duration <= 0:
+            return {
+                'status': 'ERROR',
+                'message': 'Profile duration must be positive'
+            }
+
+        if not self._lock.acquire(blocking=False):
+            return {
+                'status': 'ERROR',
+                'message': 'A profile is already running'
+            }
+
+        try:
+            logging.info(f"Profiling agent for {duration}s (command {command_id})")
+            data = self._profile(duration, interval, top, trace_memory)
+        finally:
+            self._lock.release()
+
+        return {
+            'status': 'SUCCESS',
+            'message': f'Profiled agent for {duration}s',
+            'data': data
+        }
+
+    def _profile(self, duration, interval, top, trace_memory):
+        """Run one profile and build its summary"""
+        started_tracing = False
+        if trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start(1)
+            started_tracing = True
+        if trace_memory:
+            if hasattr(tracemalloc, 'reset_peak'):
+                tracemalloc.reset_peak()
+            baseline = tracemalloc.take_snapshot()
+
+        cpu_before = _thread_cpu_seconds()
+        times_before = os.times()
+        wall_started = time.monotonic()
+
+        samples, sampler_seconds, final_interval = self._sample(duration, interval)
+
+        wall = time.monotonic() - wall_started
+        times_after = os.times()
+        cpu_after = _thread_cpu_seconds()
+
+        memory = None
+        if trace_memory:
+            snapshot = tracemalloc.take_snapshot()
+            current, peak = tracemalloc.get_traced_memory()
+            if started_tracing:
+                tracemalloc.stop()
+            memory = self._memory_summary(snapshot, baseline, current, peak, top)
+
+        process_cpu = (times_after.user - times_before.user) + (times_after.system - times_before.system)
+        return {
+            'durationSeconds': round(wall, 3),
+            'process': {
+                'cpuPercent': round(process_cpu / wall * 100, 2) if wall > 0 else 0.0,
+                'rssKb': self._rss_kb(),
+                'threads': threading.active_count()
+            },
+            'sampler': {
+                'intervalMs': round(interval * 1000, 3),
+                'finalIntervalMs': round(final_interval * 1000, 3),
+                'overheadPercent': round(sampler_seconds / wall * 100, 3) if wall > 0 else 0.0
+            },
+            'threads': self._thread_summary(samples, cpu_before, cpu_after, top),
+            'memory': memory,
+            'jobs': self.scheduler.get_job_timings()
+        }
+
+    def _sample(self, duration, interval):
+        """
+        Sample all thread stacks for a duration
+
+        Returns:
+            tuple: (per-thread sample counts, seconds spent sampling, final interval)
+        """
+        own = threading.get_ident()
+        # Thread ident -> sample count plus frame and stack counts
+        samples = {}
+        spent = 0.0
+        deadline = time.monotonic() + duration
+
+        while True:
+            tick = time.monotonic()
+            if tick >= deadline:
+                break
+
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                thread = samples.get(ident)
+                if thread is None:
+                    thread = samples[ident] = {'samples': 0, 'leaf': {}, 'inclusive': {}, 'stacks': {}}
+                thread['samples'] += 1
+
+                stack = []
+                while frame is not None and len(stack) < MAX_STACK_DEPTH:
+                    code = frame.f_code
+                    if code in BOOTSTRAP_CODE:
+                        break
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                    frame = frame.f_back
+                del frame
+
+                if not stack:
+                    continue
+                leaf = thread['leaf']
+                leaf[stack[0]] = leaf.get(stack[0], 0) + 1
+                inclusive = thread['inclusive']
+                for entry in set(stack):
+                    inclusive[entry] = inclusive.get(entry, 0) + 1
+
+                key = ';'.join(reversed(stack))
+                stacks = thread['stacks']
+                if key not in stacks and len(stacks) >= MAX_STACKS_PER_THREAD:
+                    key = '(other)'
+                stacks[key] = stacks.get(key, 0) + 1
+
+            cost = time.monotonic() - tick
+            spent += cost
+            # Keep the sampler under its overhead budget
+            if cost > interval * MAX_OVERHEAD:
+                interval = min(interval * 2, 1.0)
+            time.sleep(max(min(interval - cost, deadline - time.monotonic()), 0))
+
+        return samples, spent, interval
+
+    @staticmethod
+    def _top(counts, total, top):
+        """Return the largest counts as [{'frame', 'percent'}]"""
+        ranked = sorted(counts.items(), key=lambda item: item[1], reverse=True)[:top]
+        return [{'frame': frame, 'percent': round(count / total * 100, 1)} for frame, count in ranked]
+
+    def _thread_summary(self, samples, cpu_before, cpu_after, top):
+        """Summarise per-thread samples, busiest first"""
+        threads = {thread.ident: thread for thread in threading.enumerate()}
+        summary = []
+        for ident, data in samples.items():
+            thread = threads.get(ident)
+            native_id = getattr(thread, 'native_id', None)
+            cpu = None
+            if native_id in cpu_after:
+                # Threads started during the profile count from zero
+                cpu = round(cpu_after[native_id] - cpu_before.get(native_id, 0.0), 3)
+
+            total = data['samples']
+            summary.append({
+                'name': thread.name if thread else f'thread-{ident}',
+                'cpuSeconds': cpu,
+                'samples': total,
+                'topSelf': self._top(data['leaf'], total, top),
+                'topInclusive': self._top(data['inclusive'], total, top),
+                'topStacks': [{'stack': entry['frame'], 'percent': entry['percent']}
+                              for entry in self._top(data['stacks'], total, 5)]
+            })
+
+        summary.sort(key=lambda entry: entry['cpuSeconds'] or 0, reverse=True)
+        return summary
+
+    @staticmethod
+    def _memory_summary(snapshot, baseline, current, peak, top):
+        """Summarise allocations made and still live during the profile"""
+        # Leave out the profiler's own bookkeeping
+        filters = [tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, __file__)]
+        diff = snapshot.filter_traces(filters).compare_to(baseline.filter_traces(filters), 'lineno')
+        grown = [stat for stat in diff if stat.size_diff > 0][:top]
+        return {
+            'tracedKb': round(current / 1024, 1),
+            'peakKb': round(peak / 1024, 1),
+            'topAllocations': [
+                {
+                    'location': f"{stat.traceback[0].filename}:{stat.traceback[0].lineno}",
+                    'sizeKb': round(stat.size_diff / 1024, 1),
+                    'count': stat.count_diff
+                }
+                for stat in grown
+            ]
+        }
+
+    @staticmethod
+    def _rss_kb():
+        """Return the resident set size of this process in KB"""
+        try:
+            with open('/proc/self/status') as f:
+                for line in f:
+                    if line.startswith('VmRSS:'):
+                        return int(line.split()[1])
+        except OSError:
+            pass
+        return None
@@ -0,0 +1,54 @@
+"""
+Anomaly rules updater handler for replacing the agent's detection rules
+"""
+import logging
+
+class AnomalyRulesUpdater:
+    """Handler for rules pushed from the server"""
+
+    def __init__(self, detector):
+        """
+        Initialize the handler
+
+        Args:
+            detector: AnomalyDetector whose rules are replaced
+        """
+        self.detector = detector
+
+    def handle(self, payload):
+        """
+        Handle anomaly rules update command
+
+        Args:
+            payload (dict): Command payload containing:
+                - rules: Mapping of rule name to rule settings
+                - version: Version of the rule set (optional)
+
+        Returns:
+            dict: Result of the operation with:
+                - status: 'SUCCESS' or 'ERROR'
+                - message: Description of the result
+        """
+        rules = payload.get('rules')
+        if not isinstance(rules, dict):
+            return {
+                'status': 'ERROR',
+                'message': 'Missing rules in payload'
+            }
+
+        try:
+            self.detector.update_rules(rules, payload.get('version'))
+        except (KeyError, TypeError, ValueError) as e:
+            logging.error(f"Rejected anomaly rules: {e}")
+            return {
+                'status': 'ERROR',
+                'message': f'Invalid anomaly rules: {e}'
+            }
+
+        return {
+            'status': 'SUCCESS',
+            'message': f'Loaded {len(rules)} anomaly rules',
+            'data': {
+                'version': payload.get('version')
+            }
+        }
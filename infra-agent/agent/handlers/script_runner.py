@@ -0,0 +1,326 @@
+"""
+Script runner handler for allow-listed diagnostic commands with streamed output
+"""
+import os
+import time
+import queue
+import codecs
+import signal
+import select
+import logging
+import platform
+import threading
+import subprocess
+from ..exceptions import APIError
+
+# Import resource module only on Unix/Linux systems
+if platform.system() != 'Windows':
+    import resource
+
+# Bytes read from a pipe at a time
+READ_SIZE = 16 * 1024
+
+# Seconds a killed command gets between SIGTERM and SIGKILL
+KILL_GRACE = 5
+
+# Seconds between checks of the stop flag by a blocked reader
+PUMP_POLL = 0.5
+
+
+class ScriptRunner:
+    """
+    Handler for running allow-listed commands and streaming their output
+
+    Output is read through a bounded queue and uploaded in chunks while the
+    command runs. A slow upload blocks the readers, which in turn blocks the
+    command on its full pipe, so memory stays bounded. The server can cancel
+    a running command in its reply to any chunk.
+    """
+
+    # Run on a background thread and receive the command ID
+    streaming = True
+
+    def __init__(self, api_client, scripts, timeout=300, max_output_bytes=50 * 1024 * 1024,
+                 chunk_bytes=64 * 1024, flush_interval=1.0, cpu_seconds=300,
+                 memory_bytes=512 * 1024 * 1024, max_running=1):
+        """
+        Initialize the handler
+
+        Args:
+            api_client: APIClient used to upload output chunks
+            scripts: Mapping of script name to argv list; only these can run
+            timeout: Maximum run time in seconds
+            max_output_bytes: Output uploaded per run; the rest is discarded
+            chunk_bytes: Upload a chunk once this much output is pending
+            flush_interval: Upload pending output at least this often (seconds)
+            cpu_seconds: CPU time limit of the command (RLIMIT_CPU)
+            memory_bytes: Address space limit of the command (RLIMIT_AS)
+            max_running: Maximum number of commands running at once
+        """
+        self.api_client = api_client
+        self.scripts = scripts
+        self.timeout = timeout
+        self.max_output_bytes = max_output_bytes
+        self.chunk_bytes = chunk_bytes
+        self.flush_interval = flush_interval
+        self.cpu_seconds = cpu_seconds
+        self.memory_bytes = memory_bytes
+        self.max_running = max_running
+
+        self.running = set()
+        self._lock = threading.Lock()
+
+    def _set_limits(self, proc):
+        """
+        Apply resource limits and a lower priority to a started command
+
+        Set from the agent with prlimit() right after the spawn: a
+        preexec_fn can deadlock the child of a multi-threaded process.
+
+        Raises:
+            OSError: If the limits cannot be applied; the command is killed
+        """
+        if platform.system() == 'Windows' or not hasattr(resource, 'prlimit'):
+            return
+        try:
+            if self.cpu_seconds:
+                resource.prlimit(proc.pid, resource.RLIMIT_CPU, (self.cpu_seconds, self.cpu_seconds))
+            if self.memory_bytes:
+                resource.prlimit(proc.pid, resource.RLIMIT_AS, (self.memory_bytes, self.memory_bytes))
+            os.setpriority(os.PRIO_PROCESS, proc.pid, min(os.getpriority(os.PRIO_PROCESS, 0) + 10, 19))
+        except ProcessLookupError:
+            # Already exited
+            pass
+        except (OSError, ValueError) as e:
+            self._kill(proc)
+            proc.wait()
+            proc.stdout.close()
+            proc.stderr.close()
+            raise OSError(f"cannot apply resource limits: {e}")
+
+    @staticmethod
+    def _pump(pipe, name, chunks, stop):
+        """Copy a pipe into the chunk queue, blocking while the queue is full, until EOF or stop"""
+        def put(item):
+            while not stop.is_set():
+                try:
+                    chunks.put(item, timeout=PUMP_POLL)
+                    return
+                except queue.Full:
+                    pass
+
+        with pipe:
+            while not stop.is_set():
+                if not select.select([pipe], [], [], PUMP_POLL)[0]:
+                    continue
+                data = os.read(pipe.fileno(), READ_SIZE)
+                if not data:
+                    break
+                put((name, data))
+        put((name, None))
+
+    @staticmethod
+    def _kill(proc):
+        """Terminate the command's process group, escalating to SIGKILL"""
+        if proc.poll() is not None:
+            return
+        try:
+            os.killpg(proc.pid, signal.SIGTERM)
+            proc.wait(KILL_GRACE)
+        except subprocess.TimeoutExpired:
+            os.killpg(proc.pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+
+    def _upload(self, command_id, chunk):
+        """
+        Upload one chunk
+
+        Returns:
+            bool: True if the server asked to cancel the command
+        """
+        try:
+            response = self.api_client.send_command_output(command_id, chunk)
+        except APIError as e:
+            logging.warning(f"Dropped output chunk {chunk['seq']} of command {command_id}: {e}")
+            return False
+        return bool(response.get('cancel'))
+
+    def handle(self, payload, command_id=None):
+        """
+        Handle script run command
+
+        Args:
+            payload (dict): Command payload containing:
+                - script: Name of an allow-listed script
+                - timeout: Run time limit in seconds, capped at the configured
+                  timeout (optional)
+            command_id: ID of the command, used for output uploads
+
+        Returns:
+            dict: Result of the operation with:
+                - status: 'SUCCESS' or 'ERROR'
+                - message: Description of the result
+                - data: Exit code, output size and termination reason
+        """
+        name = payload.get('script')
+        argv = self.scripts.get(name)
+        if not argv:
+            return {
+                'status': 'ERROR',
+                'message': f'Script {name} is not allowed on this agent'
+            }
+
+        with self._lock:
+            if command_id in self.running:
+                return {
+                    'status': 'ERROR',
+                    'message': f'Command {command_id} is already running'
+                }
+            if len(self.running) >= self.max_running:
+                return {
+                    'status': 'ERROR',
+                    'message': 'Too many scripts running'
+                }
+            self.running.add(command_id)
+
+        try:
+            return self._run(name, argv, min(payload.get('timeout') or self.timeout, self.timeout), command_id)
+        except OSError as e:
+            logging.error(f"Failed to run script {name}: {e}")
+            return {
+                'status': 'ERROR',
+                'message': f'Failed to run script {name}: {e}'
+            }
+        finally:
+            with self._lock:
+                self.running.discard(command_id)
+
+    def _run(self, name, argv, timeout, command_id):
+        """Run a command, streaming its output, and build the result"""
+        logging.info(f"Running script {name} for command {command_id} (timeout {timeout}s)")
+        started = time.time()
+        proc = subprocess.Popen(
+            argv,
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            start_new_session=True
+        )
+        self._set_limits(proc)
+
+        # At most ~1 MB of output waits in memory besides the pending chunk
+        chunks = queue.Queue(maxsize=64)
+        stop = threading.Event()
+        readers = [
+            threading.Thread(target=self._pump, args=(pipe, stream, chunks, stop), daemon=True)
+            for stream, pipe in (('stdout', proc.stdout), ('stderr', proc.stderr))
+        ]
+        for reader in readers:
+            reader.start()
+
+        decoders = {stream: codecs.getincrementaldecoder('utf-8')(errors='replace')
+                    for stream in ('stdout', 'stderr')}
+        pending = {'stdout': [], 'stderr': []}
+        pending_bytes = total_bytes = kept_bytes = 0
+        seq = 0
+        timed_out = cancelled = False
+
+        deadline = started + timeout
+
+        # An empty first chunk marks the command in progress
+        cancelled = self._upload(command_id, {'seq': seq, 'bytes': 0, 'elapsedMs': 0, 'done': False})
+        if cancelled:
+            self._kill(proc)
+            deadline = time.time() + KILL_GRACE
+
+        next_flush = started + self.flush_interval
+        open_streams = 2
+        while open_streams:
+            try:
+                stream, data = chunks.get(timeout=max(min(next_flush, deadline) - time.time(), 0))
+            except queue.Empty:
+                pass
+            else:
+                if data is None:
+                    open_streams -= 1
+                else:
+                    total_bytes += len(data)
+                    keep = data[:max(self.max_output_bytes - kept_bytes, 0)]
+                    if keep:
+                        pending[stream].append(decoders[stream].decode(keep))
+                        pending_bytes += len(keep)
+                        kept_bytes += len(keep)
+
+            now = time.time()
+            if now >= deadline:
+                if timed_out or cancelled:
+                    # A detached descendant still holds the pipes open
+                    logging.warning(f"Script {name} output still open after kill, giving up")
+                    break
+                logging.warning(f"Script {name} timed out after {timeout}s")
+                timed_out = True
+                self._kill(proc)
+                deadline = time.time() + KILL_GRACE
+
+            # Flush at least every interval, even without new output: the
+            # elapsed time shows progress and the reply may cancel the command
+            if pending_bytes >= self.chunk_bytes or now >= next_flush:
+                seq += 1
+                chunk = {
+                    'seq': seq,
+                    'stdout': ''.join(pending['stdout']),
+                    'stderr': ''.join(pending['stderr']),
+                    'bytes': total_bytes,
+                    'elapsedMs': round((now - started) * 1000),
+                    'done': False
+                }
+                pending = {'stdout': [], 'stderr': []}
+                pending_bytes = 0
+                if self._upload(command_id, chunk) and not (timed_out or cancelled):
+                    logging.info(f"Script {name} cancelled by server")
+                    cancelled = True
+                    self._kill(proc)
+                    deadline = time.time() + KILL_GRACE
+            if now >= next_flush:
+                next_flush = now + self.flush_interval
+
+        # Readers left behind on a pipe held open by a descendant exit and
+        # close their end
+        stop.set()
+        for reader in readers:
+            reader.join(PUMP_POLL * 2)
+
+        try:
+            exit_code = proc.wait(KILL_GRACE)
+        except subprocess.TimeoutExpired:
+            self._kill(proc)
+            exit_code = proc.wait()
+
+        duration_ms = round((time.time() - started) * 1000)
+        self._upload(command_id, {
+            'seq': seq + 1,
+            'stdout': ''.join(pending['stdout']) + decoders['stdout'].decode(b'', final=True),
+            'stderr': ''.join(pending['stderr']) + decoders['stderr'].decode(b'', final=True),
+            'bytes': total_bytes,
+            'elapsedMs': duration_ms,
+            'done': True
+        })
+
+        data = {
+            'script': name,
+            'exitCode': exit_code,
+            'timedOut': timed_out,
+            'cancelled': cancelled,
+            'outputBytes': total_bytes,
+            'truncated': total_bytes > kept_bytes,
+            'durationMs': duration_ms
+        }
+
+        if timed_out:
+            return {'status': 'ERROR', 'message': f'Script {name} timed out after {timeout}s', 'data': data}
+        if cancelled:
+            return {'status': 'ERROR', 'message': f'Script {name} was cancelled', 'data': data}
+        if exit_code != 0:
+            return {'status': 'ERROR', 'message': f'Script {name} exited with code {exit_code}', 'data': data}
+        return {'status': 'SUCCESS', 'message': f'Script {name} completed', 'data': data}
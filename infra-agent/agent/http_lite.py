@@ -0,0 +1,61 @@
+"""
+Minimal HTTP transport on urllib for the low-footprint profile
+
+Exposes the subset of the requests API used by APIClient so that the
+requests/urllib3 stack does not have to be loaded.
+"""
+import json as json_module
+import urllib.request
+import urllib.error
+
+
+class RequestException(Exception):
+    """Connection-level failure (DNS, refused, timeout, TLS)"""
+    pass
+
+
+class Response:
+    """HTTP response with the attributes APIClient reads"""
+
+    __slots__ = ('status_code', 'headers', 'text')
+
+    def __init__(self, status_code, headers, text):
+        self.status_code = status_code
+        self.headers = headers
+        self.text = text
+
+    def json(self):
+        """Decode the body as JSON"""
+        return json_module.loads(self.text)
+
+
+def request(method, url, headers=None, timeout=None, json=None, data=None):
+    """
+    Send an HTTP request
+
+    Args:
+        method: HTTP method
+        url: Request URL
+        headers: Request headers
+        timeout: Timeout in seconds
+        json: Object sent as a JSON body (optional)
+        data: Raw body bytes (optional)
+
+    Returns:
+        Response: Response for any HTTP status
+
+    Raises:
+        RequestException: If no HTTP response was received
+    """
+    if json is not None:
+        data = json_module.dumps(json).encode('utf-8')
+
+    req = urllib.request.Request(url, data=data, headers=headers or {}, method=method)
+    try:
+        with urllib.request.urlopen(req, timeout=timeout) as resp:
+            return Response(resp.status, resp.headers, resp.read().decode('utf-8', 'replace'))
+    except urllib.error.HTTPError as e:
+        with e:
+            return Response(e.code, e.headers, e.read().decode('utf-8', 'replace'))
+    except (urllib.error.URLError, OSError, ValueError) as e:
+        raise RequestException(str(e))
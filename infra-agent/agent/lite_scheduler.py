@@ -0,0 +1,238 @@
+"""
+Minimal built-in timer loop for the low-footprint profile
+"""
+import heapq
+import random
+import logging
+import time
+import threading
+from .timing import MODE_INTERVAL, MODE_FLEET, JobTiming, phase_offset, next_grid_tick
+
+
+class _Job:
+    """A scheduled function"""
+
+    __slots__ = ('name', 'func', 'args', 'interval', 'phase', 'next_run')
+
+    def __init__(self, name, func, args, interval, phase, next_run):
+        self.name = name
+        self.func = func
+        self.args = args
+        self.interval = interval
+        self.phase = phase
+        self.next_run = next_run
+
+
+class LiteScheduler:
+    """
+    Single-threaded drop-in replacement for Scheduler
+
+    Jobs run one at a time on a single timer thread, which avoids
+    APScheduler's executor, job store and thread pool. A long job delays the
+    others; missed runs are coalesced and counted. Supports the same
+    'interval' and 'fleet' modes as Scheduler.
+    """
+
+    def __init__(self, mode=MODE_INTERVAL, vm_id=None, startup_jitter=0):
+        """
+        Initialize the scheduler
+
+        Args:
+            mode: 'interval' or 'fleet', see Scheduler
+            vm_id: VM ID used to derive phase offsets in fleet mode
+            startup_jitter: Maximum random delay in seconds before the first
+                run of each network job in fleet mode
+        """
+        self.mode = mode
+        self.vm_id = vm_id or ''
+        self.startup_jitter = startup_jitter
+        self.running = False
+
+        self.jobs = {}
+        self.timings = {}
+        self._heap = []
+        self._seq = 0
+        self._cond = threading.Condition()
+        self._thread = None
+
+    def start(self):
+        """Start the scheduler"""
+        if not self.running:
+            self.running = True
+            self._thread = threading.Thread(target=self._loop, name='lite-scheduler', daemon=True)
+            self._thread.start()
+            logging.info("Scheduler started")
+
+    def stop(self):
+        """Stop the scheduler, waiting for a running job to finish"""
+        if self.running:
+            with self._cond:
+                self.running = False
+                self._cond.notify()
+            if self._thread is not threading.current_thread():
+                self._thread.join()
+            logging.info("Scheduler stopped")
+
+    def _push(self, job, when):
+        """Queue a job to run at a time; callers hold the condition"""
+        job.next_run = when
+        self._seq += 1
+        heapq.heappush(self._heap, (when, self._seq, job))
+        self._cond.notify()
+
+    def _loop(self):
+        """Run due jobs until stopped"""
+        while True:
+            with self._cond:
+                while self.running:
+                    if self._heap:
+                        when, _, job = self._heap[0]
+                        # Drop entries superseded by a reschedule or replacement
+                        if job.next_run != when or (job.interval and self.jobs.get(job.name) is not job):
+                            heapq.heappop(self._heap)
+                            continue
+                        delay = when - time.time()
+                        if delay <= 0:
+                            heapq.heappop(self._heap)
+                            break
+                        self._cond.wait(delay)
+                    else:
+                        self._cond.wait()
+                if not self.running:
+                    return
+
+            self._run(job, when)
+
+    def _run(self, job, scheduled):
+        """Run a job and schedule its next run"""
+        timing = self.timings.get(job.name)
+        if timing is not None:
+            timing.record(max(time.time() - scheduled, 0.0))
+
+        started = time.monotonic()
+        try:
+            job.func(*job.args)
+        except Exception as e:
+            logging.error(f"Job {job.name} raised an exception: {e}")
+        if timing is not None:
+            timing.record_duration(time.monotonic() - started)
+
+        if not job.interval:
+            return
+
+        with self._cond:
+            if self.jobs.get(job.name) is not job or job.next_run != scheduled:
+                return
+            now = time.time()
+            if self.mode == MODE_FLEET:
+                next_run = next_grid_tick(max(now, scheduled + job.interval / 2), job.interval, job.phase)
+            else:
+                next_run = scheduled + job.interval
+                if next_run <= now:
+                    skipped = int((now - next_run) // job.interval) + 1
+                    next_run += skipped * job.interval
+                    if timing is not None:
+                        timing.missed += skipped
+            self._push(job, next_run)
+
+    def get_job_timings(self):
+        """
+        Get start lateness and run duration statistics of periodic jobs
+
+        Returns:
+            dict: Job name to timing statistics
+        """
+        with self._cond:
+            return {name: timing.to_dict() for name, timing in self.timings.items()}
+
+    def _add_periodic_job(self, func, name, interval, phased=True):
+        """
+        Add or replace a periodic job
+
+        Args:
+            func: Function to run
+            name: Job name
+            interval: Interval in seconds
+            phased: Spread the job across the interval by VM in fleet mode
+
+        Returns:
+            str: Job name
+        """
+        now = time.time()
+        if self.mode == MODE_FLEET:
+            phase = phase_offset(f"{self.vm_id}:{name}", interval) if phased else 0.0
+            start_delay = random.uniform(0, self.startup_jitter) if phased and not self.running else 0.0
+            first_run = next_grid_tick(now + start_delay, interval, phase)
+        else:
+            phase = 0.0
+            first_run = now + interval
+
+        job = _Job(name, func, (), interval, phase, first_run)
+        with self._cond:
+            self.jobs[name] = job
+            self.timings.setdefault(name, JobTiming())
+            self._push(job, first_run)
+        return name
+
+    def add_monitoring_job(self, func, interval):
+        """Add a monitoring job to the scheduler"""
+        logging.info(f"Adding monitoring job with interval {interval} seconds")
+        return self._add_periodic_job(func, "monitoring", interval)
+
+    def add_heartbeat_job(self, func, interval):
+        """Add a heartbeat job to the scheduler"""
+        logging.info(f"Adding heartbeat job with interval {interval} seconds")
+        return self._add_periodic_job(func, "heartbeat", interval)
+
+    def add_command_polling_job(self, func, interval):
+        """Add a command polling job to the scheduler"""
+        logging.info(f"Adding command polling job with interval {interval} seconds")
+        return self._add_periodic_job(func, "command_polling", interval)
+
+    def add_sampling_job(self, func, interval):
+        """Add a high-frequency sampling job to the scheduler"""
+        logging.info(f"Adding sampling job with interval {interval} seconds")
+        return self._add_periodic_job(func, "sampling", interval, phased=False)
+
+    def add_probe_job(self, func, interval):
+        """Add a service health probe job to the scheduler"""
+        logging.info(f"Adding probe job with interval {interval} seconds")
+        return self._add_periodic_job(func, "probes", interval)
+
+    def defer_job(self, name, until):
+        """
+        Hold a periodic job back until a given time
+
+        Args:
+            name: Job name
+            until: Unix timestamp before which the job must not run
+        """
+        with self._cond:
+            job = self.jobs.get(name)
+            if job is not None and job.next_run < until:
+                self._push(job, until)
+                logging.info(f"Pausing {name} job for {until - time.time():.1f}s")
+
+    def remove_job(self, name):
+        """
+        Remove a periodic job if it is scheduled
+
+        Args:
+            name: Job name
+        """
+        with self._cond:
+            # Queued runs of the job are dropped by the loop
+            if self.jobs.pop(name, None) is not None:
+                self.timings.pop(name, None)
+                logging.info(f"Removed {name} job")
+
+    def run_now(self, func, *args):
+        """
+        Run a function once, as soon as the timer thread is free
+
+        Args:
+            func: Function to run
+            *args: Arguments passed to the function
+        """
+        with self._cond:
+            self._push(_Job(getattr(func, '__name__', 'once'), func, args, 0, 0.0, 0.0), time.time())
@@ -0,0 +1,207 @@
+"""
+Logging handlers and filters for the Infrawatch Agent
+"""
+import os
+import gzip
+import queue
+import shutil
+import threading
+import time
+import logging
+import logging.handlers
+from collections import OrderedDict
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """Queue handler that never blocks the caller when the queue is full"""
+
+    def __init__(self, log_queue):
+        """
+        Initialize the handler
+
+        Args:
+            log_queue: Bounded queue shared with the background listener
+        """
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def enqueue(self, record):
+        """
+        Put a record on the queue, dropping it if the writer is behind
+
+        Args:
+            record: Log record to enqueue
+        """
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class SizeAndTimeRotatingFileHandler(logging.handlers.RotatingFileHandler):
+    """Rotating file handler that rolls over on size or age, optionally gzipping backups"""
+
+    def __init__(self, filename, max_bytes=0, backup_count=0, rotate_interval=0,
+                 compress=False, encoding=None):
+        """
+        Initialize the handler
+
+        Args:
+            filename: Path to the log file
+            max_bytes: Roll over when the file reaches this size (0 disables)
+            backup_count: Number of rotated files to keep
+            rotate_interval: Roll over when the file is older than this many seconds (0 disables)
+            compress: Gzip rotated files
+            encoding: File encoding
+        """
+        super().__init__(filename, maxBytes=max_bytes, backupCount=backup_count,
+                         encoding=encoding, delay=True)
+        self.rotate_interval = rotate_interval
+        self.rollover_at = self._compute_rollover_at()
+
+        if compress:
+            self.namer = self._gzip_namer
+            self.rotator = self._gzip_rotator
+
+    @property
+    def _started_path(self):
+        """Sidecar file recording when the current log file was started"""
+        directory, name = os.path.split(self.baseFilename)
+        return os.path.join(directory, f".{name}.started")
+
+    def _save_started(self, started):
+        """Record the start time of the current log file"""
+        try:
+            with open(self._started_path, 'w') as f:
+                f.write(repr(started))
+        except OSError:
+            pass
+
+    def _compute_rollover_at(self):
+        """
+        Return the time of the next age-based rollover, or None if disabled
+
+        The log file's mtime moves with every write, so the start time is
+        kept in a sidecar file and restarts do not postpone rotation.
+        """
+        if self.rotate_interval <= 0:
+            return None
+        try:
+            with open(self._started_path) as f:
+                started = float(f.read())
+        except (OSError, ValueError):
+            try:
+                # First run with this file: creation time where the platform
+                # has it, else the last write
+                stat = os.stat(self.baseFilename)
+                started = getattr(stat, 'st_birthtime', stat.st_mtime)
+            except OSError:
+                started = time.time()
+            self._save_started(started)
+        return started + self.rotate_interval
+
+    def shouldRollover(self, record):
+        """
+        Determine if rollover should occur
+
+        Args:
+            record: Log record about to be written
+
+        Returns:
+            bool: True if the file is too large or too old
+        """
+        if self.rollover_at is not None and time.time() >= self.rollover_at:
+            return True
+        return bool(super().shouldRollover(record))
+
+    def doRollover(self):
+        """Roll over the file and schedule the next age-based rollover"""
+        super().doRollover()
+        if self.backupCount <= 0:
+            # No backups to rotate into: start the file over instead of
+            # letting it grow
+            if self.stream:
+                self.stream.close()
+                self.stream = None
+            open(self.baseFilename, 'w', encoding=self.encoding).close()
+        if self.rotate_interval > 0:
+            now = time.time()
+            self._save_started(now)
+            self.rollover_at = now + self.rotate_interval
+
+    @staticmethod
+    def _gzip_namer(name):
+        """Name rotated files with a .gz suffix"""
+        return name + '.gz'
+
+    @staticmethod
+    def _gzip_rotator(source, dest):
+        """Compress the closed log file into its rotated name"""
+        with open(source, 'rb') as src, gzip.open(dest, 'wb') as dst:
+            shutil.copyfileobj(src, dst)
+        os.remove(source)
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    Filter that rate limits and deduplicates repeated log messages
+
+    Each distinct message (logger, level and text) may be emitted ``burst``
+    times per ``interval`` seconds. Further repeats are counted and folded
+    into a summary appended to the first message of the next window.
+    """
+
+    def __init__(self, interval=60, burst=5, max_keys=1000):
+        """
+        Initialize the filter
+
+        Args:
+            interval: Length of a rate limiting window in seconds
+            burst: Messages allowed per key and window
+            max_keys: Maximum number of distinct messages tracked
+        """
+        super().__init__()
+        self.interval = interval
+        self.burst = burst
+        self.max_keys = max_keys
+        self._windows = OrderedDict()
+        self._lock = threading.Lock()
+
+    def filter(self, record):
+        """
+        Decide whether a record should be emitted
+
+        Args:
+            record: Log record
+
+        Returns:
+            bool: True to emit the record, False to suppress it
+        """
+        if self.interval <= 0:
+            return True
+
+        key = (record.name, record.levelno, str(record.msg))
+        now = record.created
+
+        with self._lock:
+            window = self._windows.get(key)
+
+            if window is None or now - window[0] >= self.interval:
+                suppressed = window[2] if window else 0
+                self._windows[key] = [now, 1, 0]
+                self._windows.move_to_end(key)
+                if len(self._windows) > self.max_keys:
+                    self._windows.popitem(last=False)
+
+                if suppressed:
+                    record.msg = (f"{record.getMessage()} "
+                                  f"(suppressed {suppressed} repeats in the last {int(now - window[0])}s)")
+                    record.args = None
+                return True
+
+            window[1] += 1
+            if window[1] <= self.burst:
+                return True
+
+            window[2] += 1
+            return False
@@ -0,0 +1,415 @@
+"""
+Log-file tail shipping with persisted offsets
+"""
+import os
+import glob
+import json
+import time
+import select
+import ctypes
+import ctypes.util
+import logging
+import threading
+from .exceptions import APIError, CircuitOpenError
+from .send_queue import REJECTED_STATUS_CODES
+
+# inotify event masks (linux/inotify.h)
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+WATCH_MASK = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+
+
+class DirectoryWatcher:
+    """
+    Wake-up source for changes in a set of directories
+
+    Uses inotify where available; otherwise wait() simply sleeps for the
+    polling interval.
+    """
+
+    def __init__(self, directories, poll_interval=1.0):
+        """
+        Initialize the watcher
+
+        Args:
+            directories: Directories to watch
+            poll_interval: Sleep used when inotify is unavailable
+        """
+        self.poll_interval = poll_interval
+        self.fd = None
+
+        try:
+            libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+            fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        except (OSError, AttributeError):
+            fd = -1
+        if fd < 0:
+            logging.info("inotify unavailable, polling log files")
+            return
+
+        for directory in directories:
+            if libc.inotify_add_watch(fd, os.fsencode(directory), WATCH_MASK) < 0:
+                logging.warning(f"Cannot watch {directory}: {os.strerror(ctypes.get_errno())}")
+        self.fd = fd
+
+    def wait(self, timeout):
+        """
+        Wait until something changed or the timeout passed
+
+        Args:
+            timeout: Maximum seconds to wait
+
+        Returns:
+            bool: True if a change was signalled (always True when polling)
+        """
+        if self.fd is None:
+            time.sleep(min(timeout, self.poll_interval))
+            return True
+
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        if not readable:
+            return False
+
+        # Events are not inspected; every file is checked on wake-up
+        try:
+            while os.read(self.fd, 65536):
+                pass
+        except BlockingIOError:
+            pass
+        return True
+
+    def close(self):
+        """Release the inotify descriptor"""
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
+
+
+class TailedFile:
+    """Read position in one followed file, surviving rotation and truncation"""
+
+    def __init__(self, path, max_line_bytes):
+        """
+        Initialize the tail
+
+        Args:
+            path: Path of the followed file
+            max_line_bytes: Longer lines are split
+        """
+        self.path = path
+        self.max_line_bytes = max_line_bytes
+        self.file = None
+        self.identity = None
+        self.offset = 0
+        # Bumped whenever the position restarts (rotation, truncation) so
+        # segment keys stay unique even if offsets or inodes repeat
+        self.epoch = 0
+
+    def open(self, state, start_at_end):
+        """
+        Open the file and restore its saved position
+
+        Args:
+            state: Saved {'dev', 'ino', 'offset', 'epoch'} or None
+            start_at_end: Start at the end of a file without saved state
+        """
+        if state:
+            self.epoch = state.get('epoch', 0)
+            # The file may have been rotated while the agent was down
+            for candidate in [self.path] + sorted(glob.glob(self.path + '?*')):
+                try:
+                    st = os.stat(candidate)
+                except OSError:
+                    continue
+                if (st.st_dev, st.st_ino) == (state['dev'], state['ino']):
+                    self._open(candidate, state['offset'] if st.st_size >= state['offset'] else 0)
+                    if candidate != self.path:
+                        logging.info(f"Resuming rotated log {candidate} before {self.path}")
+                    return
+            self.epoch += 1
+
+        if self._open(self.path, 0) and start_at_end and not state:
+            self.offset = os.fstat(self.file.fileno()).st_size
+
+    def _open(self, path, offset):
+        """Open a path at an offset; returns False if it does not exist"""
+        try:
+            file = open(path, 'rb')
+        except OSError:
+            return False
+        if self.file:
+            self.file.close()
+        self.file = file
+        st = os.fstat(file.fileno())
+        self.identity = (st.st_dev, st.st_ino)
+        self.offset = offset
+        return True
+
+    def read_lines(self, max_bytes):
+        """
+        Read complete lines after the current offset
+
+        Args:
+            max_bytes: Maximum bytes to read
+
+        Returns:
+            tuple: (lines, start offset, end offset, segment key)
+        """
+        if self.file is None and not self._open(self.path, 0):
+            return [], self.offset, self.offset, None
+
+        start = self.offset
+        self.file.seek(start)
+        data = self.file.read(max_bytes)
+
+        end = data.rfind(b'\n') + 1
+        if not end and len(data) >= self.max_line_bytes:
+            # A line longer than the limit is shipped in pieces
+            end = len(data)
+        lines = data[:end].decode('utf-8', 'replace').splitlines()
+
+        # Pieces of overlong lines
+        if any(len(line) > self.max_line_bytes for line in lines):
+            lines = [line[index:index + self.max_line_bytes]
+                     for line in lines
+                     for index in range(0, max(len(line), 1), self.max_line_bytes)]
+
+        key = f"{self.identity[0]}:{self.identity[1]}:{self.epoch}:{start}"
+        return lines, start, start + end, key
+
+    def check_rotation(self):
+        """
+        Detect truncation and rotation once the open file is drained
+
+        Returns:
+            bool: True if the position was reset and there may be more to read
+        """
+        if self.file is None:
+            return self._open(self.path, 0)
+
+        size = os.fstat(self.file.fileno()).st_size
+        if size < self.offset:
+            logging.info(f"Log {self.path} was truncated")
+            self.offset = 0
+            self.epoch += 1
+            return True
+        if size > self.offset:
+            return False
+
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return False
+        if (st.st_dev, st.st_ino) != self.identity:
+            logging.info(f"Log {self.path} was rotated")
+            if self._open(self.path, 0):
+                self.epoch += 1
+                return True
+        return False
+
+    def state(self):
+        """Return the persistable position"""
+        if self.identity is None:
+            return None
+        return {'dev': self.identity[0], 'ino': self.identity[1], 'offset': self.offset, 'epoch': self.epoch}
+
+    def close(self):
+        """Close the open file"""
+        if self.file:
+            self.file.close()
+            self.file = None
+
+
+class LogShipper:
+    """
+    Follows log files and ships new lines to the server in batches
+
+    Lines are batched by size and age and sent gzip-compressed. A file's
+    offset only advances after the server accepted the batch, and offsets
+    are persisted, so lines are neither lost nor re-sent across restarts;
+    each segment carries a stable key for the server to ignore a retried
+    upload. While an upload fails no more is read, so memory stays at one
+    batch and the files themselves act as the buffer. A batch the server
+    refuses for good is split if it was too large and dropped otherwise,
+    so it cannot hold up shipping.
+    """
+
+    def __init__(self, api_client, paths, state_file, batch_bytes=256 * 1024,
+                 batch_interval=5.0, max_line_bytes=16 * 1024, start_at_end=True):
+        """
+        Initialize the shipper
+
+        Args:
+            api_client: APIClient used to upload batches
+            paths: Log files to follow
+            state_file: JSON file holding the read offsets
+            batch_bytes: Send a batch once it holds this many bytes
+            batch_interval: Send a non-empty batch at least this often (seconds)
+            max_line_bytes: Longer lines are split
+            start_at_end: Skip existing content of files seen for the first time
+        """
+        self.api_client = api_client
+        self.state_file = state_file
+        self.batch_bytes = batch_bytes
+        self.batch_interval = batch_interval
+        self.start_at_end = start_at_end
+        self.tails = [TailedFile(path, max_line_bytes) for path in paths]
+
+        self._stop = threading.Event()
+        self._thread = None
+        self.watcher = None
+        self.shipped_lines = 0
+        self.dropped_lines = 0
+
+    def _load_state(self):
+        """Load saved offsets"""
+        try:
+            with open(self.state_file) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_state(self):
+        """Persist offsets atomically"""
+        state = {tail.path: tail.state() for tail in self.tails if tail.state()}
+        directory = os.path.dirname(self.state_file)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp = f"{self.state_file}.tmp"
+        with open(tmp, 'w') as f:
+            json.dump(state, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.state_file)
+
+    def start(self):
+        """Open the files and start following them"""
+        state = self._load_state()
+        for tail in self.tails:
+            tail.open(state.get(tail.path), self.start_at_end)
+
+        directories = {os.path.dirname(os.path.abspath(tail.path)) for tail in self.tails}
+        self.watcher = DirectoryWatcher([d for d in directories if os.path.isdir(d)])
+        self._thread = threading.Thread(target=self._run, name='log-shipper', daemon=True)
+        self._thread.start()
+        logging.info(f"Shipping {len(self.tails)} log files")
+
+    def stop(self):
+        """Stop following, shipping what is already read"""
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=30)
+        for tail in self.tails:
+            tail.close()
+        if self.watcher:
+            self.watcher.close()
+
+    def _fill(self, segments, size):
+        """
+        Read from all files into the batch until it is full
+
+        Returns:
+            int: New batch size in bytes
+        """
+        for tail in self.tails:
+            while size < self.batch_bytes:
+                lines, start, end, key = tail.read_lines(max(self.batch_bytes - size, tail.max_line_bytes))
+                if end > start:
+                    segments.append((tail, lines, key))
+                    tail.offset = end
+                    size += end - start
+                    continue
+                if not tail.check_rotation():
+                    break
+        return size
+
+    @staticmethod
+    def _split(segments):
+        """
+        Split a batch in two, splitting the segment itself if there is only one
+
+        Returns:
+            tuple: Two lists of (tail, lines, key) segments
+        """
+        if len(segments) > 1:
+            middle = len(segments) // 2
+            return segments[:middle], segments[middle:]
+        tail, lines, key = segments[0]
+        middle = len(lines) // 2
+        # Derived keys stay stable, so a retried split is still deduplicated
+        return [(tail, lines[:middle], key)], [(tail, lines[middle:], f"{key}+{middle}")]
+
+    def _send(self, segments):
+        """
+        Upload a batch
+
+        A batch rejected as too large (413) is split in halves and sent
+        again; one rejected otherwise (see REJECTED_STATUS_CODES) is dropped.
+
+        Returns:
+            list: Segments still to be sent; empty once the batch is done with
+        """
+        batch = {
+            'segments': [
+                {'path': tail.path, 'key': key, 'lines': lines}
+                for tail, lines, key in segments
+            ]
+        }
+        lines = sum(len(segment[1]) for segment in segments)
+        try:
+            self.api_client.send_logs(batch)
+        except APIError as e:
+            status = getattr(e, 'status_code', None)
+            if status == 413 and lines > 1:
+                first, second = self._split(segments)
+                remaining = self._send(first)
+                return remaining + second if remaining else self._send(second)
+            if status in REJECTED_STATUS_CODES:
+                logging.error(f"Log batch rejected by server, dropping {lines} lines: {e}")
+                self.dropped_lines += lines
+                return []
+            if not isinstance(e, CircuitOpenError):
+                logging.debug(f"Log batch not shipped: {e}")
+            return segments
+        self.shipped_lines += lines
+        return []
+
+    def _run(self):
+        """Read, batch and ship until stopped"""
+        segments = []
+        size = 0
+        batch_started = time.time()
+        failures = 0
+
+        while True:
+            stopping = self._stop.is_set()
+            if size < self.batch_bytes:
+                size = self._fill(segments, size)
+
+            now = time.time()
+            due = segments and (size >= self.batch_bytes or now - batch_started >= self.batch_interval or stopping)
+            if due:
+                segments = self._send(segments)
+                if not segments:
+                    size, failures = 0, 0
+                    batch_started = now
+                    self._save_state()
+                    continue
+                failures += 1
+                if stopping:
+                    # Offsets were not saved; the lines are read again next start
+                    break
+                # Keep the batch and stop reading until the server takes it
+                self._stop.wait(min(2 ** failures, 60))
+                continue
+
+            if stopping:
+                break
+            if not segments:
+                batch_started = time.time()
+            self.watcher.wait(max(batch_started + self.batch_interval - time.time(), 0.1)
+                              if segments else 1.0)
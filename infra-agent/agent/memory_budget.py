@@ -0,0 +1,115 @@
+"""
+Shared memory budget for in-agent buffers
+"""
+import logging
+import threading
+
+
+class MemoryBudget:
+    """
+    Byte budget shared by all in-agent buffers
+
+    Buffers reserve an estimate of the bytes they hold before storing an
+    item and release it when the item leaves. When a reservation would
+    exceed the limit, registered buffers are asked to evict, largest first,
+    until it fits; if it still does not fit the reservation is refused and
+    the caller drops the item.
+    """
+
+    def __init__(self, limit_bytes):
+        """
+        Initialize the budget
+
+        Args:
+            limit_bytes: Total bytes all buffers may hold
+        """
+        self.limit = limit_bytes
+        self.used = {}
+        self.evictors = {}
+        self.evicted = 0
+        self.refused = 0
+        self._lock = threading.Lock()
+
+    def register(self, name, evict=None):
+        """
+        Register a buffer
+
+        Args:
+            name: Buffer name
+            evict: Callable taking the number of bytes to free; it drops its
+                oldest items, calls release() for them and returns the bytes freed
+        """
+        with self._lock:
+            self.used.setdefault(name, 0)
+            if evict is not None:
+                self.evictors[name] = evict
+
+    def total(self):
+        """Return the bytes currently reserved by all buffers"""
+        with self._lock:
+            return sum(self.used.values())
+
+    def reserve(self, name, nbytes):
+        """
+        Reserve bytes for a new item
+
+        Args:
+            name: Buffer name
+            nbytes: Estimated size of the item
+
+        Returns:
+            bool: True if reserved, False if the item must be dropped
+        """
+        if nbytes > self.limit:
+            self.refused += 1
+            return False
+
+        with self._lock:
+            excess = sum(self.used.values()) + nbytes - self.limit
+            if excess <= 0:
+                self.used[name] = self.used.get(name, 0) + nbytes
+                return True
+            victims = sorted(self.evictors, key=lambda victim: self.used.get(victim, 0), reverse=True)
+
+        # Evict outside the lock; evictors call release()
+        for victim in victims:
+            freed = self.evictors[victim](excess)
+            self.evicted += freed
+            excess -= freed
+            if excess <= 0:
+                break
+
+        with self._lock:
+            if sum(self.used.values()) + nbytes <= self.limit:
+                self.used[name] = self.used.get(name, 0) + nbytes
+                return True
+
+        self.refused += 1
+        logging.debug(f"Memory budget refused {nbytes} bytes for {name}")
+        return False
+
+    def release(self, name, nbytes):
+        """
+        Release bytes of items that left a buffer
+
+        Args:
+            name: Buffer name
+            nbytes: Bytes previously reserved for the items
+        """
+        with self._lock:
+            self.used[name] = max(self.used.get(name, 0) - nbytes, 0)
+
+    def usage(self):
+        """
+        Get budget usage
+
+        Returns:
+            dict: Limit, per-buffer usage and eviction counters
+        """
+        with self._lock:
+            return {
+                'limitBytes': self.limit,
+                'usedBytes': dict(self.used),
+                'evictedBytes': self.evicted,
+                'refused': self.refused
+            }
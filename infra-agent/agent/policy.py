@@ -0,0 +1,134 @@
+"""
+Server-driven collection policy for fleet-wide load shedding
+"""
+
+# Policy interval keys and the Config attribute each one overrides
+INTERVALS = {
+    'monitoring': 'monitoring_interval',
+    'heartbeat': 'heartbeat_interval',
+    'commandPolling': 'command_polling_interval',
+    'sampling': 'sampling_interval',
+    'probes': 'probe_interval'
+}
+
+# Collectors a policy may switch off; the core collectors feed required fields
+OPTIONAL_COLLECTORS = ('cgroups', 'pressure', 'tcp', 'probes')
+
+COMPRESSIONS = ('none', 'gzip')
+MAX_BATCH_SIZE = 100
+
+# Config attributes a policy can override
+POLICY_ATTRIBUTES = tuple(INTERVALS.values()) + ('queue_batch_size', 'queue_compression', 'queue_sketches')
+
+
+class CollectionPolicy:
+    """
+    Versioned collection settings pushed by the server
+
+    A policy only carries the settings the server wants to override. Fields
+    it leaves out fall back to the agent's local configuration, so an empty
+    policy restores full resolution.
+    """
+
+    def __init__(self, version=0, intervals=None, collectors=None, batch_size=None,
+                 compression=None, sketches=None):
+        """
+        Initialize the policy
+
+        Args:
+            version: Policy version, increasing with every server-side change
+            intervals: Policy interval key to seconds
+            collectors: Optional collector name to enabled flag
+            batch_size: Monitoring samples uploaded per request
+            compression: Monitoring upload compression, 'none' or 'gzip'
+            sketches: Whether distribution summaries keep their sketches
+        """
+        self.version = version
+        self.intervals = intervals or {}
+        self.collectors = collectors or {}
+        self.batch_size = batch_size
+        self.compression = compression
+        self.sketches = sketches
+
+    @classmethod
+    def from_dict(cls, data):
+        """
+        Build a policy from a server response, validating every field
+
+        Args:
+            data: Policy as sent by the server
+
+        Returns:
+            CollectionPolicy: Parsed policy
+
+        Raises:
+            ValueError: If any field is invalid; nothing of the policy applies
+        """
+        if not isinstance(data, dict):
+            raise ValueError("Policy must be an object")
+
+        version = data.get('version', 0)
+        if not isinstance(version, int) or isinstance(version, bool) or version < 0:
+            raise ValueError("Policy version must be a non-negative integer")
+
+        intervals = {}
+        for key, value in (data.get('intervals') or {}).items():
+            if key not in INTERVALS:
+                raise ValueError(f"Unknown policy interval {key}")
+            if value is None:
+                continue
+            if not isinstance(value, (int, float)) or isinstance(value, bool) or value < 0:
+                raise ValueError(f"Policy interval {key} must be a non-negative number")
+            # Only sampling can be switched off with 0
+            if value == 0 and key != 'sampling':
+                raise ValueError(f"Policy interval {key} must be positive")
+            intervals[key] = value if key == 'sampling' else int(value)
+
+        collectors = {}
+        for name, enabled in (data.get('collectors') or {}).items():
+            if name not in OPTIONAL_COLLECTORS:
+                raise ValueError(f"Collector {name} cannot be switched by policy")
+            if not isinstance(enabled, bool):
+                raise ValueError(f"Policy flag for collector {name} must be a boolean")
+            collectors[name] = enabled
+
+        batch_size = data.get('batchSize')
+        if batch_size is not None and (not isinstance(batch_size, int) or isinstance(batch_size, bool)
+                                       or not 1 <= batch_size <= MAX_BATCH_SIZE):
+            raise ValueError(f"Policy batch size must be between 1 and {MAX_BATCH_SIZE}")
+
+        payload = data.get('payload') or {}
+        compression = payload.get('compression')
+        if compression is not None and compression not in COMPRESSIONS:
+            raise ValueError("Policy compression must be 'none' or 'gzip'")
+        sketches = payload.get('sketches')
+        if sketches is not None and not isinstance(sketches, bool):
+            raise ValueError("Policy sketches flag must be a boolean")
+
+        return cls(version, intervals, collectors, batch_size, compression, sketches)
+
+    def resolve(self, base):
+        """
+        Compute the effective settings over the local configuration
+
+        Args:
+            base: Config attribute to locally configured value, for every
+                attribute in POLICY_ATTRIBUTES
+
+        Returns:
+            dict: Config attribute to effective value
+        """
+        settings = dict(base)
+        for key, value in self.intervals.items():
+            settings[INTERVALS[key]] = value
+        if self.batch_size is not None:
+            settings['queue_batch_size'] = self.batch_size
+        if self.compression is not None:
+            settings['queue_compression'] = self.compression
+        if self.sketches is not None:
+            settings['queue_sketches'] = self.sketches
+        return settings
+
+    def collector_enabled(self, name):
+        """Return whether a collector runs under this policy"""
+        return self.collectors.get(name, True)
@@ -0,0 +1,529 @@
+"""
+Relay mode: accept traffic from other agents and forward it upstream in batches
+"""
+import re
+import gzip
+import json
+import time
+import logging
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import requests
+from requests.adapters import HTTPAdapter
+from requests.exceptions import RequestException
+
+# Downstream routes, mirroring the backend API used by agents
+ROUTES = [
+    ('POST', re.compile(r'^/api/v1/monitoring/([^/]+)$'), 'monitoring'),
+    ('POST', re.compile(r'^/api/v1/monitoring/([^/]+)/heartbeat$'), 'heartbeat'),
+    ('GET', re.compile(r'^/api/v1/agent/([^/]+)/commands$'), 'commands'),
+    ('POST', re.compile(r'^/api/v1/agent/([^/]+)/command_result$'), 'command_result'),
+    ('POST', re.compile(r'^/api/v1/agent/([^/]+)/commands/([^/]+)/output$'), 'command_output'),
+    ('POST', re.compile(r'^/api/v1/agent/([^/]+)/events$'), 'events'),
+    ('POST', re.compile(r'^/api/v1/agent/([^/]+)/logs$'), 'logs'),
+    ('POST', re.compile(r'^/api/v1/agent/([^/]+)/batch$'), 'batch'),
+]
+
+# Local response per queued kind, matching what the backend would return
+QUEUED_RESPONSES = {
+    'monitoring': (201, {'message': 'Monitoring data received successfully'}),
+    'command_result': (200, {'message': 'Command result updated successfully'}),
+    'command_output': (200, {'message': 'Output received', 'cancel': False}),
+    'events': (201, {'message': 'Event received'}),
+    'logs': (200, {'message': 'Logs received'}),
+}
+
+# Decoded bytes per upstream batch, below the backend's 5 MB body limit
+MAX_BATCH_BYTES = 4 * 1024 * 1024
+
+DEFAULT_HEARTBEAT_INTERVAL = 30
+
+
+class RelayState:
+    """Pending upstream work and cached upstream answers, shared by all handler threads"""
+
+    def __init__(self, max_queue, budget=None):
+        """
+        Initialize the state
+
+        Args:
+            max_queue: Maximum number of queued monitoring, result and event items
+            budget: MemoryBudget bounding the queued bytes (optional); when it
+                runs out the oldest items are evicted first
+        """
+        self.max_queue = max_queue
+        self.budget = budget
+        self.queue = deque()
+        self.heartbeats = {}
+        self.pollers = {}
+        self.verified = {}
+        self.commands = {}
+        self.completed = {}
+        self.cancelled = {}
+        self.next_expected = {}
+        self.policies = {}
+        self.lock = threading.Lock()
+
+        if budget is not None:
+            budget.register('relay', self.evict)
+
+    def enqueue(self, kind, vm_id, token, body, nbytes=0):
+        """
+        Queue an item for the next upstream batch
+
+        Args:
+            kind: Item kind, a key of QUEUED_RESPONSES
+            vm_id: VM the item belongs to
+            token: Agent token of the VM
+            body: Decoded request body
+            nbytes: Size of the request body, charged to the memory budget
+
+        Returns:
+            bool: False if the queue is full
+        """
+        # Reserve before taking the lock; the budget may call evict()
+        if self.budget is not None and not self.budget.reserve('relay', nbytes):
+            return False
+
+        with self.lock:
+            if len(self.queue) >= self.max_queue:
+                if self.budget is not None:
+                    self.budget.release('relay', nbytes)
+                return False
+            self.queue.append(((kind, vm_id, token, body), nbytes))
+            return True
+
+    def complete(self, vm_id, command_id):
+        """
+        Hide a started or finished command from later polls
+
+        Called once upstream accepted output or a result for the command,
+        until upstream's own poll answers no longer return it.
+        """
+        with self.lock:
+            self.completed[command_id] = time.time()
+            self.commands[vm_id] = [cmd for cmd in self.commands.get(vm_id, []) if cmd.get('id') != command_id]
+
+    def _accepts(self, vm_id, token):
+        """Return True unless upstream accepted a different token for the VM; call with the lock held"""
+        return self.verified.get(vm_id, token) == token
+
+    def verify(self, vm_id, token, accepted):
+        """
+        Record upstream's answer to an item sent with a VM's token
+
+        Args:
+            vm_id: VM the item belonged to
+            token: Agent token the item was sent with
+            accepted: True if upstream accepted the token, False if it
+                rejected it as invalid
+        """
+        with self.lock:
+            if accepted:
+                self.verified[vm_id] = token
+            elif self.verified.get(vm_id) == token:
+                # Rotated or revoked; the next token upstream accepts takes over
+                del self.verified[vm_id]
+
+    def heartbeat(self, vm_id, token):
+        """
+        Record a heartbeat; repeated heartbeats of a VM coalesce into one
+
+        A token that differs from the one upstream last accepted for the VM
+        does not replace it.
+
+        Returns:
+            tuple: (heartbeat interval, collection policy or None) last
+                returned upstream for this VM
+        """
+        with self.lock:
+            if self._accepts(vm_id, token):
+                self.heartbeats[vm_id] = token
+            return self.next_expected.get(vm_id, DEFAULT_HEARTBEAT_INTERVAL), self.policies.get(vm_id)
+
+    def is_cancelled(self, command_id):
+        """Return True if upstream reported the command as cancelled"""
+        with self.lock:
+            return command_id in self.cancelled
+
+    def poll(self, vm_id, token):
+        """
+        Register a command poll and return the cached commands for the VM
+
+        Polls of a VM between two flushes coalesce into one upstream poll.
+        Cached commands are only handed to the token upstream last accepted
+        for the VM; until upstream has accepted one, nothing is handed out.
+
+        Returns:
+            list: Commands from the most recent upstream poll
+        """
+        with self.lock:
+            if not self._accepts(vm_id, token):
+                return []
+            self.pollers[vm_id] = token
+            if self.verified.get(vm_id) != token:
+                return []
+            return self.commands.get(vm_id, [])
+
+    def set_commands(self, vm_id, commands, completed_ttl):
+        """
+        Cache the commands returned by an upstream poll
+
+        Args:
+            vm_id: VM the commands belong to
+            commands: Pending commands from upstream
+            completed_ttl: Seconds a finished command stays hidden
+        """
+        now = time.time()
+        with self.lock:
+            for seen in (self.completed, self.cancelled):
+                for command_id, at in list(seen.items()):
+                    if now - at > completed_ttl:
+                        del seen[command_id]
+            self.commands[vm_id] = [cmd for cmd in commands if cmd.get('id') not in self.completed]
+
+    def drain(self, max_items, max_bytes=None):
+        """
+        Take the items for one upstream batch
+
+        Args:
+            max_items: Maximum number of queued items taken
+            max_bytes: Maximum bytes of queued items taken, at least one
+                item is always taken (optional)
+
+        Returns:
+            list: (kind, vm_id, token, body) tuples
+        """
+        with self.lock:
+            items = [('heartbeat', vm_id, token, None) for vm_id, token in self.heartbeats.items()]
+            items.extend(('commands', vm_id, token, None) for vm_id, token in self.pollers.items())
+            self.heartbeats.clear()
+            self.pollers.clear()
+
+            freed = 0
+            while self.queue and len(items) < max_items:
+                if max_bytes is not None and freed and freed + self.queue[0][1] > max_bytes:
+                    break
+                item, nbytes = self.queue.popleft()
+                items.append(item)
+                freed += nbytes
+
+        if self.budget is not None:
+            self.budget.release('relay', freed)
+        return items
+
+    def requeue(self, items):
+        """Put undelivered queued items back at the front of the queue"""
+        for item in reversed(items):
+            if item[0] not in QUEUED_RESPONSES:
+                continue
+            nbytes = len(json.dumps(item[3])) if self.budget is not None else 0
+            if self.budget is not None and not self.budget.reserve('relay', nbytes):
+                continue
+            with self.lock:
+                if len(self.queue) < self.max_queue:
+                    self.queue.appendleft((item, nbytes))
+                    continue
+            if self.budget is not None:
+                self.budget.release('relay', nbytes)
+
+    def evict(self, nbytes):
+        """
+        Drop the oldest queued items to free memory
+
+        Args:
+            nbytes: Bytes to free
+
+        Returns:
+            int: Bytes freed
+        """
+        freed = dropped = 0
+        with self.lock:
+            while self.queue and freed < nbytes:
+                freed += self.queue.popleft()[1]
+                dropped += 1
+
+        if dropped:
+            self.budget.release('relay', freed)
+            logging.warning(f"Relay memory budget exceeded, dropped {dropped} oldest items")
+        return freed
+
+
+class RelayRequestHandler(BaseHTTPRequestHandler):
+    """HTTP handler for downstream agents"""
+
+    server_version = 'InfrawatchRelay/1.0'
+
+    def log_message(self, format, *args):
+        logging.debug(f"Relay {self.address_string()} - {format % args}")
+
+    def _send_json(self, status, body, headers=None):
+        """Send a JSON response"""
+        data = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _read_json(self):
+        """Read and decode the JSON request body, gzip-compressed or not"""
+        self.body_bytes = 0
+        length = int(self.headers.get('Content-Length') or 0)
+        if not length:
+            return None
+        data = self.rfile.read(length)
+        if self.headers.get('Content-Encoding') == 'gzip':
+            data = gzip.decompress(data)
+        # Queued items are held decoded; charge what they take in memory
+        self.body_bytes = len(data)
+        return json.loads(data)
+
+    def _dispatch(self, method):
+        """Route a request to the relay state"""
+        kind = vm_id = None
+        for route_method, pattern, route_kind in ROUTES:
+            match = pattern.match(self.path.split('?', 1)[0])
+            if match and route_method == method:
+                kind, vm_id = route_kind, match.group(1)
+                break
+
+        if kind is None:
+            self._send_json(404, {'message': 'Not found'})
+            return
+
+        token = self.headers.get('X-Agent-Token')
+        if not token:
+            self._send_json(401, {'message': 'Agent token is required'})
+            return
+
+        state = self.server.relay.state
+        try:
+            body = self._read_json()
+        except (ValueError, OSError, EOFError):
+            self._send_json(400, {'message': 'Invalid JSON body'})
+            return
+
+        if kind == 'heartbeat':
+            interval, policy = state.heartbeat(vm_id, token)
+            response = {'message': 'Heartbeat received', 'nextExpectedInSeconds': interval}
+            if policy is not None:
+                response['policy'] = policy
+            self._send_json(200, response)
+        elif kind == 'batch':
+            self._send_json(200, {'results': self._enqueue_batch(state, body)})
+        elif kind == 'commands':
+            self._send_json(200, state.poll(vm_id, token))
+        elif kind == 'command_output':
+            # The command ID travels in the URL; relayed chunks carry it in the body
+            command_id = match.group(2)
+            chunk = dict(body or {}, commandId=command_id)
+            if state.enqueue(kind, vm_id, token, chunk, self.body_bytes):
+                status, response = QUEUED_RESPONSES[kind]
+                self._send_json(status, dict(response, cancel=state.is_cancelled(command_id)))
+            else:
+                self._queue_full()
+        elif state.enqueue(kind, vm_id, token, body, self.body_bytes):
+            self._send_json(*QUEUED_RESPONSES[kind])
+        else:
+            self._queue_full()
+
+    def _queue_full(self):
+        """Ask the downstream agent to retry after the next flush"""
+        retry_after = str(int(self.server.relay.flush_interval) + 1)
+        self._send_json(503, {'message': 'Relay queue full'}, {'Retry-After': retry_after})
+
+    def _enqueue_batch(self, state, body):
+        """
+        Queue the monitoring samples of a downstream batch one by one
+
+        Returns:
+            list: Result per item, as the backend batch endpoint answers
+        """
+        items = (body or {}).get('items') or []
+        nbytes = self.body_bytes // max(len(items), 1)
+        results = []
+        for item in items:
+            if item.get('kind') != 'monitoring':
+                results.append({'id': item.get('id'), 'status': 400, 'body': {'message': 'Unsupported item kind'}})
+            elif state.enqueue('monitoring', item.get('vmId'), item.get('token'), item.get('body'), nbytes):
+                status, result = QUEUED_RESPONSES['monitoring']
+                results.append({'id': item.get('id'), 'status': status, 'body': result})
+            else:
+                results.append({'id': item.get('id'), 'status': 503, 'body': {'message': 'Relay queue full'}})
+        return results
+
+    def do_GET(self):
+        self._dispatch('GET')
+
+    def do_POST(self):
+        self._dispatch('POST')
+
+
+class RelayServer:
+    """Local relay that batches other agents' traffic over a few pooled upstream connections"""
+
+    def __init__(self, server_url, vm_id, agent_token, host='0.0.0.0', port=8421,
+                 flush_interval=2.0, max_batch=500, upstream_connections=2,
+                 max_queue=10000, completed_ttl=300, budget=None):
+        """
+        Initialize the relay
+
+        Args:
+            server_url: Base URL of the upstream Infrawatch server
+            vm_id: VM ID of the relay agent, used to authenticate batches
+            agent_token: Agent token of the relay agent
+            host: Address to listen on
+            port: Port to listen on
+            flush_interval: Seconds between upstream batches
+            max_batch: Maximum items per upstream request
+            upstream_connections: Size of the upstream connection pool
+            max_queue: Maximum queued items before downstream gets 503
+            completed_ttl: Seconds a finished command stays hidden from polls
+            budget: MemoryBudget bounding the queued bytes (optional)
+        """
+        self.batch_url = f"{server_url.rstrip('/')}/api/v1/agent/{vm_id}/batch"
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        self.upstream_connections = upstream_connections
+        self.completed_ttl = completed_ttl
+        self.state = RelayState(max_queue, budget)
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=upstream_connections)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.session.headers.update({
+            'Content-Type': 'application/json',
+            'Content-Encoding': 'gzip',
+            'X-Agent-Token': agent_token
+        })
+        self.executor = ThreadPoolExecutor(max_workers=upstream_connections)
+
+        self.httpd = ThreadingHTTPServer((host, port), RelayRequestHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.relay = self
+        self._stop = threading.Event()
+        self._threads = []
+
+    def start(self):
+        """Start serving downstream agents and flushing upstream"""
+        for target in (self.httpd.serve_forever, self._flush_loop):
+            thread = threading.Thread(target=target, daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        host, port = self.httpd.server_address[:2]
+        logging.info(f"Relay listening on {host}:{port}")
+
+    def stop(self):
+        """Stop the relay, flushing what is queued"""
+        self._stop.set()
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        for thread in self._threads:
+            thread.join(timeout=self.flush_interval + 10)
+        self.executor.shutdown(wait=True)
+        self.session.close()
+        logging.info("Relay stopped")
+
+    def _flush_loop(self):
+        """Flush batches upstream until stopped"""
+        while not self._stop.wait(self.flush_interval):
+            try:
+                self.flush()
+            except Exception as e:
+                logging.error(f"Relay flush failed: {e}", exc_info=True)
+        self.flush()
+
+    def flush(self):
+        """Send pending items upstream as concurrent batches of at most max_batch items"""
+        batches = []
+        for _ in range(self.upstream_connections):
+            items = self.state.drain(self.max_batch, MAX_BATCH_BYTES)
+            if not items:
+                break
+            batches.append(items)
+
+        for future in [self.executor.submit(self._send_batch, batch) for batch in batches]:
+            future.result()
+
+    def _send_batch(self, items):
+        """Send one compressed batch and apply the per-item results"""
+        payload = {
+            'items': [
+                {'id': index, 'kind': kind, 'vmId': vm_id, 'token': token, 'body': body}
+                for index, (kind, vm_id, token, body) in enumerate(items)
+            ]
+        }
+        data = gzip.compress(json.dumps(payload).encode('utf-8'))
+
+        try:
+            response = self.session.post(self.batch_url, data=data, timeout=30)
+        except RequestException as e:
+            logging.error(f"Relay failed to send batch of {len(items)} items: {e}")
+            self.state.requeue(items)
+            return
+
+        if response.status_code != 200:
+            logging.error(f"Relay batch rejected: {response.status_code}, {response.text}")
+            if response.status_code >= 500 or response.status_code == 429:
+                self.state.requeue(items)
+            return
+
+        try:
+            results = response.json().get('results')
+        except (ValueError, AttributeError):
+            results = None
+        if not isinstance(results, list):
+            logging.error(f"Relay got an invalid batch response: {response.text[:200]}")
+            self.state.requeue(items)
+            return
+
+        # Items upstream did not answer, or answered with a transient error,
+        # were already acknowledged downstream and go out again
+        retry = dict(enumerate(items))
+        for result in results:
+            if not isinstance(result, dict) or result.get('id') not in retry:
+                continue
+            status, body = result.get('status'), result.get('body')
+            if not isinstance(status, int):
+                continue
+            index = result['id']
+            kind, vm_id, token, item_body = items[index]
+            if status < 400 or status in (401, 403):
+                self.state.verify(vm_id, token, status < 400)
+            if status >= 500 or status == 429:
+                logging.warning(f"Relayed {kind} for VM {vm_id} failed, retrying: {status}, {body}")
+                continue
+            del retry[index]
+            if status >= 400:
+                logging.warning(f"Relayed {kind} for VM {vm_id} failed: {status}, {body}")
+                continue
+            self._apply_result(kind, vm_id, item_body, body)
+
+        self.state.requeue([retry[index] for index in sorted(retry)])
+        logging.debug(f"Relay sent batch of {len(items)} items ({len(data)} bytes compressed)")
+
+    def _apply_result(self, kind, vm_id, item_body, body):
+        """Update the cached answers from an accepted item"""
+        if kind in ('command_result', 'command_output') and isinstance(item_body, dict):
+            self.state.complete(vm_id, item_body.get('commandId'))
+
+        if kind == 'commands':
+            if isinstance(body, list):
+                self.state.set_commands(vm_id, body, self.completed_ttl)
+        elif kind == 'command_output':
+            # Answered to the command's next chunk
+            if isinstance(body, dict) and body.get('cancel'):
+                with self.state.lock:
+                    self.state.cancelled[item_body['commandId']] = time.time()
+        elif kind == 'heartbeat' and isinstance(body, dict):
+            with self.state.lock:
+                if 'nextExpectedInSeconds' in body:
+                    self.state.next_expected[vm_id] = body['nextExpectedInSeconds']
+                if body.get('policy') is not None:
+                    self.state.policies[vm_id] = body['policy']
@@ -0,0 +1,256 @@
+"""
+Shared-memory export of the latest sample for local consumers
+
+The agent publishes its most recent high-frequency sample into a small
+memory-mapped file with a fixed layout, so local tools (autoscaling
+sidecars, load shedders) can read current CPU, memory and network numbers
+without sampling psutil themselves. All integers and floats are
+little-endian:
+
+    offset  size  field
+    0       4     magic b'IWSM'
+    4       4     layout version (u32)
+    8       4     field count N (u32)
+    12      4     state (u32): 1 while the agent publishes, 0 once it stopped
+    16      8     sequence counter (u64): odd while an update is in progress
+    24      8     sample timestamp, Unix seconds (f64)
+    32      8*N   field values (f64), NaN until first sampled
+    32+8*N  32*N  field names, UTF-8, NUL padded
+
+A reader copies the timestamp and values between two reads of the sequence
+counter and retries if the counter was odd or changed (a seqlock), so reads
+take no lock and never block the agent. The file is created under a
+temporary name and renamed into place, so readers never see a partial
+header; a reader that finds the state at 0 reopens the path to pick up a
+restarted agent's file. An agent that was killed never sets the state to 0,
+so a reader also checks whether the path points to a new file whenever the
+sample it read is older than stale_after seconds.
+"""
+import os
+import math
+import mmap
+import time
+import struct
+
+MAGIC = b'IWSM'
+LAYOUT_VERSION = 1
+
+HEADER = struct.Struct('<4sIII')
+SEQ = struct.Struct('<Q')
+STATE_OFFSET = 12
+SEQ_OFFSET = 16
+DATA_OFFSET = 24
+NAME_BYTES = 32
+
+# Busy retries of a read before yielding the CPU to the writer
+SPINS_BEFORE_YIELD = 16
+
+STATE_STOPPED = 0
+STATE_ACTIVE = 1
+
+# Exported fields, as <collector>.<metric> of the sampled values
+EXPORT_FIELDS = (
+    'cpu.usagePercent',
+    'memory.usagePercent',
+    'network.bytesSentPerSec',
+    'network.bytesRecvPerSec'
+)
+
+
+def _layout_size(count):
+    """Return the file size for a number of fields"""
+    return DATA_OFFSET + 8 + 8 * count + NAME_BYTES * count
+
+
+class SampleExporter:
+    """Single writer of the shared-memory sample file"""
+
+    def __init__(self, path, fields=EXPORT_FIELDS):
+        """
+        Create the sample file and map it
+
+        Args:
+            path: Path of the file, ideally on tmpfs (e.g. under /dev/shm)
+            fields: Exported field names, fixed for the life of the file
+        """
+        self.path = path
+        self.fields = tuple(fields)
+        self.index = {name: slot for slot, name in enumerate(self.fields)}
+        # Staging values, copied into the mapping as one block on publish
+        self.values = [math.nan] * len(self.fields)
+        self.data = struct.Struct(f'<d{len(self.fields)}d')
+        self.seq = 0
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        size = _layout_size(len(self.fields))
+        tmp = f"{path}.tmp"
+        fd = os.open(tmp, os.O_RDWR | os.O_CREAT | os.O_TRUNC, 0o644)
+        try:
+            os.ftruncate(fd, size)
+            self.mm = mmap.mmap(fd, size)
+        finally:
+            os.close(fd)
+
+        HEADER.pack_into(self.mm, 0, MAGIC, LAYOUT_VERSION, len(self.fields), STATE_ACTIVE)
+        self.data.pack_into(self.mm, DATA_OFFSET, 0.0, *self.values)
+        names_offset = DATA_OFFSET + self.data.size
+        for slot, name in enumerate(self.fields):
+            encoded = name.encode('utf-8')[:NAME_BYTES]
+            self.mm[names_offset + slot * NAME_BYTES:names_offset + slot * NAME_BYTES + len(encoded)] = encoded
+        os.replace(tmp, path)
+
+    def set(self, name, value):
+        """
+        Stage a value for the next publish
+
+        Args:
+            name: Field name; names that are not exported are ignored
+            value: Numeric value
+        """
+        slot = self.index.get(name)
+        if slot is not None:
+            self.values[slot] = value
+
+    def publish(self, timestamp=None):
+        """
+        Write the staged values as the latest sample
+
+        Args:
+            timestamp: Sample time (defaults to time.time())
+        """
+        mm = self.mm
+        self.seq += 1
+        SEQ.pack_into(mm, SEQ_OFFSET, self.seq)
+        self.data.pack_into(mm, DATA_OFFSET, time.time() if timestamp is None else timestamp, *self.values)
+        self.seq += 1
+        SEQ.pack_into(mm, SEQ_OFFSET, self.seq)
+
+    def close(self):
+        """Mark the file stopped and unmap it; the last sample stays readable"""
+        struct.pack_into('<I', self.mm, STATE_OFFSET, STATE_STOPPED)
+        self.mm.close()
+
+
+class SampleReader:
+    """
+    Lock-free reader of the shared-memory sample file
+
+    Example:
+        reader = SampleReader('/dev/shm/infrawatch-sample')
+        sample = reader.read()
+        if sample and reader.age(sample) < 5:
+            cpu = sample['cpu.usagePercent']
+    """
+
+    def __init__(self, path, max_retries=1000, stale_after=5.0):
+        """
+        Map the sample file
+
+        Args:
+            path: Path of the file published by the agent
+            max_retries: Attempts before a read gives up on a busy writer
+            stale_after: Sample age in seconds after which the path is
+                checked for a restarted agent's file (a few sampling intervals)
+
+        Raises:
+            OSError: If the file cannot be opened
+            ValueError: If the file is not a sample file of a known layout
+        """
+        self.path = path
+        self.max_retries = max_retries
+        self.stale_after = stale_after
+        self.mm = None
+        self._open()
+
+    def _open(self):
+        """Map the current file at the path"""
+        with open(self.path, 'rb') as f:
+            st = os.fstat(f.fileno())
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, count, _ = HEADER.unpack_from(mm, 0)
+        if magic != MAGIC or version != LAYOUT_VERSION or len(mm) < _layout_size(count):
+            mm.close()
+            raise ValueError(f"{self.path} is not a version {LAYOUT_VERSION} sample file")
+
+        if self.mm is not None:
+            self.mm.close()
+        self.mm = mm
+        self.identity = (st.st_dev, st.st_ino)
+        self.data = struct.Struct(f'<d{count}d')
+        names_offset = DATA_OFFSET + self.data.size
+        self.fields = tuple(
+            bytes(mm[names_offset + slot * NAME_BYTES:names_offset + (slot + 1) * NAME_BYTES])
+            .rstrip(b'\0').decode('utf-8')
+            for slot in range(count)
+        )
+
+    def read_values(self):
+        """
+        Read a consistent copy of the latest sample
+
+        Returns:
+            tuple: (timestamp, values in the order of self.fields), or None
+                if the writer was mid-update on every attempt
+        """
+        mm, unpack_seq, unpack_data = self.mm, SEQ.unpack_from, self.data.unpack_from
+        for attempt in range(self.max_retries):
+            before = unpack_seq(mm, SEQ_OFFSET)[0]
+            if before & 1:
+                # The writer may have been preempted mid-update; let it finish
+                if attempt % SPINS_BEFORE_YIELD == SPINS_BEFORE_YIELD - 1:
+                    time.sleep(0)
+                continue
+            data = unpack_data(mm, DATA_OFFSET)
+            if unpack_seq(mm, SEQ_OFFSET)[0] == before:
+                # A stopped or silent writer may have been replaced
+                stale = mm[STATE_OFFSET] == STATE_STOPPED or time.time() - data[0] > self.stale_after
+                if stale and self._reopen_if_replaced():
+                    return self.read_values()
+                return data[0], data[1:]
+        return None
+
+    def read(self):
+        """
+        Read the latest sample as a dictionary
+
+        Returns:
+            dict: Field name to value plus 'timestamp', or None if nothing
+                was published yet or the writer stayed busy
+        """
+        result = self.read_values()
+        if result is None or result[0] == 0.0:
+            return None
+        sample = dict(zip(self.fields, result[1]))
+        sample['timestamp'] = result[0]
+        return sample
+
+    @staticmethod
+    def age(sample):
+        """Return the age of a sample in seconds"""
+        return time.time() - sample['timestamp']
+
+    def _reopen_if_replaced(self):
+        """
+        Switch to a newer file after the agent restarted
+
+        Returns:
+            bool: True if a newer file was mapped
+        """
+        try:
+            st = os.stat(self.path)
+            if (st.st_dev, st.st_ino) != self.identity:
+                self._open()
+                return True
+        except (OSError, ValueError):
+            pass
+        return False
+
+    def close(self):
+        """Unmap the file"""
+        if self.mm is not None:
+            self.mm.close()
+            self.mm = None
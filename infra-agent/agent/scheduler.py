@@ -1,20 +1,87 @@
 """
 Scheduler for periodic tasks
 """
+import random
 import logging
 import time
 import threading
 from datetime import datetime
 from apscheduler.schedulers.background import BackgroundScheduler
+from apscheduler.triggers.base import BaseTrigger
 from apscheduler.triggers.interval import IntervalTrigger
+from apscheduler.events import EVENT_JOB_SUBMITTED, EVENT_JOB_MISSED
+from .timing import MODE_INTERVAL, MODE_FLEET, JobTiming, phase_offset, next_grid_tick
+
+
+class PhasedIntervalTrigger(BaseTrigger):
+    """
+    Interval trigger on a fixed wall-clock grid
+
+    Fire times are ``k * interval + phase`` seconds since the epoch, so they
+    never drift regardless of how long jobs run, hosts with the same phase
+    tick together, and hosts with different phases spread across the
+    interval. The first fire is held back until ``start_delay`` has passed.
+    """
+
+    __slots__ = ('interval', 'phase', 'not_before')
+
+    def __init__(self, interval, phase=0.0, start_delay=0.0):
+        """
+        Initialize the trigger
+
+        Args:
+            interval: Interval in seconds
+            phase: Offset from the wall-clock boundary in seconds
+            start_delay: Seconds from now before the first fire
+        """
+        self.interval = float(interval)
+        self.phase = phase % self.interval
+        self.not_before = time.time() + start_delay
+
+    def get_next_fire_time(self, previous_fire_time, now):
+        """
+        Return the next grid tick after now (and after the previous fire)
+
+        Args:
+            previous_fire_time: Previous fire time, or None
+            now: Current time (timezone aware)
+
+        Returns:
+            datetime: Next fire time
+        """
+        base = max(now.timestamp(), self.not_before)
+        if previous_fire_time is not None:
+            base = max(base, previous_fire_time.timestamp() + self.interval / 2)
+
+        return datetime.fromtimestamp(next_grid_tick(base, self.interval, self.phase), now.tzinfo)
+
+    def __str__(self):
+        return f"phased interval[{self.interval}s, phase={self.phase:.3f}s]"
+
 
 class Scheduler:
     """Scheduler for running periodic tasks"""
 
-    def __init__(self):
-        """Initialize the scheduler"""
+    def __init__(self, mode=MODE_INTERVAL, vm_id=None, startup_jitter=0):
+        """
+        Initialize the scheduler
+
+        Args:
+            mode: 'interval' for plain intervals from agent start, or 'fleet'
+                for wall-clock aligned ticks with a per-VM phase offset
+            vm_id: VM ID used to derive phase offsets in fleet mode
+            startup_jitter: Maximum random delay in seconds before the first
+                run of each network job in fleet mode
+        """
         self.scheduler = BackgroundScheduler()
         self.running = False
+        self.mode = mode
+        self.vm_id = vm_id or ''
+        self.startup_jitter = startup_jitter
+
+        self.timings = {}
+        self._timings_lock = threading.Lock()
+        self.scheduler.add_listener(self._on_job_event, EVENT_JOB_SUBMITTED | EVENT_JOB_MISSED)
 
     def start(self):
         """Start the scheduler"""
@@ -30,26 +97,108 @@ class Scheduler:
             self.running = False
             logging.info("Scheduler stopped")
 
-    def add_monitoring_job(self, func, interval):
+    def _on_job_event(self, event):
+        """Record start lateness and missed runs of periodic jobs"""
+        with self._timings_lock:
+            timing = self.timings.get(event.job_id)
+            if timing is None:
+                return
+
+            if event.code == EVENT_JOB_MISSED:
+                timing.missed += 1
+                return
+
+            scheduled = event.scheduled_run_times[-1].timestamp()
+            timing.record(max(time.time() - scheduled, 0.0))
+
+    def get_job_timings(self):
         """
-        Add a monitoring job to the scheduler
+        Get start lateness and run duration statistics of periodic jobs
+
+        Returns:
+            dict: Job name to timing statistics
+        """
+        with self._timings_lock:
+            return {name: timing.to_dict() for name, timing in self.timings.items()}
+
+    def _timed(self, name, func):
+        """Wrap a job function to record how long each run takes"""
+        def run(*args, **kwargs):
+            started = time.monotonic()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                with self._timings_lock:
+                    timing = self.timings.get(name)
+                    if timing is not None:
+                        timing.record_duration(time.monotonic() - started)
+        return run
+
+    def _trigger(self, name, interval, phased):
+        """
+        Build the trigger for a periodic job
+
+        Args:
+            name: Job name
+            interval: Interval in seconds
+            phased: Spread the job across the interval by VM in fleet mode;
+                otherwise align it to the wall-clock boundary
+
+        Returns:
+            Trigger instance
+        """
+        if self.mode != MODE_FLEET:
+            return IntervalTrigger(seconds=interval)
+
+        if not phased:
+            return PhasedIntervalTrigger(interval)
+
+        phase = phase_offset(f"{self.vm_id}:{name}", interval)
+        start_delay = random.uniform(0, self.startup_jitter) if not self.running else 0.0
+        return PhasedIntervalTrigger(interval, phase, start_delay)
+
+    def _add_periodic_job(self, func, name, interval, phased=True, **kwargs):
+        """
+        Add or replace a periodic job
 
         Args:
             func: Function to run
+            name: Job name, also used as the job ID
             interval: Interval in seconds
+            phased: See _trigger()
+            **kwargs: Extra add_job() options
 
         Returns:
             Job ID
         """
-        logging.info(f"Adding monitoring job with interval {interval} seconds")
+        with self._timings_lock:
+            self.timings.setdefault(name, JobTiming())
+
         return self.scheduler.add_job(
-            func,
-            IntervalTrigger(seconds=interval),
-            name="monitoring",
+            self._timed(name, func),
+            self._trigger(name, interval, phased),
+            id=name,
+            name=name,
             max_instances=1,
-            replace_existing=True
+            coalesce=True,
+            replace_existing=True,
+            **kwargs
         )
 
+    def add_monitoring_job(self, func, interval):
+        """
+        Add a monitoring job to the scheduler
+
+        Args:
+            func: Function to run
+            interval: Interval in seconds
+
+        Returns:
+            Job ID
+        """
+        logging.info(f"Adding monitoring job with interval {interval} seconds")
+        return self._add_periodic_job(func, "monitoring", interval)
+
     def add_heartbeat_job(self, func, interval):
         """
         Add a heartbeat job to the scheduler
@@ -62,13 +211,7 @@ class Scheduler:
             Job ID
         """
         logging.info(f"Adding heartbeat job with interval {interval} seconds")
-        return self.scheduler.add_job(
-            func,
-            IntervalTrigger(seconds=interval),
-            name="heartbeat",
-            max_instances=1,
-            replace_existing=True
-        )
+        return self._add_periodic_job(func, "heartbeat", interval)
 
     def add_command_polling_job(self, func, interval):
         """
@@ -82,10 +225,81 @@ class Scheduler:
             Job ID
         """
         logging.info(f"Adding command polling job with interval {interval} seconds")
-        return self.scheduler.add_job(
-            func,
-            IntervalTrigger(seconds=interval),
-            name="command_polling",
-            max_instances=1,
-            replace_existing=True
-        )
\ No newline at end of file
+        return self._add_periodic_job(func, "command_polling", interval)
+
+    def add_sampling_job(self, func, interval):
+        """
+        Add a high-frequency sampling job to the scheduler
+
+        Sampling is local only, so in fleet mode it is aligned to wall-clock
+        boundaries without a phase offset to line samples up across hosts.
+
+        Args:
+            func: Function to run
+            interval: Interval in seconds
+
+        Returns:
+            Job ID
+        """
+        logging.info(f"Adding sampling job with interval {interval} seconds")
+        return self._add_periodic_job(func, "sampling", interval, phased=False)
+
+    def add_probe_job(self, func, interval):
+        """
+        Add a service health probe job to the scheduler
+
+        Args:
+            func: Function to run
+            interval: Interval in seconds
+
+        Returns:
+            Job ID
+        """
+        logging.info(f"Adding probe job with interval {interval} seconds")
+        return self._add_periodic_job(func, "probes", interval)
+
+    def defer_job(self, name, until):
+        """
+        Hold a periodic job back until a given time
+
+        The job resumes on its normal trigger afterwards.
+
+        Args:
+            name: Job name
+            until: Unix timestamp before which the job must not run
+        """
+        job = self.scheduler.get_job(name)
+        if job is None or job.next_run_time is None:
+            return
+
+        if job.next_run_time.timestamp() < until:
+            resume_at = datetime.fromtimestamp(until, job.next_run_time.tzinfo)
+            job.modify(next_run_time=resume_at)
+            logging.info(f"Pausing {name} job until {resume_at.isoformat()}")
+
+    def remove_job(self, name):
+        """
+        Remove a periodic job if it is scheduled
+
+        Args:
+            name: Job name
+        """
+        if self.scheduler.get_job(name) is None:
+            return
+        self.scheduler.remove_job(name)
+        with self._timings_lock:
+            self.timings.pop(name, None)
+        logging.info(f"Removed {name} job")
+
+    def run_now(self, func, *args):
+        """
+        Run a function once, immediately, on the scheduler's thread pool
+
+        Args:
+            func: Function to run
+            *args: Arguments passed to the function
+
+        Returns:
+            Job ID
+        """
+        return self.scheduler.add_job(func, args=args, misfire_grace_time=None)
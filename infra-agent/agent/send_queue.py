@@ -0,0 +1,523 @@
+"""
+Bounded queue decoupling monitoring collection from uploads
+"""
+import os
+import json
+import time
+import logging
+import threading
+from itertools import islice
+from collections import deque
+from .backoff import full_jitter
+from .sketch import DDSketch
+from .exceptions import APIError, AuthenticationError, CircuitOpenError
+
+# Overflow policies
+DROP_OLDEST = 'drop_oldest'
+COALESCE = 'coalesce'
+SPILL = 'spill'
+OVERFLOW_POLICIES = (DROP_OLDEST, COALESCE, SPILL)
+
+# Network fields that count events since the previous sample
+NETWORK_COUNTERS = ('bytesSent', 'bytesRecv', 'errors', 'drops')
+
+# Client errors that will not succeed on retry; the sample is dropped
+REJECTED_STATUS_CODES = (400, 404, 413, 422)
+
+
+def coalesce_samples(older, newer):
+    """
+    Merge two consecutive monitoring samples into one
+
+    The newer sample's gauges and rates are kept, network counters are
+    summed and intra-interval distributions are merged through their
+    sketches, so the merged sample covers both intervals.
+
+    Args:
+        older: Earlier sample
+        newer: Later sample
+
+    Returns:
+        dict: Merged sample
+    """
+    merged = dict(newer)
+
+    if isinstance(older.get('network'), dict) and isinstance(newer.get('network'), dict):
+        network = merged['network'] = dict(newer['network'])
+        for counter in NETWORK_COUNTERS:
+            if counter in network and counter in older['network']:
+                network[counter] += older['network'][counter]
+
+    older_distributions = older.get('distributions') or {}
+    if older_distributions:
+        distributions = {}
+        for collector in set(older_distributions) | set(newer.get('distributions') or {}):
+            metrics = dict(older_distributions.get(collector) or {})
+            for metric, summary in ((newer.get('distributions') or {}).get(collector) or {}).items():
+                previous = metrics.get(metric)
+                if previous is None or 'sketch' not in previous or 'sketch' not in summary:
+                    metrics[metric] = summary
+                    continue
+                sketch = DDSketch.from_dict(previous['sketch'])
+                sketch.merge(DDSketch.from_dict(summary['sketch']))
+                metrics[metric] = sketch.summary()
+            distributions[collector] = metrics
+        merged['distributions'] = distributions
+
+    return merged
+
+
+def strip_sketches(sample):
+    """
+    Drop the mergeable sketches from a sample's distribution summaries
+
+    The percentiles stay; only the bins used to merge summaries later go,
+    which shrinks the payload.
+
+    Args:
+        sample: Monitoring sample
+
+    Returns:
+        dict: Sample without sketches (the input is not modified)
+    """
+    distributions = sample.get('distributions')
+    if not distributions:
+        return sample
+    stripped = dict(sample)
+    stripped['distributions'] = {
+        collector: {
+            metric: {key: value for key, value in summary.items() if key != 'sketch'}
+            if isinstance(summary, dict) else summary
+            for metric, summary in metrics.items()
+        }
+        for collector, metrics in distributions.items()
+    }
+    return stripped
+
+
+class SendQueue:
+    """
+    Bounded queue of monitoring samples drained by a sender thread
+
+    Collection puts samples and returns immediately, so a slow or failing
+    upload never delays the next collection. The sender delivers samples
+    oldest first, backing off on failures and while the endpoint's circuit
+    is open. When the queue is full the overflow policy applies:
+
+    drop_oldest: the oldest sample is discarded
+    coalesce: the two oldest samples are merged into one
+    spill: the oldest sample is written to disk and sent before newer ones;
+        samples still queued at shutdown are spilled too, so they survive
+        a restart
+
+    Samples are uploaded one per request, or in batches through the batch
+    endpoint when batch_size is above 1. A partial batch goes out once its
+    oldest sample has waited max_batch_wait seconds.
+    """
+
+    def __init__(self, api_client, max_items=60, overflow=DROP_OLDEST, spill_dir=None,
+                 max_spill_files=1440, budget=None, flush_timeout=10.0, batch_size=1,
+                 compression='none', sketches=True, max_batch_wait=60.0):
+        """
+        Initialize the queue
+
+        Args:
+            api_client: APIClient used to upload samples
+            max_items: Samples held in memory
+            overflow: Overflow policy, one of OVERFLOW_POLICIES
+            spill_dir: Directory for spilled samples (spill policy)
+            max_spill_files: Spilled samples kept; the oldest are deleted beyond this
+            budget: MemoryBudget bounding the queued bytes (optional)
+            flush_timeout: Seconds spent delivering queued samples on stop
+            batch_size: Samples per upload request
+            compression: Upload compression, 'none' or 'gzip'
+            sketches: Keep sketches in distribution summaries
+            max_batch_wait: Seconds a sample waits for its batch to fill
+        """
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown overflow policy {overflow}")
+        if overflow == SPILL and not spill_dir:
+            raise ValueError("The spill policy needs a spill directory")
+
+        self.api_client = api_client
+        self.max_items = max_items
+        self.overflow = overflow
+        self.spill_dir = spill_dir
+        self.max_spill_files = max_spill_files
+        self.budget = budget
+        self.flush_timeout = flush_timeout
+        self.max_batch_wait = max_batch_wait
+        self.configure(batch_size, compression, sketches)
+
+        # Entries are [sample, nbytes, collected_at]
+        self.queue = deque()
+        self.spilled = deque()
+        self.lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self._seq = 0
+
+        self.dropped = 0
+        self.coalesced = 0
+        self.spilled_total = 0
+        self.sent = 0
+        self.last_delivery_lag = None
+
+        if overflow == SPILL:
+            os.makedirs(spill_dir, exist_ok=True)
+            # Samples spilled before a restart are sent first
+            self.spilled.extend(sorted(
+                os.path.join(spill_dir, name) for name in os.listdir(spill_dir) if name.endswith('.json')
+            ))
+
+        if budget is not None:
+            budget.register('send_queue', self.evict)
+
+    def configure(self, batch_size, compression, sketches):
+        """
+        Set the upload shape; takes effect from the next upload
+
+        Args:
+            batch_size: Samples per upload request
+            compression: Upload compression, 'none' or 'gzip'
+            sketches: Keep sketches in distribution summaries
+        """
+        self.batch_size = max(int(batch_size), 1)
+        self.compress = compression == 'gzip'
+        self.sketches = sketches
+
+    def start(self):
+        """Start the sender thread"""
+        self._thread = threading.Thread(target=self._run, name='monitoring-sender', daemon=True)
+        self._thread.start()
+        if self.spilled:
+            logging.info(f"Resuming delivery of {len(self.spilled)} spilled samples")
+
+    def stop(self):
+        """Deliver what can be delivered within the flush timeout, then stop"""
+        self._stop.set()
+        self._wakeup.set()
+        if self._thread is None:
+            self._finish()
+            return
+
+        # The sender spills what is left itself, so an upload still in
+        # flight cannot give samples back after the spill
+        self._thread.join(timeout=self.flush_timeout + 15)
+        if self._thread.is_alive():
+            logging.warning("Monitoring sender still uploading, it will spill undelivered samples when done")
+
+    def _finish(self):
+        """Spill (or discard) the samples left once the sender has stopped"""
+        if self.overflow == SPILL:
+            with self.lock:
+                entries = list(self.queue)
+                self.queue.clear()
+            for entry in entries:
+                self._spill(entry)
+            if entries:
+                logging.info(f"Spilled {len(entries)} undelivered samples")
+        elif self.queue:
+            logging.warning(f"Discarding {len(self.queue)} undelivered samples")
+
+    def put(self, sample):
+        """
+        Queue a sample for upload
+
+        Args:
+            sample: Monitoring payload
+        """
+        nbytes = len(json.dumps(sample))
+        # Reserve before taking the lock; the budget may call evict()
+        if self.budget is not None and not self.budget.reserve('send_queue', nbytes):
+            self.dropped += 1
+            logging.warning("Memory budget exhausted, dropped monitoring sample")
+            return
+
+        with self.lock:
+            self.queue.append([sample, nbytes, time.time()])
+            overflow = self._enforce_limit()
+        self._after_overflow(overflow)
+        self._wakeup.set()
+
+    def _enforce_limit(self):
+        """
+        Apply the overflow policy until the queue fits; called with the lock held
+
+        Returns:
+            list: Entries to spill once the lock is released
+        """
+        to_spill = []
+        while len(self.queue) > self.max_items:
+            if self.overflow == COALESCE and len(self.queue) >= 2:
+                older = self.queue.popleft()
+                newer = self.queue[0]
+                newer[0] = coalesce_samples(older[0], newer[0])
+                newer[2] = older[2]
+                self._release(older[1])
+                self.coalesced += 1
+            elif self.overflow == SPILL:
+                to_spill.append(self.queue.popleft())
+            else:
+                self._release(self.queue.popleft()[1])
+                self.dropped += 1
+        return to_spill
+
+    def _after_overflow(self, to_spill):
+        """Write spilled entries to disk outside the lock"""
+        for entry in to_spill:
+            self._spill(entry)
+
+    def _release(self, nbytes):
+        """Return bytes to the memory budget"""
+        if self.budget is not None:
+            self.budget.release('send_queue', nbytes)
+
+    def _spill(self, entry):
+        """Write an entry to the spill directory"""
+        sample, nbytes, collected_at = entry
+        with self.lock:
+            self._seq += 1
+            seq = self._seq
+        path = os.path.join(self.spill_dir, f"{int(collected_at * 1000):015d}-{seq:06d}.json")
+        try:
+            with open(path, 'w') as f:
+                json.dump({'collectedAt': collected_at, 'sample': sample}, f)
+        except OSError as e:
+            logging.error(f"Failed to spill monitoring sample: {e}")
+            self.dropped += 1
+        else:
+            with self.lock:
+                self.spilled.append(path)
+                self.spilled_total += 1
+                expired = []
+                while len(self.spilled) > self.max_spill_files:
+                    expired.append(self.spilled.popleft())
+            for old in expired:
+                self._remove(old)
+                self.dropped += 1
+        self._release(nbytes)
+
+    @staticmethod
+    def _remove(path):
+        """Delete a spill file that may already be gone"""
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def evict(self, nbytes):
+        """
+        Free memory by dropping (or, with the spill policy, spilling) the oldest samples
+
+        Args:
+            nbytes: Bytes to free
+
+        Returns:
+            int: Bytes freed
+        """
+        freed = 0
+        entries = []
+        with self.lock:
+            while self.queue and freed < nbytes:
+                entry = self.queue.popleft()
+                entries.append(entry)
+                freed += entry[1]
+
+        for entry in entries:
+            if self.overflow == SPILL:
+                self._spill(entry)
+            else:
+                self._release(entry[1])
+                self.dropped += 1
+        if entries:
+            logging.warning(f"Send queue memory budget exceeded, evicted {len(entries)} oldest samples")
+        return freed
+
+    def _take(self, limit, partial=False):
+        """
+        Take up to limit of the oldest samples for delivery
+
+        Spilled samples go first; a batch never mixes spilled and in-memory
+        samples. In-memory samples are held back until a full batch is
+        queued, so larger batches mean fewer requests, or until the oldest
+        has waited max_batch_wait seconds.
+
+        Args:
+            limit: Batch size
+            partial: Take a partial in-memory batch (when flushing on stop)
+
+        Returns:
+            list: (entry, spill path or None) pairs, oldest first
+        """
+        with self.lock:
+            if not self.spilled:
+                if not self.queue:
+                    return []
+                waited = time.time() - self.queue[0][2]
+                if (not partial and len(self.queue) < min(limit, self.max_items)
+                        and waited < self.max_batch_wait):
+                    return []
+                taken = []
+                while self.queue and len(taken) < limit:
+                    taken.append((self.queue.popleft(), None))
+                return taken
+            paths = list(islice(self.spilled, limit))
+
+        taken = []
+        for path in paths:
+            try:
+                with open(path) as f:
+                    stored = json.load(f)
+            except (OSError, ValueError) as e:
+                logging.error(f"Discarding unreadable spilled sample {path}: {e}")
+                self._discard_spilled(path)
+                continue
+            taken.append(([stored['sample'], 0, stored['collectedAt']], path))
+        return taken or self._take(limit, partial)
+
+    def _discard_spilled(self, path):
+        """Forget and delete a spill file"""
+        with self.lock:
+            try:
+                self.spilled.remove(path)
+            except ValueError:
+                pass
+        self._remove(path)
+
+    def _give_back(self, entries):
+        """Return undelivered in-memory entries to the front of the queue, in order"""
+        if not entries:
+            return
+        with self.lock:
+            self.queue.extendleft(reversed(entries))
+            overflow = self._enforce_limit()
+        self._after_overflow(overflow)
+
+    def _upload(self, batch):
+        """
+        Upload a batch of samples
+
+        Returns:
+            list: Status code per sample
+        """
+        samples = [entry[0] if self.sketches else strip_sketches(entry[0]) for entry, _ in batch]
+        if len(samples) == 1:
+            self.api_client.send_monitoring_data(samples[0], compress=self.compress)
+            return [201]
+        return [status for status, _ in self.api_client.send_monitoring_batch(samples, compress=self.compress)]
+
+    def _run(self):
+        """Deliver samples until stopped, then spill what is left"""
+        try:
+            self._deliver()
+        finally:
+            self._finish()
+
+    def _deliver(self):
+        """Deliver samples until stopped and the flush timeout has passed"""
+        failures = 0
+        flush_deadline = None
+
+        while True:
+            if self._stop.is_set():
+                if flush_deadline is None:
+                    flush_deadline = time.time() + self.flush_timeout
+                if time.time() >= flush_deadline:
+                    break
+
+            batch = self._take(self.batch_size, partial=self._stop.is_set())
+            if not batch:
+                if self._stop.is_set():
+                    break
+                self._wakeup.wait(1.0)
+                self._wakeup.clear()
+                continue
+
+            delay = 0.0
+            try:
+                statuses = self._upload(batch)
+            except CircuitOpenError as e:
+                delay = max(e.retry_at - time.time(), 0.1)
+            except AuthenticationError:
+                failures += 1
+                delay = full_jitter(failures, 5.0, 300.0)
+            except APIError as e:
+                if getattr(e, 'status_code', None) in REJECTED_STATUS_CODES:
+                    logging.error(f"Monitoring upload rejected by server, dropping {len(batch)} samples: {e}")
+                    for entry, path in batch:
+                        self.dropped += 1
+                        self._delivered(entry, path, counted=False)
+                    continue
+                failures += 1
+                delay = full_jitter(failures, 1.0, 60.0)
+            except Exception as e:
+                logging.error(f"Unexpected error sending monitoring data: {e}")
+                failures += 1
+                delay = full_jitter(failures, 1.0, 60.0)
+            else:
+                # A batch answers per sample; retry only the failed ones
+                retry = []
+                for (entry, path), status in zip(batch, statuses):
+                    if status < 300:
+                        self._delivered(entry, path)
+                    elif status in REJECTED_STATUS_CODES:
+                        logging.error(f"Monitoring sample rejected by server ({status}), dropping it")
+                        self.dropped += 1
+                        self._delivered(entry, path, counted=False)
+                    else:
+                        retry.append((entry, path))
+                if not retry:
+                    failures = 0
+                    logging.info(f"Monitoring data sent successfully ({len(batch)} samples)")
+                    continue
+                logging.warning(f"{len(retry)} of {len(batch)} monitoring samples failed, retrying")
+                batch = retry
+                failures += 1
+                delay = full_jitter(failures, 1.0, 60.0)
+
+            # Not delivered: keep the samples at the front and wait
+            self._give_back([entry for entry, path in batch if path is None])
+            if self._stop.is_set():
+                break
+            self._stop.wait(delay)
+
+    def _delivered(self, entry, path, counted=True):
+        """Remove a sample that left the queue for good"""
+        if path is not None:
+            self._discard_spilled(path)
+        else:
+            self._release(entry[1])
+        if counted:
+            self.sent += 1
+            self.last_delivery_lag = time.time() - entry[2]
+
+    def metrics(self):
+        """
+        Get queue metrics
+
+        Returns:
+            dict: Depth, oldest sample age and delivery counters
+        """
+        now = time.time()
+        with self.lock:
+            oldest = self.queue[0][2] if self.queue else None
+            depth = len(self.queue)
+            spilled = len(self.spilled)
+            if spilled:
+                # Spill file names start with the collection time in milliseconds
+                oldest = int(os.path.basename(self.spilled[0]).split('-', 1)[0]) / 1000
+
+        return {
+            'policy': self.overflow,
+            'batchSize': self.batch_size,
+            'depth': depth,
+            'spilled': spilled,
+            'oldestAgeSeconds': round(now - oldest, 3) if oldest else 0.0,
+            'lastDeliveryLagSeconds': round(self.last_delivery_lag, 3) if self.last_delivery_lag is not None else None,
+            'sent': self.sent,
+            'dropped': self.dropped,
+            'coalesced': self.coalesced,
+            'spilledTotal': self.spilled_total
+        }
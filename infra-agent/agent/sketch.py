@@ -0,0 +1,192 @@
+"""
+Mergeable streaming quantile sketch (DDSketch) for intra-interval distributions
+"""
+import math
+
+
+class DDSketch:
+    """
+    Quantile sketch with relative-error guarantees
+
+    Values are mapped to logarithmically sized buckets so that any quantile is
+    returned within ``relative_accuracy`` of the true value. Two sketches with
+    the same accuracy are merged by adding bucket counts, which lets the
+    backend combine sketches across hosts and time windows.
+    """
+
+    __slots__ = ('relative_accuracy', 'max_bins', 'gamma', '_log_gamma',
+                 'bins', 'zero_count', 'count', 'min', 'max', 'sum')
+
+    # Values below this are counted in the zero bucket
+    MIN_INDEXABLE = 1e-9
+
+    def __init__(self, relative_accuracy=0.01, max_bins=2048):
+        """
+        Initialize an empty sketch
+
+        Args:
+            relative_accuracy: Maximum relative error of reported quantiles
+            max_bins: Maximum number of buckets; the lowest buckets are
+                collapsed together when exceeded
+        """
+        if not 0 < relative_accuracy < 1:
+            raise ValueError("relative_accuracy must be between 0 and 1")
+
+        self.relative_accuracy = relative_accuracy
+        self.max_bins = max_bins
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.clear()
+
+    def clear(self):
+        """Reset the sketch to empty"""
+        self.bins = {}
+        self.zero_count = 0
+        self.count = 0
+        self.min = math.inf
+        self.max = -math.inf
+        self.sum = 0.0
+
+    def add(self, value):
+        """
+        Add a non-negative value to the sketch
+
+        Args:
+            value: Value to add; negative values are counted as zero
+        """
+        if value < 0:
+            value = 0.0
+
+        self.count += 1
+        self.sum += value
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+
+        if value < self.MIN_INDEXABLE:
+            self.zero_count += 1
+            return
+
+        index = math.ceil(math.log(value) / self._log_gamma)
+        bins = self.bins
+        bins[index] = bins.get(index, 0) + 1
+        if len(bins) > self.max_bins:
+            self._collapse()
+
+    def merge(self, other):
+        """
+        Merge another sketch into this one
+
+        Args:
+            other: DDSketch with the same relative accuracy
+        """
+        if other.gamma != self.gamma:
+            raise ValueError("Cannot merge sketches with different relative accuracy")
+        if not other.count:
+            return
+
+        for index, count in other.bins.items():
+            self.bins[index] = self.bins.get(index, 0) + count
+        self.zero_count += other.zero_count
+        self.count += other.count
+        self.sum += other.sum
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        if len(self.bins) > self.max_bins:
+            self._collapse()
+
+    def _collapse(self):
+        """Fold the lowest buckets together until within max_bins"""
+        indexes = sorted(self.bins)
+        excess = len(indexes) - self.max_bins
+        target = indexes[excess]
+        for index in indexes[:excess]:
+            self.bins[target] += self.bins.pop(index)
+
+    def quantile(self, q):
+        """
+        Estimate a quantile
+
+        Args:
+            q: Quantile between 0 and 1
+
+        Returns:
+            float: Estimated value, or None if the sketch is empty
+        """
+        if not self.count:
+            return None
+        if q <= 0:
+            return self.min
+        if q >= 1:
+            return self.max
+
+        rank = q * (self.count - 1)
+        seen = self.zero_count
+        if rank < seen:
+            return 0.0
+
+        for index in sorted(self.bins):
+            seen += self.bins[index]
+            if rank < seen:
+                value = 2 * self.gamma ** index / (self.gamma + 1)
+                return min(max(value, self.min), self.max)
+        return self.max
+
+    def summary(self, precision=2):
+        """
+        Summarise the sketch for upload
+
+        Args:
+            precision: Decimal places for reported values
+
+        Returns:
+            dict: Count, min, max, p50/p95/p99 and the serialised sketch
+        """
+        return {
+            'count': self.count,
+            'min': round(self.min, precision),
+            'max': round(self.max, precision),
+            'p50': round(self.quantile(0.50), precision),
+            'p95': round(self.quantile(0.95), precision),
+            'p99': round(self.quantile(0.99), precision),
+            'sketch': self.to_dict()
+        }
+
+    def to_dict(self):
+        """
+        Serialise the sketch in a JSON-friendly form
+
+        Returns:
+            dict: Sketch state; bucket indexes are string keys
+        """
+        return {
+            'relativeAccuracy': self.relative_accuracy,
+            'bins': {str(index): count for index, count in self.bins.items()},
+            'zeroCount': self.zero_count,
+            'count': self.count,
+            'min': self.min,
+            'max': self.max,
+            'sum': self.sum
+        }
+
+    @classmethod
+    def from_dict(cls, data, max_bins=2048):
+        """
+        Rebuild a sketch from to_dict() output
+
+        Args:
+            data: Serialised sketch
+            max_bins: Maximum number of buckets
+
+        Returns:
+            DDSketch: Restored sketch
+        """
+        sketch = cls(data['relativeAccuracy'], max_bins)
+        sketch.bins = {int(index): count for index, count in data['bins'].items()}
+        sketch.zero_count = data['zeroCount']
+        sketch.count = data['count']
+        sketch.min = data['min']
+        sketch.max = data['max']
+        sketch.sum = data['sum']
+        return sketch
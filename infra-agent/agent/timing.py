@@ -0,0 +1,85 @@
+"""
+Scheduling helpers shared by the APScheduler-based and built-in schedulers
+"""
+import hashlib
+
+# Scheduling modes
+MODE_INTERVAL = 'interval'
+MODE_FLEET = 'fleet'
+
+
+def phase_offset(key, interval):
+    """
+    Derive a deterministic phase offset within an interval
+
+    Args:
+        key: Stable identifier, e.g. '<vm_id>:<job name>'
+        interval: Interval in seconds
+
+    Returns:
+        float: Offset in seconds in [0, interval)
+    """
+    digest = hashlib.sha256(key.encode('utf-8')).digest()
+    return int.from_bytes(digest[:8], 'big') / 2 ** 64 * interval
+
+
+def next_grid_tick(base, interval, phase):
+    """
+    Return the first tick of the grid ``k * interval + phase`` at or after base
+
+    Args:
+        base: Unix timestamp
+        interval: Interval in seconds
+        phase: Offset from the wall-clock boundary in seconds
+
+    Returns:
+        float: Unix timestamp of the tick
+    """
+    return -((phase - base) // interval) * interval + phase
+
+
+class JobTiming:
+    """Start lateness and run duration statistics for one job"""
+
+    __slots__ = ('runs', 'missed', 'last', 'max', 'total',
+                 'completed', 'last_duration', 'max_duration', 'total_duration')
+
+    def __init__(self):
+        self.runs = 0
+        self.missed = 0
+        self.last = 0.0
+        self.max = 0.0
+        self.total = 0.0
+        self.completed = 0
+        self.last_duration = 0.0
+        self.max_duration = 0.0
+        self.total_duration = 0.0
+
+    def record(self, lateness):
+        """Record how many seconds late a run started"""
+        self.runs += 1
+        self.last = lateness
+        self.total += lateness
+        if lateness > self.max:
+            self.max = lateness
+
+    def record_duration(self, duration):
+        """Record how many seconds a run took"""
+        self.completed += 1
+        self.last_duration = duration
+        self.total_duration += duration
+        if duration > self.max_duration:
+            self.max_duration = duration
+
+    def to_dict(self):
+        """Return the statistics as a dict"""
+        return {
+            'runs': self.runs,
+            'missed': self.missed,
+            'lastLatenessMs': round(self.last * 1000, 1),
+            'maxLatenessMs': round(self.max * 1000, 1),
+            'meanLatenessMs': round(self.total / self.runs * 1000, 1) if self.runs else 0.0,
+            'lastDurationMs': round(self.last_duration * 1000, 1),
+            'maxDurationMs': round(self.max_duration * 1000, 1),
+            'meanDurationMs': round(self.total_duration / self.completed * 1000, 1) if self.completed else 0.0
+        }
@@ -2,35 +2,84 @@
 Utility functions for the Infrawatch Agent
 """
 import os
+import queue
 import logging
+import logging.handlers
 from pathlib import Path
+from .log_handlers import DroppingQueueHandler, SizeAndTimeRotatingFileHandler, RateLimitFilter
 
-def setup_logging(log_level, log_file=None):
+LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+def setup_logging(log_level, log_file=None, max_bytes=10 * 1024 * 1024, backup_count=5,
+                  rotate_interval=86400, compress=True, rate_limit_interval=60,
+                  rate_limit_burst=5, queue_size=10000):
     """
     Setup logging configuration for the agent
-    
+
+    Records are rate limited and pushed onto a bounded queue by the calling
+    thread; a background listener thread does all console and file I/O.
+
     Args:
         log_level: Logging level (DEBUG, INFO, WARNING, ERROR, CRITICAL)
         log_file: Path to log file (if None, log to console only)
+        max_bytes: Rotate the log file when it reaches this size (0 disables)
+        backup_count: Number of rotated log files to keep
+        rotate_interval: Rotate the log file after this many seconds (0 disables)
+        compress: Gzip rotated log files
+        rate_limit_interval: Deduplication window in seconds (0 disables)
+        rate_limit_burst: Identical messages allowed per window
+        queue_size: Maximum number of records waiting to be written
+
+    Returns:
+        QueueListener: Running listener; call stop() to flush on shutdown
     """
+    formatter = logging.Formatter(LOG_FORMAT)
     handlers = []
-    
+
     # Always log to console
     console_handler = logging.StreamHandler()
+    console_handler.setFormatter(formatter)
     handlers.append(console_handler)
-    
+
     # Log to file if specified
     if log_file:
         log_dir = os.path.dirname(log_file)
         if log_dir and not os.path.exists(log_dir):
             os.makedirs(log_dir, exist_ok=True)
-            
-        file_handler = logging.FileHandler(log_file)
+
+        file_handler = SizeAndTimeRotatingFileHandler(
+            log_file,
+            max_bytes=max_bytes,
+            backup_count=backup_count,
+            rotate_interval=rotate_interval,
+            compress=compress
+        )
+        file_handler.setFormatter(formatter)
         handlers.append(file_handler)
-    
+
+    # Writer thread owns the real handlers
+    log_queue = queue.Queue(maxsize=queue_size)
+    listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+
+    queue_handler = DroppingQueueHandler(log_queue)
+    queue_handler.addFilter(RateLimitFilter(rate_limit_interval, rate_limit_burst))
+
     # Configure logging
-    logging.basicConfig(
-        level=log_level,
-        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-        handlers=handlers
-    )
\ No newline at end of file
+    root_logger = logging.getLogger()
+    for handler in root_logger.handlers[:]:
+        root_logger.removeHandler(handler)
+    root_logger.setLevel(log_level)
+    root_logger.addHandler(queue_handler)
+
+    listener.start()
+    return listener
+
+def dropped_log_records():
+    """
+    Return the number of log records dropped because the writer was behind
+
+    Returns:
+        int: Records dropped by the queue handler since setup_logging()
+    """
+    return sum(handler.dropped for handler in logging.getLogger().handlers
+               if isinstance(handler, DroppingQueueHandler))
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Benchmark of logging overhead per monitoring cycle
+
+Compares the time the calling thread spends in logging calls for a
+synchronous FileHandler against the queue-based pipeline from
+agent.utils.setup_logging.
+
+Usage:
+    python benchmarks/bench_logging.py [cycles]
+"""
+import os
+import sys
+import time
+import logging
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agent.utils import setup_logging, LOG_FORMAT
+
+def run_cycle(cycle):
+    """Emit the log lines of one typical agent cycle"""
+    logging.info("Collecting monitoring data...")
+    logging.debug("Collecting data using CPUCollector")
+    logging.debug("Data collection completed for CPUCollector")
+    logging.info("Using simplified disk data")
+    logging.debug(f"Sending monitoring data to http://localhost/api/v1/monitoring/vm-{cycle % 3}")
+    logging.info("Monitoring data sent successfully")
+    logging.error("Failed to send heartbeat: connection refused")
+
+def measure(cycles):
+    """Return mean per-cycle time in microseconds spent in logging calls"""
+    start = time.perf_counter()
+    for cycle in range(cycles):
+        run_cycle(cycle)
+    return (time.perf_counter() - start) / cycles * 1e6
+
+def reset_root():
+    """Remove all handlers from the root logger"""
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+        handler.close()
+
+def main():
+    cycles = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # Silence the console so only file I/O is measured
+        sys.stderr = open(os.devnull, 'w')
+
+        handler = logging.FileHandler(os.path.join(tmp, 'sync.log'))
+        handler.setFormatter(logging.Formatter(LOG_FORMAT))
+        reset_root()
+        logging.getLogger().setLevel(logging.DEBUG)
+        logging.getLogger().addHandler(handler)
+        sync_us = measure(cycles)
+        reset_root()
+
+        listener = setup_logging(logging.DEBUG, os.path.join(tmp, 'queued.log'))
+        queued_us = measure(cycles)
+        drain_start = time.perf_counter()
+        listener.stop()
+        drain_s = time.perf_counter() - drain_start
+        reset_root()
+
+        sys.stderr = sys.__stderr__
+
+    print(f"cycles:                 {cycles}")
+    print(f"sync FileHandler:       {sync_us:8.1f} us/cycle")
+    print(f"queued + rate limited:  {queued_us:8.1f} us/cycle")
+    print(f"background drain:       {drain_s:8.3f} s")
+
+if __name__ == "__main__":
+    main()
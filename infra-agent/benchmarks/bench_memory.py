@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Benchmark of agent memory footprint per runtime profile
+
+For each profile a fresh interpreter builds the agent (without starting it
+or touching the network), reports RSS after imports, then runs collection
+cycles (high-frequency samples plus one monitoring payload per cycle) and
+tracks steady-state RSS and traced allocations. A positive growth slope over
+the second half of the run points at a leak.
+
+Usage:
+    python benchmarks/bench_memory.py [cycles] [samples_per_cycle]
+"""
+import os
+import sys
+import json
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def rss_kb():
+    """Return the resident set size of this process in KB"""
+    with open('/proc/self/status') as f:
+        for line in f:
+            if line.startswith('VmRSS:'):
+                return int(line.split()[1])
+    return 0
+
+
+def slope(values):
+    """Return the least-squares slope of values per step"""
+    n = len(values)
+    if n < 2:
+        return 0.0
+    mean_x = (n - 1) / 2
+    mean_y = sum(values) / n
+    num = sum((x - mean_x) * (y - mean_y) for x, y in enumerate(values))
+    den = sum((x - mean_x) ** 2 for x in range(n))
+    return num / den
+
+
+def child(profile, cycles, samples):
+    """Measure one profile inside a fresh interpreter"""
+    import logging
+    import tracemalloc
+    sys.path.insert(0, ROOT)
+    logging.disable(logging.CRITICAL)
+
+    from agent.config import Config
+    from agent.agent import Agent
+
+    config = Config()
+    config.server_url = 'http://127.0.0.1:9'
+    config.vm_id = 'bench'
+    config.agent_token = 'bench'
+    config.profile = profile
+    config.cgroup_enabled = False
+    config._apply_profile()
+
+    agent = Agent(config)
+    import_rss = rss_kb()
+
+    tracemalloc.start()
+    rss, traced = [], []
+    for _ in range(cycles):
+        for _ in range(samples):
+            agent.sample_collectors()
+        payload = {name: collector.collect() for name, collector in agent.collectors.items()
+                   if name != 'cpu'}
+        payload['distributions'] = {name: collector.flush_distributions()
+                                    for name, collector in agent.collectors.items()}
+        json.dumps(payload)
+        rss.append(rss_kb())
+        traced.append(tracemalloc.get_traced_memory()[0] / 1024)
+
+    half = cycles // 2
+    print(json.dumps({
+        'importRssKb': import_rss,
+        'steadyRssKb': rss[-1],
+        'peakTracedKb': tracemalloc.get_traced_memory()[1] / 1024,
+        'rssSlopeKbPerCycle': slope(rss[half:]),
+        'tracedSlopeKbPerCycle': slope(traced[half:]),
+        'modules': len(sys.modules)
+    }))
+
+
+def main():
+    if len(sys.argv) > 1 and sys.argv[1] == '--child':
+        child(sys.argv[2], int(sys.argv[3]), int(sys.argv[4]))
+        return
+
+    cycles = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    samples = int(sys.argv[2]) if len(sys.argv) > 2 else 60
+
+    print(f"cycles: {cycles}, samples per cycle: {samples}")
+    print(f"{'profile':10} {'import RSS':>12} {'steady RSS':>12} {'peak traced':>12} "
+          f"{'RSS slope':>14} {'traced slope':>14} {'modules':>8}")
+    for profile in ('standard', 'low'):
+        output = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), '--child', profile, str(cycles), str(samples)],
+            check=True, capture_output=True, text=True
+        ).stdout
+        r = json.loads(output.strip().splitlines()[-1])
+        print(f"{profile:10} {r['importRssKb']:>9} KB {r['steadyRssKb']:>9} KB "
+              f"{r['peakTracedKb']:>9.0f} KB {r['rssSlopeKbPerCycle']:>8.2f} KB/c "
+              f"{r['tracedSlopeKbPerCycle']:>8.3f} KB/c {r['modules']:>8}")
+
+
+if __name__ == "__main__":
+    main()
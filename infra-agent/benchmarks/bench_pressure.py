@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Fixture checks and cost of the pressure collector
+
+Builds fixture procfs trees (a kernel with PSI, an older kernel whose cpu
+pressure file has no 'full' line, and a kernel without PSI), advances their
+counters between two collections and checks the reported averages, stall
+times and rates. Then times collect() and sample() against the real /proc
+(or the fixture tree where /proc has no PSI) and counts the memory blocks a
+sample allocates.
+
+Usage:
+    python benchmarks/bench_pressure.py [iterations]
+"""
+import os
+import sys
+import time
+import logging
+import tempfile
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agent.collectors.pressure import PressureCollector
+
+PSI = "some avg10={some:.2f} avg60=1.50 avg300=0.75 total={some_total}\n" \
+      "full avg10={full:.2f} avg60=0.50 avg300=0.25 total={full_total}\n"
+
+VMSTAT = "nr_free_pages 123456\nnr_zone_inactive_anon 42\npswpin {swapin}\npswpout {swapout}\n" \
+         "pgpgin 1000\npgmajfault {majfault}\npgfault 999999\n"
+
+failures = []
+
+
+def write(path, text):
+    """Write a fixture file, creating its directory"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w') as f:
+        f.write(text)
+
+
+def build(root, step, psi=True, cpu_full=True):
+    """Write the fixture tree for a step of the counters"""
+    if psi:
+        for resource in ('cpu', 'memory', 'io'):
+            text = PSI.format(some=2.5 * step, full=1.25 * step,
+                              some_total=500000 * step, full_total=250000 * step)
+            if resource == 'cpu' and not cpu_full:
+                text = text.splitlines(keepends=True)[0]
+            write(os.path.join(root, 'pressure', resource), text)
+    write(os.path.join(root, 'vmstat'), VMSTAT.format(swapin=100 * step, swapout=50 * step, majfault=20 * step))
+    write(os.path.join(root, 'loadavg'), f"{1.5 * step:.2f} 0.80 0.40 {3 * step}/412 12345\n")
+
+
+def check(label, condition):
+    """Record a failed expectation"""
+    if not condition:
+        failures.append(label)
+
+
+def run_fixture(label, psi=True, cpu_full=True):
+    """Collect twice over a fixture tree one second apart"""
+    root = tempfile.mkdtemp()
+    build(root, 1, psi, cpu_full)
+    collector = PressureCollector(root)
+    collector.collect()
+    time.sleep(1.0)
+    build(root, 2, psi, cpu_full)
+    data = collector.collect()
+    collector.close()
+    print(f"{label}: {data}")
+    return data
+
+
+def fixture_checks():
+    """Check parsing and deltas on the fixture trees"""
+    data = run_fixture('psi')
+    memory = data['psi']['memory']
+    check('some avg10', memory['some']['avg10'] == 5.0)
+    check('full avg300', memory['full']['avg300'] == 0.25)
+    # 500 ms of some-stall and 250 ms of full-stall within about one second
+    check('some stallMs', memory['some']['stallMs'] == 500.0)
+    check('full stallMs', memory['full']['stallMs'] == 250.0)
+    check('some stallPercent', 45 <= memory['some']['stallPercent'] <= 51)
+    check('swap in rate', 90 <= data['swapInPagesPerSec'] <= 101)
+    check('major fault rate', 18 <= data['majorFaultsPerSec'] <= 21)
+    check('runnable', data['runnable'] == 6 and data['threads'] == 412)
+    check('load1', data['load1'] == 3.0)
+
+    data = run_fixture('old kernel', cpu_full=False)
+    check('cpu full missing', data['psi']['cpu']['full'] is None)
+    check('memory full present', data['psi']['memory']['full'] is not None)
+
+    data = run_fixture('no psi', psi=False)
+    check('psi none', data['psi'] is None)
+    check('saturation without psi', 90 <= data['swapInPagesPerSec'] <= 101)
+
+
+def timing(iterations):
+    """Time collection and sampling, and count sample allocations"""
+    root = '/proc'
+    if not os.path.exists('/proc/pressure/cpu'):
+        root = tempfile.mkdtemp()
+        build(root, 1)
+    collector = PressureCollector(root)
+    collector.collect()
+    collector.sample()
+
+    started = time.perf_counter()
+    for _ in range(iterations):
+        collector.collect()
+    collect_us = (time.perf_counter() - started) / iterations * 1e6
+
+    started = time.perf_counter()
+    for _ in range(iterations):
+        collector.sample()
+    sample_us = (time.perf_counter() - started) / iterations * 1e6
+
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    for _ in range(100):
+        collector._sample_impl()
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    live = sum(stat.count_diff for stat in after.compare_to(before, 'filename') if stat.count_diff > 0)
+    collector.close()
+
+    print(f"proc root: {root}, iterations: {iterations}")
+    print(f"collect(): {collect_us:.1f} us, sample(): {sample_us:.1f} us")
+    print(f"memory blocks still held after 100 samples: {live}")
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    logging.disable(logging.CRITICAL)
+
+    fixture_checks()
+    timing(iterations)
+
+    if failures:
+        print(f"FAIL: {', '.join(failures)}")
+        sys.exit(1)
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
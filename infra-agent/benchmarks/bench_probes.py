@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Benchmark of a probe cycle against local services
+
+Starts a keep-alive HTTP server, a TCP listener, a Unix socket echo
+server and a server that accepts but never answers, then runs cycles of
+100 probes (including probes that time out and ones that are refused)
+through ProbeCollector. Every cycle must finish within a fixed budget: the
+longest probe timeout plus a small allowance, not the sum of the timeouts.
+Also reports how many HTTP connections the server accepted, showing that
+keep-alive connections are reused across cycles.
+
+Usage:
+    python benchmarks/bench_probes.py [cycles] [concurrency]
+"""
+import os
+import sys
+import time
+import socket
+import asyncio
+import logging
+import tempfile
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agent.collectors.probes import Probe, ProbeCollector
+
+PROBES = 100
+SLOW_TIMEOUT = 0.5
+BUDGET = SLOW_TIMEOUT + 0.5
+
+http_connections = 0
+
+
+async def handle_http(reader, writer):
+    """Answer HTTP requests on a keep-alive connection"""
+    global http_connections
+    http_connections += 1
+    try:
+        while True:
+            request = await reader.readuntil(b'\r\n\r\n')
+            path = request.split(b' ', 2)[1]
+            status = b'503 Service Unavailable' if path == b'/down' else b'200 OK'
+            # Some work on the service side
+            await asyncio.sleep(0.005)
+            writer.write(b'HTTP/1.1 ' + status + b'\r\nContent-Length: 2\r\n\r\nok')
+            await writer.drain()
+    except (asyncio.IncompleteReadError, ConnectionError):
+        pass
+    finally:
+        writer.close()
+
+
+async def handle_silent(reader, writer):
+    """Accept and never answer (also the target of the TCP probes)"""
+    await reader.read()
+    writer.close()
+
+
+async def handle_echo(reader, writer):
+    """Echo until the client closes"""
+    while True:
+        data = await reader.read(4096)
+        if not data:
+            break
+        writer.write(data)
+    writer.close()
+
+
+def start_servers(socket_path):
+    """Run the test services on a background event loop"""
+    loop = asyncio.new_event_loop()
+    ports = {}
+
+    async def setup():
+        http = await asyncio.start_server(handle_http, '127.0.0.1', 0, backlog=512)
+        silent = await asyncio.start_server(handle_silent, '127.0.0.1', 0, backlog=512)
+        await asyncio.start_unix_server(handle_echo, socket_path)
+        ports['http'] = http.sockets[0].getsockname()[1]
+        ports['silent'] = silent.sockets[0].getsockname()[1]
+
+    loop.run_until_complete(setup())
+    threading.Thread(target=loop.run_forever, daemon=True).start()
+    return ports
+
+
+def free_port():
+    """Return a local port nothing listens on"""
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def build_probes(ports, socket_path):
+    """Build 100 probes over the test services"""
+    http = f"http://127.0.0.1:{ports['http']}"
+    probes = []
+    for i in range(PROBES):
+        kind = i % 10
+        if kind < 5:
+            probes.append(Probe(f"http-{i}", 'http', f"{http}/health/{i}", timeout=1.0))
+        elif kind == 5:
+            probes.append(Probe(f"http-down-{i}", 'http', f"{http}/down", timeout=1.0))
+        elif kind == 6:
+            probes.append(Probe(f"tcp-{i}", 'tcp', f"127.0.0.1:{ports['silent']}", timeout=1.0))
+        elif kind == 7:
+            probes.append(Probe(f"unix-{i}", 'unix', socket_path, timeout=1.0, send=b'ping', expect=b'ping'))
+        elif kind == 8:
+            probes.append(Probe(f"slow-{i}", 'http', f"http://127.0.0.1:{ports['silent']}/", timeout=SLOW_TIMEOUT))
+        else:
+            probes.append(Probe(f"refused-{i}", 'tcp', f"127.0.0.1:{free_port()}", timeout=1.0))
+    return probes
+
+
+def main():
+    cycles = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    concurrency = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    logging.disable(logging.CRITICAL)
+
+    socket_path = os.path.join(tempfile.mkdtemp(), 'echo.sock')
+    ports = start_servers(socket_path)
+    collector = ProbeCollector(build_probes(ports, socket_path), concurrency=concurrency)
+
+    durations = []
+    for _ in range(cycles):
+        started = time.perf_counter()
+        results = collector.run_probes()
+        durations.append(time.perf_counter() - started)
+
+    up = sum(1 for result in results if result['up'])
+    distributions = collector.flush_distributions()
+    latencies = sorted(summary['p50'] for name, summary in distributions.items() if name.startswith('http-') and 'down' not in name)
+    durations.sort()
+    worst = durations[-1]
+    collector.close()
+
+    print(f"probes: {PROBES}, cycles: {cycles}, concurrency: {concurrency}, budget: {BUDGET * 1000:.0f} ms")
+    print(f"cycle time: p50 {durations[len(durations) // 2] * 1000:.1f} ms, max {worst * 1000:.1f} ms")
+    print(f"probes up in last cycle: {up}/{PROBES} (expected {PROBES - 3 * PROBES // 10})")
+    print(f"healthy HTTP probe p50 latency: median {latencies[len(latencies) // 2]:.2f} ms")
+    print(f"HTTP connections accepted: {http_connections} for {cycles * PROBES * 6 // 10} requests")
+    if worst > BUDGET:
+        print("FAIL: a cycle exceeded the budget")
+        sys.exit(1)
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Benchmark of shared-memory sample reads
+
+Measures SampleReader latency on an idle file and while a writer process
+publishes as fast as it can (the worst case for seqlock retries), and
+checks every read for torn data: the writer stores the same counter in all
+fields, so a consistent read has identical values.
+
+Usage:
+    python benchmarks/bench_sample_export.py [reads]
+"""
+import os
+import sys
+import time
+import tempfile
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from agent.sample_export import SampleExporter, SampleReader, EXPORT_FIELDS
+
+
+def writer(path, seconds):
+    """Publish continuously for a number of seconds"""
+    exporter = SampleExporter(path)
+    # Readers start once a full sample is in place, not on the initial NaNs
+    for name in EXPORT_FIELDS:
+        exporter.set(name, 0.0)
+    exporter.publish()
+    print('ready', flush=True)
+    deadline = time.monotonic() + seconds
+    count = 0
+    while time.monotonic() < deadline:
+        count += 1
+        for name in EXPORT_FIELDS:
+            exporter.set(name, float(count))
+        exporter.publish()
+    exporter.close()
+
+
+def measure(reader, reads):
+    """Time reads and count torn or failed ones"""
+    timings = []
+    torn = failed = 0
+    clock = time.perf_counter_ns
+    for _ in range(reads):
+        started = clock()
+        result = reader.read_values()
+        timings.append(clock() - started)
+        if result is None:
+            failed += 1
+        elif result[0] == 0.0:
+            # Nothing published yet; NaN never compares equal to itself
+            continue
+        elif len(set(result[1])) > 1:
+            torn += 1
+    timings.sort()
+    return timings, torn, failed
+
+
+def report(label, timings, torn, failed):
+    """Print latency percentiles of one run"""
+    n = len(timings)
+    print(f"{label:18} p50 {timings[n // 2]:>6} ns  p99 {timings[int(n * 0.99)]:>7} ns  "
+          f"max {timings[-1]:>9} ns  torn {torn}  failed {failed}")
+
+
+def main():
+    if len(sys.argv) > 1 and sys.argv[1] == '--writer':
+        writer(sys.argv[2], float(sys.argv[3]))
+        return
+
+    reads = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    path = os.path.join(tempfile.mkdtemp(dir='/dev/shm' if os.path.isdir('/dev/shm') else None), 'sample')
+
+    exporter = SampleExporter(path)
+    for name in EXPORT_FIELDS:
+        exporter.set(name, 1.0)
+    exporter.publish()
+    reader = SampleReader(path)
+    print(f"reads: {reads}, fields: {len(reader.fields)}")
+    report('idle writer', *measure(reader, reads))
+    exporter.close()
+    reader.close()
+
+    proc = subprocess.Popen([sys.executable, os.path.abspath(__file__), '--writer', path, '60'],
+                            stdout=subprocess.PIPE, text=True)
+    proc.stdout.readline()
+    reader = SampleReader(path)
+    timings, torn, failed = measure(reader, reads)
+    report('busy writer', timings, torn, failed)
+    proc.terminate()
+    proc.wait()
+    reader.close()
+
+    if torn:
+        print("FAIL: torn reads")
+        sys.exit(1)
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
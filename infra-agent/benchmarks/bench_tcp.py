@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""
+Fixture checks and cost of the TCP stack collector
+
+Checks rates and counts on a fixture procfs tree (including a kernel without
+some TcpExt columns and without nf_conntrack), then times collect() against
+the real /proc with few and with many open loopback connections. The
+collector reads aggregate counters only, so its cost should not grow with
+the connection count; psutil.net_connections(), which enumerates every
+socket, is timed alongside for comparison.
+
+Usage:
+    python benchmarks/bench_tcp.py [connections]
+"""
+import os
+import sys
+import time
+import socket
+import logging
+import resource
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import psutil
+from agent.collectors.tcp import TcpCollector
+
+SNMP = """Ip: Forwarding DefaultTTL InReceives
+Ip: 1 64 1000
+Tcp: RtoAlgorithm RtoMin RtoMax MaxConn ActiveOpens PassiveOpens AttemptFails EstabResets CurrEstab InSegs OutSegs RetransSegs InErrs OutRsts InCsumErrors
+Tcp: 1 200 120000 -1 {opens} 20 3 4 {estab} 5000 {out} {retrans} 0 {rsts} 0
+Udp: InDatagrams NoPorts InErrors OutDatagrams RcvbufErrors SndbufErrors InCsumErrors IgnoredMulti
+Udp: 10 0 0 10 {rcvbuf} 0 0 0
+"""
+
+NETSTAT = """TcpExt: SyncookiesSent SyncookiesRecv ListenOverflows ListenDrops TCPTimeouts{reqq_header}
+TcpExt: {cookies} 0 {overflows} {drops} 7{reqq}
+IpExt: InNoRoutes InTruncatedPkts
+IpExt: 0 0
+"""
+
+SOCKSTAT = """sockets: used 321
+TCP: inuse 120 orphan 2 tw {tw} alloc 130 mem 9
+UDP: inuse 3 mem 1
+"""
+
+failures = []
+
+
+def write(path, text):
+    """Write a fixture file, creating its directory"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w') as f:
+        f.write(text)
+
+
+def build(root, step, reqq=True, conntrack=True):
+    """Write the fixture tree for a step of the counters"""
+    write(os.path.join(root, 'net', 'snmp'), SNMP.format(
+        opens=100 * step, estab=50 + step, out=10000 * step, retrans=100 * step, rsts=5 * step, rcvbuf=step))
+    write(os.path.join(root, 'net', 'netstat'), NETSTAT.format(
+        cookies=2 * step, overflows=30 * step, drops=40 * step,
+        reqq_header=' TCPReqQFullDrop' if reqq else '', reqq=f' {10 * step}' if reqq else ''))
+    write(os.path.join(root, 'net', 'sockstat'), SOCKSTAT.format(tw=1000 * step))
+    write(os.path.join(root, 'net', 'sockstat6'), "TCP6: inuse 15\nUDP6: inuse 0\n")
+    if conntrack:
+        write(os.path.join(root, 'sys', 'net', 'netfilter', 'nf_conntrack_count'), f"{6000 * step}\n")
+        write(os.path.join(root, 'sys', 'net', 'netfilter', 'nf_conntrack_max'), "65536\n")
+
+
+def check(label, condition):
+    """Record a failed expectation"""
+    if not condition:
+        failures.append(label)
+
+
+def run_fixture(label, **kwargs):
+    """Collect twice over a fixture tree one second apart"""
+    root = tempfile.mkdtemp()
+    build(root, 1, **kwargs)
+    collector = TcpCollector(root)
+    collector.collect()
+    time.sleep(1.0)
+    build(root, 2, **kwargs)
+    data = collector.collect()
+    collector.close()
+    print(f"{label}: {data}")
+    return data
+
+
+def fixture_checks():
+    """Check parsing and rates on the fixture trees"""
+    data = run_fixture('full kernel')
+    check('retransmits/s', 99 <= data['retransmitsPerSec'] <= 100)
+    check('retransmit percent', 0.99 <= data['retransmitPercent'] <= 1.01)
+    check('listen overflows/s', 29 <= data['listenOverflowsPerSec'] <= 30)
+    check('listen drops/s', 39 <= data['listenDropsPerSec'] <= 40)
+    check('SYN drops/s', 9 <= data['synDropsPerSec'] <= 10)
+    check('established', data['established'] == 52)
+    check('TIME_WAIT', data['timeWait'] == 2000)
+    check('in use incl. IPv6', data['inUse'] == 135)
+    check('conntrack', data['conntrack'] == {'count': 12000, 'max': 65536, 'usagePercent': 18.31})
+
+    data = run_fixture('older kernel', reqq=False, conntrack=False)
+    check('missing column is null', data['synDropsPerSec'] is None)
+    check('other columns still read', 39 <= data['listenDropsPerSec'] <= 40)
+    check('no conntrack', data['conntrack'] is None)
+
+
+def open_connections(count):
+    """Open loopback connection pairs; returns the sockets to keep them alive"""
+    server = socket.socket()
+    server.bind(('127.0.0.1', 0))
+    server.listen(1024)
+    sockets = [server]
+    for _ in range(count):
+        client = socket.create_connection(server.getsockname())
+        accepted, _ = server.accept()
+        sockets.extend((client, accepted))
+    return sockets
+
+
+def time_call(func, repeat):
+    """Return the mean duration of a call in milliseconds"""
+    started = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - started) / repeat * 1000
+
+
+def scaling(connections):
+    """Time collection with few and with many open connections"""
+    collector = TcpCollector()
+    collector.collect()
+
+    def enumerate_sockets():
+        psutil.net_connections('tcp')
+
+    print(f"{'connections':>12} {'collect() ms':>14} {'net_connections() ms':>22}")
+    results = []
+    sockets = []
+    for count in (0, connections):
+        sockets.extend(open_connections(count - len(sockets) // 2) if count else [])
+        established = collector.collect()['established']
+        collect_ms = time_call(collector.collect, 200)
+        enumerate_ms = time_call(enumerate_sockets, 3)
+        results.append(collect_ms)
+        print(f"{established:>12} {collect_ms:>14.3f} {enumerate_ms:>22.1f}")
+
+    for s in sockets:
+        s.close()
+    collector.close()
+    # Flat cost: allow for noise, not for growth with the connection count
+    check('flat collection cost', results[1] < results[0] * 3 + 0.2)
+
+
+def main():
+    connections = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    logging.disable(logging.CRITICAL)
+
+    # Each connection needs two descriptors in this process
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft < connections * 2 + 100:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (min(hard, connections * 2 + 100), hard))
+        connections = min(connections, (min(hard, connections * 2 + 100) - 100) // 2)
+
+    fixture_checks()
+    scaling(connections)
+
+    if failures:
+        print(f"FAIL: {', '.join(failures)}")
+        sys.exit(1)
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
@@ -5,6 +5,7 @@ Infrawatch Agent - Entry point
 import os
 import sys
 import signal
+import atexit
 import logging
 from agent.config import Config
 from agent.agent import Agent
@@ -31,7 +32,19 @@ def main():
     
     # Setup logging
     log_level = getattr(logging, config.log_level.upper(), logging.INFO)
-    setup_logging(log_level, config.log_file)
+    log_listener = setup_logging(
+        log_level,
+        config.log_file,
+        max_bytes=config.log_max_bytes,
+        backup_count=config.log_backup_count,
+        rotate_interval=config.log_rotate_interval,
+        compress=config.log_compress,
+        rate_limit_interval=config.log_rate_limit_interval,
+        rate_limit_burst=config.log_rate_limit_burst,
+        queue_size=config.log_queue_size
+    )
+    # Flush queued records on exit
+    atexit.register(log_listener.stop)
     
     logging.info("Starting Infrawatch Agent...")
     logging.info(f"Agent configured for VM ID: {config.vm_id}")
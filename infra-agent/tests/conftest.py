@@ -0,0 +1,29 @@
+"""
+Shared fixtures for the agent tests
+"""
+import types
+
+import pytest
+
+
+class Clock:
+    """Stand-in for the time module with settable time() and monotonic()"""
+
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def time(self):
+        return self.now
+
+    def monotonic(self):
+        return self.now
+
+
+@pytest.fixture
+def patch_clock(monkeypatch):
+    """Return a function replacing a module's time with a Clock it returns"""
+    def patch(module, now=1000.0):
+        fake = Clock(now)
+        monkeypatch.setattr(module, 'time', types.SimpleNamespace(time=fake.time, monotonic=fake.monotonic))
+        return fake
+    return patch
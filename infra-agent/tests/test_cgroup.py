@@ -0,0 +1,214 @@
+"""
+Tests for the cgroup v2 collector over fake cgroupfs trees
+"""
+import shutil
+
+import pytest
+
+from agent.collectors import cgroup
+from agent.collectors.cgroup import CgroupCollector
+
+MB = 1024 * 1024
+
+
+@pytest.fixture
+def clock(patch_clock):
+    return patch_clock(cgroup)
+
+
+@pytest.fixture
+def root(tmp_path):
+    (tmp_path / 'cgroup.controllers').write_text('cpu io memory\n')
+    return tmp_path
+
+
+def make_cgroup(root, rel, usage_usec=0, throttled_usec=0, nr_throttled=0, rbytes=None, wbytes=0,
+                memory_current=None, memory_max=None):
+    """Create or update a cgroup directory; controllers left as None get no file"""
+    path = root / rel
+    path.mkdir(parents=True, exist_ok=True)
+    (path / 'cpu.stat').write_text(
+        f"usage_usec {usage_usec}\nuser_usec {usage_usec}\nsystem_usec 0\n"
+        f"nr_periods 10\nnr_throttled {nr_throttled}\nthrottled_usec {throttled_usec}\n"
+    )
+    if rbytes is not None:
+        (path / 'io.stat').write_text(f"8:0 rbytes={rbytes} wbytes={wbytes} rios=1 wios=1 dbytes=0 dios=0\n")
+    if memory_current is not None:
+        (path / 'memory.current').write_text(f"{memory_current}\n")
+    if memory_max is not None:
+        (path / 'memory.max').write_text(f"{memory_max}\n")
+    return path
+
+
+def by_path(rows):
+    return {row['path']: row for row in rows}
+
+
+def test_no_cgroup_v2(tmp_path):
+    # A v1 or missing hierarchy has no cgroup.controllers at its root
+    (tmp_path / 'cpu').mkdir()
+    assert CgroupCollector(str(tmp_path)).collect() is None
+    assert CgroupCollector(str(tmp_path / 'missing')).collect() is None
+
+
+def test_discovery_reports_leaves_only(root, clock):
+    make_cgroup(root, 'system.slice', usage_usec=0)
+    make_cgroup(root, 'system.slice/nginx.service', usage_usec=0)
+    make_cgroup(root, 'system.slice/sshd.service', usage_usec=0)
+    make_cgroup(root, 'user.slice', usage_usec=0)
+
+    collector = CgroupCollector(str(root))
+    first = collector.collect()
+    assert sorted(row['path'] for row in first) == [
+        '/system.slice/nginx.service', '/system.slice/sshd.service', '/user.slice'
+    ]
+    # The first collection only primes the counters
+    assert all(row['cpuPercent'] == 0.0 for row in first)
+
+    # The slice includes its services' usage; ranking it too would count it twice
+    make_cgroup(root, 'system.slice', usage_usec=1500000)
+    make_cgroup(root, 'system.slice/nginx.service', usage_usec=1000000)
+    make_cgroup(root, 'system.slice/sshd.service', usage_usec=500000)
+    clock.now += 10
+    rows = by_path(collector.collect())
+    assert '/system.slice' not in rows
+    assert rows['/system.slice/nginx.service']['cpuPercent'] == 10.0
+    assert rows['/system.slice/sshd.service']['cpuPercent'] == 5.0
+
+
+def test_max_depth_cgroup_counts_as_leaf(root, clock):
+    make_cgroup(root, 'a')
+    make_cgroup(root, 'a/b')
+    make_cgroup(root, 'a/b/c')
+
+    rows = CgroupCollector(str(root), max_depth=2).collect()
+    assert [row['path'] for row in rows] == ['/a/b']
+
+
+def test_top_n_ranking(root, clock):
+    for name in ('a', 'b', 'c'):
+        make_cgroup(root, name)
+    collector = CgroupCollector(str(root), top_n=2)
+    collector.collect()
+
+    make_cgroup(root, 'a', usage_usec=100000)
+    make_cgroup(root, 'b', usage_usec=300000)
+    make_cgroup(root, 'c', usage_usec=200000)
+    clock.now += 1
+    assert [row['path'] for row in collector.collect()] == ['/b', '/c']
+
+
+def test_hierarchy_is_cached_until_it_changes(root, clock, monkeypatch):
+    make_cgroup(root, 'a')
+    collector = CgroupCollector(str(root))
+    walks = []
+    walk = collector._walk
+    monkeypatch.setattr(collector, '_walk', lambda: (walks.append(1), walk()))
+
+    collector.collect()
+    collector.collect()
+    assert len(walks) == 1
+
+    make_cgroup(root, 'b')
+    rows = collector.collect()
+    assert len(walks) == 2
+    assert sorted(row['path'] for row in rows) == ['/a', '/b']
+
+
+def test_cgroup_removed_between_samples(root, clock):
+    make_cgroup(root, 'a', usage_usec=0)
+    make_cgroup(root, 'b', usage_usec=0)
+    collector = CgroupCollector(str(root))
+    collector.collect()
+    assert str(root / 'b') in collector.prev
+
+    shutil.rmtree(root / 'b')
+    clock.now += 1
+    rows = collector.collect()
+    assert [row['path'] for row in rows] == ['/a']
+    assert str(root / 'b') not in collector.prev
+
+
+def test_cgroup_vanishing_mid_collection_is_skipped(root, clock, monkeypatch):
+    make_cgroup(root, 'a')
+    make_cgroup(root, 'b')
+    collector = CgroupCollector(str(root))
+    collector.collect()
+
+    # Control files gone but the directory cache not yet refreshed
+    (root / 'b' / 'cpu.stat').unlink()
+    monkeypatch.setattr(collector, '_hierarchy_changed', lambda: False)
+    collector.cgroups.append(str(root / 'gone'))
+    rows = collector.collect()
+    assert [row['path'] for row in rows] == ['/a']
+
+
+def test_counter_deltas(root, clock):
+    make_cgroup(root, 'app', usage_usec=0, throttled_usec=0, nr_throttled=0, rbytes=0, wbytes=0,
+                memory_current=512 * MB, memory_max=1024 * MB)
+    collector = CgroupCollector(str(root))
+    collector.collect()
+
+    make_cgroup(root, 'app', usage_usec=2000000, throttled_usec=400000, nr_throttled=7,
+                rbytes=4 * MB, wbytes=2 * MB, memory_current=600 * MB, memory_max=1024 * MB)
+    clock.now += 4
+    row = collector.collect()[0]
+    assert row['cpuPercent'] == 50.0
+    assert row['throttledPercent'] == 10.0
+    assert row['nrThrottled'] == 7
+    assert row['ioReadBytesPerSec'] == MB
+    assert row['ioWriteBytesPerSec'] == MB / 2
+    assert row['memoryCurrentMB'] == 600.0
+    assert row['memoryMaxMB'] == 1024.0
+
+
+def test_counter_reset_is_clamped(root, clock):
+    # A cgroup recreated under the same path starts its counters from zero
+    make_cgroup(root, 'app', usage_usec=9000000, throttled_usec=5000, nr_throttled=50, rbytes=10 * MB)
+    collector = CgroupCollector(str(root))
+    collector.collect()
+
+    make_cgroup(root, 'app', usage_usec=1000, throttled_usec=0, nr_throttled=0, rbytes=0)
+    clock.now += 1
+    row = collector.collect()[0]
+    assert row['cpuPercent'] == 0.0
+    assert row['throttledPercent'] == 0.0
+    assert row['nrThrottled'] == 0
+    assert row['ioReadBytesPerSec'] == 0.0
+
+    # Rates resume from the new baseline
+    make_cgroup(root, 'app', usage_usec=101000, rbytes=MB)
+    clock.now += 1
+    row = collector.collect()[0]
+    assert row['cpuPercent'] == 10.0
+    assert row['ioReadBytesPerSec'] == MB
+
+
+def test_missing_controllers(root, clock):
+    # Only the cpu controller is enabled: no io.stat, memory.current or memory.max
+    make_cgroup(root, 'app', usage_usec=0)
+    collector = CgroupCollector(str(root))
+    collector.collect()
+
+    make_cgroup(root, 'app', usage_usec=100000)
+    clock.now += 1
+    row = collector.collect()[0]
+    assert row['cpuPercent'] == 10.0
+    assert row['memoryCurrentMB'] == 0.0
+    assert row['memoryMaxMB'] is None
+    assert row['ioReadBytesPerSec'] == 0.0
+    assert row['ioWriteBytesPerSec'] == 0.0
+
+
+def test_cgroup_without_cpu_stat_is_skipped(root, clock):
+    make_cgroup(root, 'app')
+    (root / 'nocpu').mkdir()
+    rows = CgroupCollector(str(root)).collect()
+    assert [row['path'] for row in rows] == ['/app']
+
+
+def test_unlimited_memory_max(root, clock):
+    make_cgroup(root, 'app', memory_current=MB, memory_max='max')
+    row = CgroupCollector(str(root)).collect()[0]
+    assert row['memoryMaxMB'] is None
+    assert row['memoryCurrentMB'] == 1.0
@@ -0,0 +1,167 @@
+"""
+Tests for the pressure-stall (PSI) and saturation collector over fixture procfs trees
+"""
+import pytest
+
+from agent.collectors import pressure
+from agent.collectors.pressure import PressureCollector
+
+PSI = "some avg10={some10:.2f} avg60=1.50 avg300=0.75 total={some_total}\n" \
+      "full avg10=0.50 avg60=0.25 avg300=0.10 total={full_total}\n"
+
+VMSTAT = "nr_free_pages 123456\npswpin {swapin}\npswpout {swapout}\npgpgin 1000\n" \
+         "pgmajfault {majfault}\npgfault 999999\n"
+
+
+@pytest.fixture
+def clock(patch_clock):
+    return patch_clock(pressure)
+
+
+@pytest.fixture
+def cpus(monkeypatch):
+    monkeypatch.setattr(pressure.os, 'cpu_count', lambda: 4)
+
+
+def write_psi(root, resource, some_total, full_total=None, some10=2.5):
+    """Write a pressure file; full_total None leaves out the 'full' line"""
+    text = PSI.format(some10=some10, some_total=some_total, full_total=full_total or 0)
+    if full_total is None:
+        text = text.splitlines(keepends=True)[0]
+    (root / 'pressure').mkdir(exist_ok=True)
+    (root / 'pressure' / resource).write_text(text)
+
+
+def write_saturation(root, swapin=0, swapout=0, majfault=0, loadavg="0.50 0.40 0.30 3/412 12345"):
+    (root / 'vmstat').write_text(VMSTAT.format(swapin=swapin, swapout=swapout, majfault=majfault))
+    (root / 'loadavg').write_text(loadavg + "\n")
+
+
+def write_tree(root, step, cpu_full=True):
+    """Write every fixture file for one step of the counters"""
+    for resource in ('cpu', 'memory', 'io'):
+        full = 250000 * step if resource != 'cpu' or cpu_full else None
+        write_psi(root, resource, 500000 * step, full)
+    write_saturation(root, swapin=100 * step, swapout=50 * step, majfault=20 * step)
+
+
+def test_psi_parsing(tmp_path, clock, cpus):
+    write_tree(tmp_path, 1)
+    collector = PressureCollector(str(tmp_path))
+    first = collector.collect()
+    memory = first['psi']['memory']
+    assert memory['some']['avg10'] == 2.5
+    assert memory['some']['avg60'] == 1.5
+    assert memory['some']['avg300'] == 0.75
+    assert memory['full']['avg10'] == 0.5
+    # The first collection only primes the stall totals
+    assert memory['some']['stallMs'] == 0.0
+    assert memory['some']['stallPercent'] == 0.0
+
+    write_tree(tmp_path, 2)
+    clock.now += 1
+    data = collector.collect()
+    for resource in ('cpu', 'memory', 'io'):
+        psi = data['psi'][resource]
+        # 500 ms of some-stall and 250 ms of full-stall within one second
+        assert psi['some']['stallMs'] == 500.0
+        assert psi['some']['stallPercent'] == 50.0
+        assert psi['full']['stallMs'] == 250.0
+        assert psi['full']['stallPercent'] == 25.0
+    collector.close()
+
+
+def test_cpu_without_full_line(tmp_path, clock, cpus):
+    # Kernels before 5.13 have no 'full' line for cpu
+    write_tree(tmp_path, 1, cpu_full=False)
+    collector = PressureCollector(str(tmp_path))
+    collector.collect()
+    write_tree(tmp_path, 2, cpu_full=False)
+    clock.now += 1
+    data = collector.collect()
+    assert data['psi']['cpu']['full'] is None
+    assert data['psi']['cpu']['some']['stallPercent'] == 50.0
+    assert data['psi']['memory']['full']['stallMs'] == 250.0
+
+
+def test_stall_counter_reset_is_clamped(tmp_path, clock, cpus):
+    write_tree(tmp_path, 5)
+    collector = PressureCollector(str(tmp_path))
+    collector.collect()
+    write_tree(tmp_path, 1)
+    clock.now += 1
+    data = collector.collect()
+    assert data['psi']['io']['some']['stallMs'] == 0.0
+    assert data['swapInPagesPerSec'] == 0.0
+
+
+def test_stall_percent_is_capped(tmp_path, clock, cpus):
+    write_tree(tmp_path, 1)
+    collector = PressureCollector(str(tmp_path))
+    collector.collect()
+    # More stall than wall time, e.g. after a suspended VM resumes
+    write_tree(tmp_path, 10)
+    clock.now += 1
+    assert collector.collect()['psi']['memory']['some']['stallPercent'] == 100.0
+
+
+def test_without_psi(tmp_path, clock, cpus):
+    # No /proc/pressure: saturation metrics are still reported
+    write_saturation(tmp_path, swapin=0, majfault=0)
+    collector = PressureCollector(str(tmp_path))
+    first = collector.collect()
+    assert first['psi'] is None
+    assert collector.psi_available is False
+
+    write_saturation(tmp_path, swapin=300, majfault=60)
+    clock.now += 2
+    data = collector.collect()
+    assert data['psi'] is None
+    assert data['swapInPagesPerSec'] == 150.0
+    assert data['majorFaultsPerSec'] == 30.0
+    assert collector.sample() is None
+
+
+def test_without_procfs(tmp_path, clock):
+    assert PressureCollector(str(tmp_path / 'missing')).collect() is None
+
+
+def test_saturation(tmp_path, clock, cpus):
+    write_tree(tmp_path, 1)
+    collector = PressureCollector(str(tmp_path))
+    first = collector.collect()
+    assert first['swapInPagesPerSec'] == 0.0
+    assert first['majorFaultsPerSec'] == 0.0
+
+    write_tree(tmp_path, 3)
+    write_saturation(tmp_path, swapin=300, swapout=150, majfault=60, loadavg="6.00 3.50 1.25 10/512 4242")
+    clock.now += 4
+    data = collector.collect()
+    assert data['swapInPagesPerSec'] == 50.0
+    assert data['swapOutPagesPerSec'] == 25.0
+    assert data['majorFaultsPerSec'] == 10.0
+    assert (data['load1'], data['load5'], data['load15']) == (6.0, 3.5, 1.25)
+    assert data['runnable'] == 10
+    assert data['threads'] == 512
+    assert data['runnablePerCPU'] == 2.5
+
+
+def test_missing_vmstat_counters(tmp_path, clock, cpus):
+    # pswpin/pswpout are absent on kernels without swap support
+    (tmp_path / 'vmstat').write_text("nr_free_pages 1\npgmajfault 5\n")
+    (tmp_path / 'loadavg').write_text("0.00 0.00 0.00 1/100 1\n")
+    data = PressureCollector(str(tmp_path)).collect()
+    assert data['swapInPagesPerSec'] == 0.0
+    assert data['swapOutPagesPerSec'] == 0.0
+
+
+def test_sample_stall_percent(tmp_path, clock, cpus):
+    write_tree(tmp_path, 1)
+    collector = PressureCollector(str(tmp_path))
+    assert collector.sample() is None
+
+    write_tree(tmp_path, 2)
+    clock.now += 2
+    values = collector.sample()
+    assert values == {'cpuStallPercent': 25.0, 'memoryStallPercent': 25.0, 'ioStallPercent': 25.0}
+    assert set(collector.sketches) == {'cpuStallPercent', 'memoryStallPercent', 'ioStallPercent'}
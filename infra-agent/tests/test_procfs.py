@@ -0,0 +1,73 @@
+"""
+Tests for the in-place /proc file readers
+"""
+import pytest
+
+from agent.collectors.procfs import ProcFile
+
+SNMP = (
+    "Ip: Forwarding DefaultTTL\n"
+    "Ip: 1 64\n"
+    "Tcp: RtoAlgorithm ActiveOpens CurrEstab RetransSegs\n"
+    "Tcp: 1 100 7 42\n"
+    "Udp: InDatagrams RcvbufErrors\n"
+    "Udp: 10 3\n"
+)
+
+
+@pytest.fixture
+def proc_file(tmp_path):
+    def make(text, size=4096):
+        path = tmp_path / 'file'
+        path.write_text(text)
+        return ProcFile(str(path), size), path
+    return make
+
+
+def test_find_values(proc_file):
+    f, _ = proc_file("nr_free_pages 10\npgmajfault 123\nratio 0.25\n")
+    f.read()
+    assert f.find_int(b'\npgmajfault ') == 123
+    assert f.find_float(b'\nratio ') == 0.25
+    assert f.find_int(b'\npswpin ') is None
+    assert f.find_int(b'\npswpin ', default=0) == 0
+    assert f.fields(f.find(b'\npgmajfault ') - len(b'pgmajfault ')) == [b'pgmajfault', b'123']
+    f.close()
+
+
+def test_reread_sees_new_contents(proc_file):
+    f, path = proc_file("value 1\n")
+    f.read()
+    assert f.find_int(b'value ') == 1
+    path.write_text("value 22\n")
+    f.read()
+    assert f.find_int(b'value ') == 22
+    f.close()
+
+
+def test_buffer_grows_for_long_files(proc_file):
+    text = ''.join(f"key{i} {i}\n" for i in range(200))
+    f, _ = proc_file(text, size=16)
+    assert f.read() == len(text)
+    assert f.find_int(b'\nkey199 ') == 199
+    f.close()
+
+
+def test_missing_file_raises(tmp_path):
+    with pytest.raises(OSError):
+        ProcFile(str(tmp_path / 'missing')).read()
+
+
+def test_section(proc_file):
+    f, _ = proc_file(SNMP)
+    f.read()
+    assert f.section(b'Ip:', (b'DefaultTTL',)) == [64]
+    assert f.section(b'Tcp:', (b'RetransSegs', b'CurrEstab')) == [42, 7]
+    assert f.section(b'Udp:', (b'RcvbufErrors',)) == [3]
+
+
+def test_section_missing_column_and_section(proc_file):
+    f, _ = proc_file(SNMP)
+    f.read()
+    assert f.section(b'Tcp:', (b'ActiveOpens', b'TCPReqQFullDrop')) == [100, None]
+    assert f.section(b'TcpExt:', (b'ListenDrops',)) is None
@@ -3,11 +3,13 @@ const express = require('express');
 const providerRoutes = require('./provider.routes');
 const vmAssignmentRoutes = require('./vm-assignment.routes');
 const userRoutes = require('./user.routes');
+const policyRoutes = require('./policy.routes');
 
 const router = express.Router();
 
 router.use('/providers', providerRoutes);
 router.use('/vm-assignments', vmAssignmentRoutes);
 router.use('/users', userRoutes);
+router.use('/policy', policyRoutes);
 
 module.exports = router;
\ No newline at end of file
@@ -0,0 +1,33 @@
+// src/api/v1/admin/policy.controller.js
+const policyService = require('../../../services/policy.service');
+const { asyncHandler } = require('../../../utils/asyncHandler');
+
+/**
+ * Get the fleet collection policy
+ */
+const getPolicy = asyncHandler(async (req, res) => {
+  const policy = await policyService.getPolicy();
+  res.send(policy);
+});
+
+/**
+ * Replace the fleet collection policy
+ */
+const updatePolicy = asyncHandler(async (req, res) => {
+  const policy = await policyService.updatePolicy(req.body, req.user._id);
+  res.send(policy);
+});
+
+/**
+ * Clear the fleet collection policy, restoring agents' local configuration
+ */
+const resetPolicy = asyncHandler(async (req, res) => {
+  const policy = await policyService.resetPolicy(req.user._id);
+  res.send(policy);
+});
+
+module.exports = {
+  getPolicy,
+  updatePolicy,
+  resetPolicy,
+};
@@ -0,0 +1,26 @@
+// src/api/v1/admin/policy.routes.js
+const express = require('express');
+const validate = require('../../../middleware/validator.middleware');
+const auth = require('../../../middleware/auth.middleware');
+const policyController = require('./policy.controller');
+const policyValidation = require('./policy.validation');
+
+const router = express.Router();
+
+router
+  .route('/')
+  .get(
+    auth(['admin']),
+    policyController.getPolicy
+  )
+  .put(
+    auth(['admin']),
+    validate(policyValidation.updatePolicy),
+    policyController.updatePolicy
+  )
+  .delete(
+    auth(['admin']),
+    policyController.resetPolicy
+  );
+
+module.exports = router;
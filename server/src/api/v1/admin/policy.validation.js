@@ -0,0 +1,26 @@
+// src/api/v1/admin/policy.validation.js
+const Joi = require('joi');
+
+const updatePolicy = {
+  body: Joi.object().keys({
+    intervals: Joi.object().keys({
+      monitoring: Joi.number().integer().min(5).max(3600),
+      heartbeat: Joi.number().integer().min(5).max(3600),
+      commandPolling: Joi.number().integer().min(1).max(3600),
+      // 0 turns high-frequency sampling off
+      sampling: Joi.number().min(0).max(60),
+      probes: Joi.number().integer().min(1).max(3600),
+    }),
+    // Only optional collectors can be switched off; core metrics are always sent
+    collectors: Joi.object().pattern(Joi.string().valid('cgroups', 'pressure', 'tcp', 'probes'), Joi.boolean()),
+    batchSize: Joi.number().integer().min(1).max(100),
+    payload: Joi.object().keys({
+      compression: Joi.string().valid('none', 'gzip'),
+      sketches: Joi.boolean(),
+    }),
+  }),
+};
+
+module.exports = {
+  updatePolicy,
+};
@@ -1,7 +1,17 @@
 // src/api/v1/agent/agent.controller.js
-const { command: commandService, agent: agentService } = require('../../../services');
+const Joi = require('joi');
+const {
+  command: commandService,
+  agent: agentService,
+  monitoring: monitoringService,
+  policy: policyService,
+} = require('../../../services');
+const VM = require('../../../models/vm.model');
 const { asyncHandler } = require('../../../utils/asyncHandler');
+const { ApiError } = require('../../../utils/errors');
 const logger = require('../../../utils/logger');
+const agentValidation = require('./agent.validation');
+const monitoringValidation = require('../monitoring/monitoring.validation');
 
 /**
  * Get pending commands for a VM
@@ -49,7 +59,165 @@ const updateCommandResult = asyncHandler(async (req, res) => {
   res.status(200).send({ message: 'Command result updated successfully' });
 });
 
+/**
+ * Receive a chunk of a running command's output
+ * @param {Object} req - Express request object
+ * @param {Object} res - Express response object
+ */
+const sendCommandOutput = asyncHandler(async (req, res) => {
+  const { vmId, commandId } = req.params;
+
+  const { cancel } = await commandService.appendCommandOutput(vmId, commandId, req.body);
+
+  res.status(200).send({ message: 'Output received', cancel });
+});
+
+/**
+ * Receive a batch of application log lines
+ * @param {Object} req - Express request object
+ * @param {Object} res - Express response object
+ */
+const shipLogs = asyncHandler(async (req, res) => {
+  const { vmId } = req.params;
+
+  const result = await agentService.saveLogSegments(vmId, req.body.segments);
+
+  res.status(200).send({ message: 'Logs received', ...result });
+});
+
+/**
+ * Receive an out-of-band event pushed by the agent
+ * @param {Object} req - Express request object
+ * @param {Object} res - Express response object
+ */
+const reportEvent = asyncHandler(async (req, res) => {
+  const { vmId } = req.params;
+
+  await agentService.reportAgentEvent(vmId, req.body);
+
+  res.status(201).send({ message: 'Event received' });
+});
+
+/**
+ * Handlers for relayed items, keyed by kind. Each mirrors the direct route.
+ */
+const relayHandlers = {
+  monitoring: {
+    schema: monitoringValidation.sendMonitoringData.body,
+    handle: async (vmId, body) => {
+      await monitoringService.saveMonitoringData(vmId, body);
+      await agentService.updateAgentConnectionStatus(vmId, true);
+      return [201, { message: 'Monitoring data received successfully' }];
+    },
+  },
+  heartbeat: {
+    handle: async (vmId) => {
+      await agentService.updateAgentConnectionStatus(vmId, true);
+      const policy = await policyService.getPolicy();
+      return [200, {
+        message: 'Heartbeat received',
+        nextExpectedInSeconds: policyService.heartbeatInterval(policy),
+        policy,
+      }];
+    },
+  },
+  commands: {
+    handle: async (vmId) => {
+      await agentService.updateAgentConnectionStatus(vmId, true);
+      const commands = await commandService.getPendingCommandsForVM(vmId);
+      return [200, commands.map((cmd) => ({ id: cmd._id, type: cmd.type, payload: cmd.payload }))];
+    },
+  },
+  command_result: {
+    schema: agentValidation.updateCommandResult.body,
+    handle: async (vmId, body) => {
+      await agentService.updateAgentConnectionStatus(vmId, true);
+      await commandService.updateCommandResult(body.commandId, {
+        status: body.status,
+        message: body.message,
+        data: body.data,
+      });
+      return [200, { message: 'Command result updated successfully' }];
+    },
+  },
+  command_output: {
+    schema: agentValidation.relayCommandOutput,
+    handle: async (vmId, body) => {
+      const { commandId, ...chunk } = body;
+      const { cancel } = await commandService.appendCommandOutput(vmId, commandId, chunk);
+      return [200, { message: 'Output received', cancel }];
+    },
+  },
+  events: {
+    schema: agentValidation.reportEvent.body,
+    handle: async (vmId, body) => {
+      await agentService.reportAgentEvent(vmId, body);
+      return [201, { message: 'Event received' }];
+    },
+  },
+  logs: {
+    schema: agentValidation.shipLogs.body,
+    handle: async (vmId, body) => {
+      const result = await agentService.saveLogSegments(vmId, body.segments);
+      return [200, { message: 'Logs received', ...result }];
+    },
+  },
+};
+
+/**
+ * Authenticate, validate and process one relayed item
+ * @param {Object} item - Batch item
+ * @returns {Promise<Object>} - Item result with id, status and body
+ */
+const processRelayItem = async (item) => {
+  try {
+    const vm = await VM.findById(item.vmId);
+    if (!vm) {
+      throw new ApiError(404, 'VM not found');
+    }
+    if (vm.agentToken !== item.token) {
+      throw new ApiError(401, 'Invalid agent token');
+    }
+
+    const handler = relayHandlers[item.kind];
+    let { body } = item;
+    if (handler.schema) {
+      const { value, error } = Joi.compile(handler.schema)
+        .prefs({ errors: { label: 'key' }, abortEarly: false })
+        .validate(body);
+      if (error) {
+        throw new ApiError(400, error.details.map((details) => details.message).join(', '));
+      }
+      body = value;
+    }
+
+    const [status, result] = await handler.handle(item.vmId, body);
+    return { id: item.id, status, body: result };
+  } catch (error) {
+    const status = error.statusCode || 500;
+    if (status >= 500) {
+      logger.error(`Relayed ${item.kind} item for VM ${item.vmId} failed:`, error);
+    }
+    return { id: item.id, status, body: { message: error.message } };
+  }
+};
+
+/**
+ * Process a batch of requests forwarded by a relay agent
+ * @param {Object} req - Express request object
+ * @param {Object} res - Express response object
+ */
+const relayBatch = asyncHandler(async (req, res) => {
+  const results = await Promise.all(req.body.items.map(processRelayItem));
+
+  res.status(200).send({ results });
+});
+
 module.exports = {
   getCommands,
   updateCommandResult,
+  sendCommandOutput,
+  shipLogs,
+  reportEvent,
+  relayBatch,
 };
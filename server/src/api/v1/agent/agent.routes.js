@@ -25,4 +25,40 @@ router
     agentController.updateCommandResult
   );
 
+// Route for agent to stream output of a running command
+router
+  .route('/:vmId/commands/:commandId/output')
+  .post(
+    validate(agentValidation.sendCommandOutput),
+    agentAuth,
+    agentController.sendCommandOutput
+  );
+
+// Route for agent to ship application log lines
+router
+  .route('/:vmId/logs')
+  .post(
+    validate(agentValidation.shipLogs),
+    agentAuth,
+    agentController.shipLogs
+  );
+
+// Route for agent to push out-of-band events (e.g. anomalies)
+router
+  .route('/:vmId/events')
+  .post(
+    validate(agentValidation.reportEvent),
+    agentAuth,
+    agentController.reportEvent
+  );
+
+// Route for a relay agent to forward batched traffic of other agents
+router
+  .route('/:vmId/batch')
+  .post(
+    validate(agentValidation.relayBatch),
+    agentAuth,
+    agentController.relayBatch
+  );
+
 module.exports = router;
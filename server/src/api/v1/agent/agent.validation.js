@@ -20,7 +20,83 @@ const updateCommandResult = {
   }),
 };
 
+const sendCommandOutput = {
+  params: Joi.object().keys({
+    vmId: Joi.string().custom(objectId).required(),
+    commandId: Joi.string().custom(objectId).required(),
+  }),
+  body: Joi.object().keys({
+    seq: Joi.number().integer().min(0).required(),
+    stdout: Joi.string().allow(''),
+    stderr: Joi.string().allow(''),
+    bytes: Joi.number().integer().min(0).required(),
+    elapsedMs: Joi.number().min(0).required(),
+    done: Joi.boolean().required(),
+  }),
+};
+
+// Relayed output chunks carry the command ID that the direct route takes from the URL
+const relayCommandOutput = sendCommandOutput.body.keys({
+  commandId: Joi.string().custom(objectId).required(),
+});
+
+const shipLogs = {
+  params: Joi.object().keys({
+    vmId: Joi.string().custom(objectId).required(),
+  }),
+  body: Joi.object().keys({
+    segments: Joi.array().items(
+      Joi.object().keys({
+        path: Joi.string().required(),
+        key: Joi.string().required(),
+        lines: Joi.array().items(Joi.string().allow('')).required(),
+      })
+    ).max(1000).required(),
+  }),
+};
+
+const reportEvent = {
+  params: Joi.object().keys({
+    vmId: Joi.string().custom(objectId).required(),
+  }),
+  body: Joi.object().keys({
+    type: Joi.string().required(),
+    state: Joi.string().valid('FIRING', 'RESOLVED').required(),
+    rule: Joi.string().required(),
+    metric: Joi.string().required(),
+    value: Joi.number().required(),
+    baseline: Joi.number(),
+    zscore: Joi.number(),
+    reason: Joi.string().allow(null),
+    timestamp: Joi.date().iso().default(() => new Date()),
+  }),
+};
+
+const relayBatch = {
+  params: Joi.object().keys({
+    vmId: Joi.string().custom(objectId).required(),
+  }),
+  body: Joi.object().keys({
+    items: Joi.array().items(
+      Joi.object().keys({
+        id: Joi.number().integer().required(),
+        kind: Joi.string()
+          .valid('monitoring', 'heartbeat', 'commands', 'command_result', 'command_output', 'events', 'logs')
+          .required(),
+        vmId: Joi.string().custom(objectId).required(),
+        token: Joi.string().required(),
+        body: Joi.any(),
+      })
+    ).max(1000).required(),
+  }),
+};
+
 module.exports = {
   getCommands,
   updateCommandResult,
+  sendCommandOutput,
+  relayCommandOutput,
+  shipLogs,
+  reportEvent,
+  relayBatch,
 };
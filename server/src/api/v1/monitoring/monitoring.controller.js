@@ -3,6 +3,8 @@ const { asyncHandler } = require('../../../utils/asyncHandler');
 const monitoringService = require('../../../services/monitoring.service');
 const agentService = require('../../../services/agent.service');
 const sseService = require('../../../services/sse.service');
+const policyService = require('../../../services/policy.service');
+const logger = require('../../../utils/logger');
 
 /**
  * Receive and save monitoring data from agent
@@ -59,12 +61,19 @@ const heartbeat = asyncHandler(async (req, res) => {
   // Update connection status
   await agentService.updateAgentConnectionStatus(vmId, true);
 
-  // Return expected interval for next heartbeat
-  const nextExpectedInSeconds = 30; // Could be configurable
+  // Agents report a collection policy they could not apply
+  const policyStatus = req.body && req.body.policy;
+  if (policyStatus && policyStatus.error) {
+    logger.warn(`VM ${vmId} rejected collection policy ${policyStatus.rejectedVersion}: ${policyStatus.error}`);
+  }
+
+  // The fleet collection policy rides on the heartbeat response
+  const policy = await policyService.getPolicy();
 
   res.send({
     message: 'Heartbeat received',
-    nextExpectedInSeconds,
+    nextExpectedInSeconds: policyService.heartbeatInterval(policy),
+    policy,
   });
 });
 
@@ -27,7 +27,124 @@ const sendMonitoringData = {
     network: Joi.object().keys({
       bytesSent: Joi.number().min(0).required(),
       bytesRecv: Joi.number().min(0).required(),
+      bytesSentPerSec: Joi.number().min(0),
+      bytesRecvPerSec: Joi.number().min(0),
+      packetsSentPerSec: Joi.number().min(0),
+      packetsRecvPerSec: Joi.number().min(0),
+      errors: Joi.number().integer().min(0),
+      drops: Joi.number().integer().min(0),
+      // Busiest interfaces, per-NIC rates and interval error/drop counts
+      interfaces: Joi.array().items(
+        Joi.object().keys({
+          name: Joi.string().required(),
+          bytesSentPerSec: Joi.number().min(0).required(),
+          bytesRecvPerSec: Joi.number().min(0).required(),
+          packetsSentPerSec: Joi.number().min(0),
+          packetsRecvPerSec: Joi.number().min(0),
+          errIn: Joi.number().integer().min(0),
+          errOut: Joi.number().integer().min(0),
+          dropIn: Joi.number().integer().min(0),
+          dropOut: Joi.number().integer().min(0),
+        })
+      ),
     }).required(),
+    // Top-N cgroup v2 workloads by CPU usage
+    cgroups: Joi.array().items(
+      Joi.object().keys({
+        path: Joi.string().required(),
+        cpuPercent: Joi.number().min(0).required(),
+        throttledPercent: Joi.number().min(0),
+        nrThrottled: Joi.number().integer().min(0),
+        memoryCurrentMB: Joi.number().min(0),
+        memoryMaxMB: Joi.number().min(0).allow(null),
+        ioReadBytesPerSec: Joi.number().min(0),
+        ioWriteBytesPerSec: Joi.number().min(0),
+      })
+    ),
+    // Resource pressure (PSI, null on kernels without it) and saturation
+    pressure: Joi.object().keys({
+      psi: Joi.object().pattern(
+        Joi.string().valid('cpu', 'memory', 'io'),
+        Joi.object().pattern(
+          Joi.string().valid('some', 'full'),
+          Joi.object().keys({
+            avg10: Joi.number().min(0).required(),
+            avg60: Joi.number().min(0).required(),
+            avg300: Joi.number().min(0).required(),
+            stallMs: Joi.number().min(0).required(),
+            stallPercent: Joi.number().min(0).max(100).required(),
+          }).allow(null)
+        )
+      ).allow(null),
+      swapInPagesPerSec: Joi.number().min(0),
+      swapOutPagesPerSec: Joi.number().min(0),
+      majorFaultsPerSec: Joi.number().min(0),
+      load1: Joi.number().min(0),
+      load5: Joi.number().min(0),
+      load15: Joi.number().min(0),
+      runnable: Joi.number().integer().min(0),
+      threads: Joi.number().integer().min(0),
+      runnablePerCPU: Joi.number().min(0),
+    }),
+    // TCP stack health; counters the kernel lacks are null
+    tcp: Joi.object().keys({
+      retransmitsPerSec: Joi.number().min(0).allow(null),
+      segmentsOutPerSec: Joi.number().min(0).allow(null),
+      activeOpensPerSec: Joi.number().min(0).allow(null),
+      passiveOpensPerSec: Joi.number().min(0).allow(null),
+      failedOpensPerSec: Joi.number().min(0).allow(null),
+      estabResetsPerSec: Joi.number().min(0).allow(null),
+      resetsSentPerSec: Joi.number().min(0).allow(null),
+      inErrorsPerSec: Joi.number().min(0).allow(null),
+      udpReceiveBufferErrorsPerSec: Joi.number().min(0).allow(null),
+      listenOverflowsPerSec: Joi.number().min(0).allow(null),
+      listenDropsPerSec: Joi.number().min(0).allow(null),
+      synDropsPerSec: Joi.number().min(0).allow(null),
+      syncookiesSentPerSec: Joi.number().min(0).allow(null),
+      timeoutsPerSec: Joi.number().min(0).allow(null),
+      abortsOnMemoryPerSec: Joi.number().min(0).allow(null),
+      retransmitPercent: Joi.number().min(0),
+      established: Joi.number().integer().min(0).allow(null),
+      socketsUsed: Joi.number().integer().min(0).allow(null),
+      inUse: Joi.number().integer().min(0).allow(null),
+      orphaned: Joi.number().integer().min(0).allow(null),
+      timeWait: Joi.number().integer().min(0).allow(null),
+      allocated: Joi.number().integer().min(0).allow(null),
+      memoryPages: Joi.number().integer().min(0).allow(null),
+      conntrack: Joi.object().keys({
+        count: Joi.number().integer().min(0).required(),
+        max: Joi.number().integer().min(1).required(),
+        usagePercent: Joi.number().min(0).required(),
+      }).allow(null),
+    }),
+    // Results of local service health probes
+    probes: Joi.array().items(
+      Joi.object().keys({
+        name: Joi.string().required(),
+        type: Joi.string().valid('tcp', 'http', 'unix').required(),
+        target: Joi.string().required(),
+        up: Joi.boolean().required(),
+        latencyMs: Joi.number().min(0).allow(null),
+        error: Joi.string().allow(null),
+        statusCode: Joi.number().integer(),
+      })
+    ),
+    // Per-collector quantile summaries with mergeable DDSketch state
+    distributions: Joi.object().pattern(
+      Joi.string(),
+      Joi.object().pattern(
+        Joi.string(),
+        Joi.object().keys({
+          count: Joi.number().integer().min(0).required(),
+          min: Joi.number().required(),
+          max: Joi.number().required(),
+          p50: Joi.number().required(),
+          p95: Joi.number().required(),
+          p99: Joi.number().required(),
+          sketch: Joi.object().unknown(true),
+        })
+      )
+    ),
   }),
 };
 
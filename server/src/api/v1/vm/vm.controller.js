@@ -95,6 +95,75 @@ const updateSSHKey = asyncHandler(async (req, res) => {
   });
 });
 
+/**
+ * Run an allow-listed diagnostic script on the VM (admin only)
+ */
+const runScript = asyncHandler(async (req, res) => {
+  const { vmId } = req.params;
+  const { script, timeout } = req.body;
+
+  await vmService.getVMById(vmId, req.user);
+
+  const command = await commandService.createCommand({
+    vmId,
+    type: 'RUN_SCRIPT',
+    payload: { script, timeout },
+    createdBy: req.user._id
+  });
+
+  res.status(202).send({
+    message: `Script ${script} queued for VM ${vmId}`,
+    commandId: command._id
+  });
+});
+
+/**
+ * Profile the agent process on the VM (admin only)
+ */
+const profileAgent = asyncHandler(async (req, res) => {
+  const { vmId } = req.params;
+
+  await vmService.getVMById(vmId, req.user);
+
+  const command = await commandService.createCommand({
+    vmId,
+    type: 'PROFILE_AGENT',
+    payload: req.body,
+    createdBy: req.user._id
+  });
+
+  res.status(202).send({
+    message: `Agent profile queued for VM ${vmId}`,
+    commandId: command._id
+  });
+});
+
+/**
+ * Get the streamed output of a command (admin only)
+ */
+const getCommandOutput = asyncHandler(async (req, res) => {
+  const { vmId, commandId } = req.params;
+
+  await vmService.getVMById(vmId, req.user);
+
+  const output = await commandService.getCommandOutput(vmId, commandId);
+  res.send(output);
+});
+
+/**
+ * Cancel a pending or running command (admin only)
+ */
+const cancelCommand = asyncHandler(async (req, res) => {
+  const { vmId, commandId } = req.params;
+
+  await vmService.getVMById(vmId, req.user);
+
+  await commandService.cancelCommand(vmId, commandId);
+  res.status(202).send({
+    message: `Cancel request accepted for command ${commandId}`
+  });
+});
+
 module.exports = {
   getVMs,
   getVM,
@@ -103,4 +172,8 @@ module.exports = {
   stopVM,
   rebootVM,
   updateSSHKey,
+  runScript,
+  profileAgent,
+  getCommandOutput,
+  cancelCommand,
 };
\ No newline at end of file
@@ -65,4 +65,40 @@ router
     vmController.updateSSHKey
   );
 
+router
+  .route('/:vmId/scripts/run')
+  .post(
+    auth(),
+    rbac(['admin']),
+    validate(vmValidation.runScript),
+    vmController.runScript
+  );
+
+router
+  .route('/:vmId/agent/profile')
+  .post(
+    auth(),
+    rbac(['admin']),
+    validate(vmValidation.profileAgent),
+    vmController.profileAgent
+  );
+
+router
+  .route('/:vmId/commands/:commandId/output')
+  .get(
+    auth(),
+    rbac(['admin']),
+    validate(vmValidation.commandAction),
+    vmController.getCommandOutput
+  );
+
+router
+  .route('/:vmId/commands/:commandId/cancel')
+  .post(
+    auth(),
+    rbac(['admin']),
+    validate(vmValidation.commandAction),
+    vmController.cancelCommand
+  );
+
 module.exports = router;
@@ -29,9 +29,41 @@ const updateSSHKey = {
   }),
 };
 
+const runScript = {
+  params: Joi.object().keys({
+    vmId: Joi.string().custom(objectId).required(),
+  }),
+  body: Joi.object().keys({
+    script: Joi.string().required(),
+    timeout: Joi.number().integer().min(1),
+  }),
+};
+
+const profileAgent = {
+  params: Joi.object().keys({
+    vmId: Joi.string().custom(objectId).required(),
+  }),
+  body: Joi.object().keys({
+    duration: Joi.number().min(1).max(60),
+    interval: Joi.number().min(0.001).max(1),
+    top: Joi.number().integer().min(1).max(50),
+    memory: Joi.boolean(),
+  }),
+};
+
+const commandAction = {
+  params: Joi.object().keys({
+    vmId: Joi.string().custom(objectId).required(),
+    commandId: Joi.string().custom(objectId).required(),
+  }),
+};
+
 module.exports = {
   getVM,
   syncVMs,
   vmAction,
   updateSSHKey,
+  runScript,
+  profileAgent,
+  commandAction,
 };
\ No newline at end of file
@@ -14,6 +14,12 @@ const app = express();
 // Set security HTTP headers
 app.use(helmet());
 
+// Relay agents forward batched (gzip-compressed) traffic of many agents
+app.use('/api/v1/agent/:vmId/batch', express.json({ limit: '5mb' }));
+
+// Agents ship gzip-compressed batches of application log lines
+app.use('/api/v1/agent/:vmId/logs', express.json({ limit: '5mb' }));
+
 // Parse JSON request body
 app.use(express.json());
 
@@ -12,6 +12,7 @@ const ACTIVITY_TYPES = {
     AGENT_INSTALLED: 'agent:installed',
     AGENT_UPDATED: 'agent:updated',
     AGENT_TOKEN_REFRESHED: 'agent:token_refreshed',
+    AGENT_ANOMALY: 'agent:anomaly',
     
     // User actions
     USER_LOGIN: 'user:login',
@@ -0,0 +1,53 @@
+// src/models/collection-policy.model.js
+const mongoose = require('mongoose');
+
+const collectionPolicySchema = mongoose.Schema(
+  {
+    // One fleet-wide policy for now; the key leaves room for scoped policies
+    key: {
+      type: String,
+      required: true,
+      unique: true,
+      default: 'fleet',
+    },
+    // Bumped on every change so agents apply each policy once
+    version: {
+      type: Number,
+      default: 0,
+    },
+    // Seconds per job; unset intervals fall back to the agent's own config
+    intervals: {
+      monitoring: Number,
+      heartbeat: Number,
+      commandPolling: Number,
+      sampling: Number,
+      probes: Number,
+    },
+    // Optional collectors switched on or off by name
+    collectors: {
+      type: mongoose.Schema.Types.Mixed,
+    },
+    // Monitoring samples uploaded per request
+    batchSize: {
+      type: Number,
+    },
+    payload: {
+      compression: {
+        type: String,
+        enum: ['none', 'gzip'],
+      },
+      sketches: Boolean,
+    },
+    updatedBy: {
+      type: mongoose.Schema.Types.ObjectId,
+      ref: 'User',
+    },
+  },
+  {
+    timestamps: true,
+  }
+);
+
+const CollectionPolicy = mongoose.model('CollectionPolicy', collectionPolicySchema);
+
+module.exports = CollectionPolicy;
@@ -0,0 +1,45 @@
+// src/models/command-output.model.js
+const mongoose = require('mongoose');
+
+const commandOutputSchema = mongoose.Schema(
+  {
+    commandId: {
+      type: mongoose.Schema.Types.ObjectId,
+      ref: 'Command',
+      required: true,
+    },
+    vmId: {
+      type: mongoose.Schema.Types.ObjectId,
+      ref: 'VM',
+      required: true,
+    },
+    seq: {
+      type: Number,
+      required: true,
+    },
+    stdout: {
+      type: String,
+      default: '',
+    },
+    stderr: {
+      type: String,
+      default: '',
+    },
+    expiresAt: {
+      type: Date,
+    },
+  },
+  {
+    timestamps: true,
+  }
+);
+
+// One document per chunk; retried uploads are idempotent
+commandOutputSchema.index({ commandId: 1, seq: 1 }, { unique: true });
+
+// Index for expiration
+commandOutputSchema.index({ expiresAt: 1 }, { expireAfterSeconds: 0 });
+
+const CommandOutput = mongoose.model('CommandOutput', commandOutputSchema);
+
+module.exports = CommandOutput;
@@ -11,12 +11,12 @@ const commandSchema = new mongoose.Schema(
     },
     type: {
       type: String,
-      enum: ['UPDATE_SSH_KEY', 'RESTART_AGENT', 'SYSTEM_UPDATE'],
+      enum: ['UPDATE_SSH_KEY', 'RESTART_AGENT', 'SYSTEM_UPDATE', 'UPDATE_ANOMALY_RULES', 'RUN_SCRIPT', 'PROFILE_AGENT'],
       required: true,
     },
     status: {
       type: String,
-      enum: ['PENDING', 'IN_PROGRESS', 'COMPLETED', 'FAILED'],
+      enum: ['PENDING', 'IN_PROGRESS', 'COMPLETED', 'FAILED', 'CANCELLED'],
       default: 'PENDING',
     },
     payload: {
@@ -6,7 +6,10 @@ const Monitoring = require('./monitoring.model');
 const Activity = require('./activity.model');
 const Provider = require('./provider.model');
 const Command = require('./command.model');
+const CommandOutput = require('./command-output.model');
+const LogSegment = require('./log-segment.model');
 const VMAssignment = require('./vm-assignment.model');
+const CollectionPolicy = require('./collection-policy.model');
 // Import additional models as needed
 
 module.exports = {
@@ -17,5 +20,8 @@ module.exports = {
   Activity,
   Provider,
   Command,
+  CommandOutput,
+  LogSegment,
   VMAssignment,
+  CollectionPolicy,
 };
\ No newline at end of file
@@ -0,0 +1,43 @@
+// src/models/log-segment.model.js
+const mongoose = require('mongoose');
+
+const logSegmentSchema = mongoose.Schema(
+  {
+    vmId: {
+      type: mongoose.Schema.Types.ObjectId,
+      ref: 'VM',
+      required: true,
+    },
+    path: {
+      type: String,
+      required: true,
+    },
+    // Stable key of the segment in the source file (device:inode:epoch:offset)
+    key: {
+      type: String,
+      required: true,
+    },
+    lines: {
+      type: [String],
+      default: [],
+    },
+    expiresAt: {
+      type: Date,
+    },
+  },
+  {
+    timestamps: true,
+  }
+);
+
+// A retried upload of the same segment is ignored
+logSegmentSchema.index({ vmId: 1, path: 1, key: 1 }, { unique: true });
+
+logSegmentSchema.index({ vmId: 1, path: 1, createdAt: -1 });
+
+// Index for expiration
+logSegmentSchema.index({ expiresAt: 1 }, { expireAfterSeconds: 0 });
+
+const LogSegment = mongoose.model('LogSegment', logSegmentSchema);
+
+module.exports = LogSegment;
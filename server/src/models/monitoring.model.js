@@ -62,6 +62,30 @@ const monitoringSchema = mongoose.Schema(
         type: Number,
         required: true,
       },
+      bytesSentPerSec: Number,
+      bytesRecvPerSec: Number,
+      packetsSentPerSec: Number,
+      packetsRecvPerSec: Number,
+      errors: Number,
+      drops: Number,
+      interfaces: {
+        type: mongoose.Schema.Types.Mixed,
+      },
+    },
+    cgroups: {
+      type: mongoose.Schema.Types.Mixed,
+    },
+    probes: {
+      type: mongoose.Schema.Types.Mixed,
+    },
+    pressure: {
+      type: mongoose.Schema.Types.Mixed,
+    },
+    tcp: {
+      type: mongoose.Schema.Types.Mixed,
+    },
+    distributions: {
+      type: mongoose.Schema.Types.Mixed,
     },
   },
   {
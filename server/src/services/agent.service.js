@@ -1,6 +1,8 @@
 // src/services/agent.service.js
 const VM = require('../models/vm.model');
+const LogSegment = require('../models/log-segment.model');
 const activityService = require('./activity.service');
+const sseService = require('./sse.service');
 const { ApiError } = require('../utils/errors');
 const crypto = require('crypto');
 
@@ -80,7 +82,72 @@ const generateNewAgentToken = async (vmId) => {
   return newToken;
 };
 
+/**
+ * Record an event pushed by the agent and forward it to the VM owner
+ * @param {string} vmId - MongoDB ID of the VM
+ * @param {Object} event - Event from agent
+ * @returns {Promise<Object>} - VM the event belongs to
+ */
+const reportAgentEvent = async (vmId, event) => {
+  const vm = await VM.findById(vmId);
+
+  if (!vm) {
+    throw new ApiError(404, 'VM not found');
+  }
+
+  await activityService.logActivity({
+    action: `agent:${event.type.toLowerCase()}`,
+    resourceType: 'vm',
+    resourceId: vm._id,
+    details: {
+      instanceId: vm.instanceId,
+      name: vm.name,
+      ...event,
+    },
+    status: event.state === 'FIRING' ? 'failure' : 'success',
+  });
+
+  if (vm.owner) {
+    sseService.sendEventToUser(vm.owner.toString(), 'agent_event', {
+      vmId,
+      event,
+    });
+  }
+
+  return vm;
+};
+
+// Days shipped log lines are kept
+const LOG_RETENTION_DAYS = 7;
+
+/**
+ * Store log segments shipped by the agent, skipping segments already stored
+ * @param {string} vmId - MongoDB ID of the VM
+ * @param {Array<Object>} segments - Segments with path, key and lines
+ * @returns {Promise<Object>} - Number of stored and duplicate segments
+ */
+const saveLogSegments = async (vmId, segments) => {
+  const expiresAt = new Date();
+  expiresAt.setDate(expiresAt.getDate() + LOG_RETENTION_DAYS);
+
+  const docs = segments.map((segment) => ({ vmId, ...segment, expiresAt }));
+
+  try {
+    await LogSegment.insertMany(docs, { ordered: false });
+    return { stored: docs.length, duplicates: 0 };
+  } catch (error) {
+    // Duplicate keys are retried uploads; anything else is a real failure
+    const writeErrors = error.writeErrors || [];
+    if (writeErrors.length && writeErrors.every((writeError) => writeError.code === 11000)) {
+      return { stored: docs.length - writeErrors.length, duplicates: writeErrors.length };
+    }
+    throw error;
+  }
+};
+
 module.exports = {
   updateAgentConnectionStatus,
   generateNewAgentToken,
+  reportAgentEvent,
+  saveLogSegments,
 };
\ No newline at end of file
@@ -1,5 +1,6 @@
 // src/services/command.service.js
-const { Command, VM } = require('../models');
+const { Command, CommandOutput, VM } = require('../models');
+const sseService = require('./sse.service');
 const { ApiError } = require('../utils/errors');
 const logger = require('../utils/logger');
 
@@ -95,10 +96,12 @@ const updateCommandStatus = async (commandId, status) => {
 const updateCommandResult = async (commandId, result) => {
   try {
     const now = new Date();
+    const current = await Command.findById(commandId);
     const command = await Command.findByIdAndUpdate(
       commandId,
       {
-        status: 'COMPLETED',
+        // A cancelled command keeps its status but still records the result
+        status: current && current.status === 'CANCELLED' ? 'CANCELLED' : 'COMPLETED',
         result: {
           ...result,
           completedAt: now,
@@ -119,6 +122,116 @@ const updateCommandResult = async (commandId, result) => {
   }
 };
 
+/**
+ * Store a chunk of a running command's output and forward it to the VM owner
+ * @param {string} vmId - VM ID
+ * @param {string} commandId - Command ID
+ * @param {Object} chunk - Output chunk
+ * @param {number} chunk.seq - Chunk sequence number
+ * @param {string} [chunk.stdout] - Standard output since the previous chunk
+ * @param {string} [chunk.stderr] - Standard error since the previous chunk
+ * @param {number} chunk.bytes - Output bytes produced so far
+ * @param {number} chunk.elapsedMs - Run time so far
+ * @param {boolean} chunk.done - Whether this is the last chunk
+ * @returns {Promise<Object>} - Whether the agent should cancel the command
+ */
+const appendCommandOutput = async (vmId, commandId, chunk) => {
+  try {
+    const command = await Command.findOne({ _id: commandId, vmId });
+    if (!command) {
+      throw new ApiError(404, 'Command not found');
+    }
+
+    if (command.status === 'PENDING') {
+      command.status = 'IN_PROGRESS';
+      await command.save();
+    }
+
+    if (chunk.stdout || chunk.stderr) {
+      await CommandOutput.updateOne(
+        { commandId, seq: chunk.seq },
+        {
+          $setOnInsert: {
+            vmId,
+            stdout: chunk.stdout || '',
+            stderr: chunk.stderr || '',
+            expiresAt: command.expiresAt,
+          },
+        },
+        { upsert: true }
+      );
+    }
+
+    const vm = await VM.findById(vmId);
+    if (vm && vm.owner) {
+      sseService.sendEventToUser(vm.owner.toString(), 'command_output', {
+        vmId,
+        commandId,
+        ...chunk,
+      });
+    }
+
+    return { cancel: command.status === 'CANCELLED' };
+  } catch (error) {
+    logger.error(`Error storing output of command ${commandId}:`, error);
+    throw error;
+  }
+};
+
+/**
+ * Get the stored output of a command in order
+ * @param {string} vmId - VM ID
+ * @param {string} commandId - Command ID
+ * @returns {Promise<Object>} - Command status and concatenated output
+ */
+const getCommandOutput = async (vmId, commandId) => {
+  try {
+    const command = await Command.findOne({ _id: commandId, vmId });
+    if (!command) {
+      throw new ApiError(404, 'Command not found');
+    }
+
+    const chunks = await CommandOutput.find({ commandId }).sort({ seq: 1 });
+
+    return {
+      commandId,
+      status: command.status,
+      result: command.result,
+      stdout: chunks.map((chunk) => chunk.stdout).join(''),
+      stderr: chunks.map((chunk) => chunk.stderr).join(''),
+    };
+  } catch (error) {
+    logger.error(`Error getting output of command ${commandId}:`, error);
+    throw error;
+  }
+};
+
+/**
+ * Cancel a pending or running command
+ * @param {string} vmId - VM ID
+ * @param {string} commandId - Command ID
+ * @returns {Promise<Object>} - Updated command
+ */
+const cancelCommand = async (vmId, commandId) => {
+  try {
+    const command = await Command.findOneAndUpdate(
+      { _id: commandId, vmId, status: { $in: ['PENDING', 'IN_PROGRESS'] } },
+      { status: 'CANCELLED' },
+      { new: true }
+    );
+
+    if (!command) {
+      throw new ApiError(404, 'No pending or running command found');
+    }
+
+    logger.info(`Command ${commandId} cancelled`);
+    return command;
+  } catch (error) {
+    logger.error(`Error cancelling command ${commandId}:`, error);
+    throw error;
+  }
+};
+
 /**
  * Get command by ID
  * @param {string} commandId - Command ID
@@ -145,4 +258,7 @@ module.exports = {
   updateCommandStatus,
   updateCommandResult,
   getCommandById,
+  appendCommandOutput,
+  getCommandOutput,
+  cancelCommand,
 };
@@ -9,6 +9,7 @@ const commandService = require('./command.service');
 const vaultService = require('./vault.service');
 const userService = require('./user.service');
 const vmAssignmentService = require('./vm-assignment.service');
+const policyService = require('./policy.service');
 // Import additional services as needed
 
 module.exports = {
@@ -22,4 +23,5 @@ module.exports = {
   vault: vaultService,
   user: userService,
   vmAssignment: vmAssignmentService,
+  policy: policyService,
 };
@@ -25,6 +25,11 @@ const saveMonitoringData = async (vmId, monitoringData) => {
     memory: monitoringData.memory,
     disk: monitoringData.disk,
     network: monitoringData.network,
+    cgroups: monitoringData.cgroups,
+    probes: monitoringData.probes,
+    pressure: monitoringData.pressure,
+    tcp: monitoringData.tcp,
+    distributions: monitoringData.distributions,
   });
 
   // If VM has an owner, send SSE event
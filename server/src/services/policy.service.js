@@ -0,0 +1,103 @@
+// src/services/policy.service.js
+const { CollectionPolicy } = require('../models');
+
+const FLEET_KEY = 'fleet';
+
+// Heartbeat interval suggested to agents when the policy sets none
+const DEFAULT_HEARTBEAT_INTERVAL = 30;
+
+// Heartbeats read the policy on every request; a short cache keeps that off
+// the database while changes still reach the fleet within seconds
+const CACHE_TTL_MS = 5000;
+
+const POLICY_FIELDS = ['intervals', 'collectors', 'batchSize', 'payload'];
+
+let cached = null;
+let cachedAt = 0;
+
+/**
+ * Shape a stored policy for agents
+ * @param {Object|null} doc - Policy document
+ * @returns {Object} Policy with version and the fields that are set
+ */
+const toAgentPolicy = (doc) => {
+  const policy = { version: doc ? doc.version : 0 };
+  if (doc) {
+    POLICY_FIELDS.forEach((field) => {
+      if (doc[field] !== undefined && doc[field] !== null) {
+        policy[field] = doc[field];
+      }
+    });
+  }
+  return policy;
+};
+
+/**
+ * Get the fleet collection policy as sent to agents
+ * @returns {Promise<Object>} Policy; version 0 when none was ever set
+ */
+const getPolicy = async () => {
+  if (cached && Date.now() - cachedAt < CACHE_TTL_MS) {
+    return cached;
+  }
+
+  const doc = await CollectionPolicy.findOne({ key: FLEET_KEY }).lean();
+  cached = toAgentPolicy(doc);
+  cachedAt = Date.now();
+  return cached;
+};
+
+/**
+ * Get the heartbeat interval agents are told to expect
+ * @param {Object} policy - Policy as returned by getPolicy
+ * @returns {number} Seconds until the next heartbeat
+ */
+const heartbeatInterval = (policy) =>
+  (policy.intervals && policy.intervals.heartbeat) || DEFAULT_HEARTBEAT_INTERVAL;
+
+/**
+ * Replace the fleet collection policy
+ * @param {Object} policyData - Intervals, collectors, batch size and payload options
+ * @param {string} userId - Admin making the change
+ * @returns {Promise<CollectionPolicy>}
+ */
+const updatePolicy = async (policyData, userId) => {
+  const $set = { updatedBy: userId };
+  const $unset = {};
+  POLICY_FIELDS.forEach((field) => {
+    if (policyData[field] !== undefined) {
+      $set[field] = policyData[field];
+    } else {
+      // Fields left out go back to the agents' local configuration
+      $unset[field] = '';
+    }
+  });
+
+  const update = { $set, $inc: { version: 1 } };
+  if (Object.keys($unset).length) {
+    update.$unset = $unset;
+  }
+
+  const policy = await CollectionPolicy.findOneAndUpdate(
+    { key: FLEET_KEY },
+    update,
+    { new: true, upsert: true, setDefaultsOnInsert: true }
+  );
+
+  cached = null;
+  return policy;
+};
+
+/**
+ * Clear the fleet collection policy so agents restore their local configuration
+ * @param {string} userId - Admin making the change
+ * @returns {Promise<CollectionPolicy>}
+ */
+const resetPolicy = async (userId) => updatePolicy({}, userId);
+
+module.exports = {
+  getPolicy,
+  updatePolicy,
+  resetPolicy,
+  heartbeatInterval,
+};